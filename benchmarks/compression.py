@@ -0,0 +1,123 @@
+# benchmarks/compression.py
+"""
+Storage and response size benchmark for analysis compression.
+
+Builds realistic articles (the FAKE provider's markdown tables over stub
+Tickertick stories) and reports, per codec, the stored BSON size of an article
+and the cost of compressing and decompressing its analysis, then the bytes of
+typical /articles and /api/trending responses with and without gzip and with
+include_analysis=false. It also compares the keywords stored for the text index
+with the compressed analysis and with an uncompressed plain-text copy.
+
+    python benchmarks/compression.py --articles 200 --news 10
+"""
+
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+import bson
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "llm")]
+
+from langchain_core.messages import ToolMessage  # noqa: E402
+
+from common.models import ArticleModel, compress_analysis, decompress_analysis, zstandard  # noqa: E402
+from common.rendering import plain_text  # noqa: E402
+from fake_llm import build_analysis  # noqa: E402
+from stubs import make_stories  # noqa: E402
+
+TICKERS = ["AAPL", "MSFT", "TSLA", "AMZN", "NVDA", "GOOGL", "META", "JPM"]
+# Starlette's GZipMiddleware default
+GZIP_LEVEL = 9
+
+
+def make_articles(count: int, news: int) -> list:
+    articles = []
+    for i in range(count):
+        ticker = TICKERS[i % len(TICKERS)]
+        stories = make_stories(f"z:{ticker}", news, last_id=f"0-{i * news - 1}" if i else None)
+        fields = build_analysis(ticker, [ToolMessage(content=json.dumps({"stories": stories}), tool_call_id="bench")])
+        articles.append(ArticleModel.create_article(ticker, fields["overall_sentiment"], fields["summary"], fields["analysis"]))
+    return articles
+
+
+def storage(articles: list, codec: str) -> dict:
+    sizes, encode_us, decode_us = [], [], []
+    for article in articles:
+        start = time.perf_counter()
+        value, encoding = compress_analysis(article["analysis"], codec)
+        encode_us.append((time.perf_counter() - start) * 1e6)
+        stored = {**article, "analysis": value}
+        if encoding is not None:
+            stored["analysis_encoding"] = encoding
+        sizes.append(len(bson.encode(stored)))
+        start = time.perf_counter()
+        decompress_analysis(value, encoding)
+        decode_us.append((time.perf_counter() - start) * 1e6)
+    return {
+        "codec": codec,
+        "avg_document_bytes": round(statistics.mean(sizes)),
+        "total_bytes": sum(sizes),
+        "encode_us_p50": round(statistics.median(encode_us), 1),
+        "decode_us_p50": round(statistics.median(decode_us), 1),
+    }
+
+
+def search_field(articles: list) -> dict:
+    """
+    Bytes per article of the search keywords against what they are meant to avoid storing
+    """
+    def avg(values):
+        return round(statistics.mean(values))
+
+    return {
+        "avg_keywords_bytes": avg(len(a["analysis_keywords"].encode()) for a in articles),
+        "avg_plain_text_bytes": avg(len(plain_text(a["analysis_html"]).encode()) for a in articles),
+        "avg_zlib_analysis_bytes": avg(len(compress_analysis(a["analysis"], "zlib")[0]) for a in articles),
+    }
+
+
+def response_bytes(articles: list, include_analysis: bool) -> dict:
+    formatted = [ArticleModel.format_article(dict(article), include_analysis) for article in articles]
+    body = json.dumps({"articles": formatted}, default=str).encode()
+    return {"raw": len(body), "gzip": len(gzip.compress(body, GZIP_LEVEL))}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark analysis compression and response sizes.")
+    parser.add_argument("--articles", type=int, default=200, help="articles to generate")
+    parser.add_argument("--news", type=int, default=10, help="news items per analysis")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # Every article is compressed regardless of length
+    os.environ["ANALYSIS_COMPRESSION_MIN_BYTES"] = "0"
+    articles = make_articles(args.articles, args.news)
+    codecs = ["none", "zlib"] + (["zstd"] if zstandard is not None else [])
+    ticker_articles = [a for a in articles if a["ticker"] == TICKERS[0]][:20]
+
+    results = {
+        "config": vars(args),
+        "storage": [storage(articles, codec) for codec in codecs],
+        "search_field": search_field(articles),
+        "responses": {
+            "articles_by_ticker": response_bytes(ticker_articles, include_analysis=True),
+            "trending": response_bytes(articles[:10], include_analysis=True),
+            "trending_without_analysis": response_bytes(articles[:10], include_analysis=False),
+        },
+    }
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+# benchmarks/loadtest.py
+"""
+End-to-end load test for the web app and llm service.
+
+Starts a stub Tickertick API, a stub LLM, the llm service and the web app (each
+under uvicorn) against a local mongod, drives a weighted mix of requests and
+writes per-endpoint throughput and latency percentiles as JSON. The LLM is either
+an OpenAI-compatible stub server (--llm-provider stub) or the built-in FAKE
+provider (--llm-provider fake), which skips the HTTP hop to the model.
+
+    python benchmarks/loadtest.py --duration 30 --output bench.json
+    python benchmarks/loadtest.py --baseline bench.json   # exit 1 on regression
+
+Runs with the same seed, mix and stub latencies issue the same request sequence,
+so results from different commits can be compared directly.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from stubs import TickertickStub, LLMStub, Latency
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MIX = "analyze=1,articles=20,trending=10,healthz=5"
+DEFAULT_TICKERS = "AAPL,MSFT,TSLA,AMZN,NVDA,GOOGL,META,JPM"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the web app and llm service.")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds before the run")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent client workers")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint weights, e.g. analyze=1,articles=20")
+    parser.add_argument("--tickers", default=DEFAULT_TICKERS, help="comma separated tickers to request")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--llm-provider", choices=["stub", "fake"], default="stub",
+                        help="OpenAI-compatible stub server or the in-process FAKE provider")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0, help="mean stub LLM latency per call")
+    parser.add_argument("--llm-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tickertick-latency-ms", type=float, default=50.0)
+    parser.add_argument("--tickertick-jitter-ms", type=float, default=10.0)
+    parser.add_argument("--mongo-uri", default=None,
+                        help="existing mongod to use; defaults to a throwaway mongod on a free port")
+    parser.add_argument("--web-workers", type=int, default=1, help="uvicorn workers for the web app")
+    parser.add_argument("--llm-workers", type=int, default=1, help="uvicorn workers for the llm service")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", default=None, help="compare against a previous JSON result")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed relative p95/throughput regression against the baseline")
+    return parser.parse_args(argv)
+
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    unknown = set(weights) - set(ENDPOINTS)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return weights
+
+
+# Each endpoint maps to (method, path template); {ticker} is filled per request.
+ENDPOINTS = {
+    "analyze": ("POST", "/analyze/{ticker}"),
+    "articles": ("GET", "/articles/{ticker}"),
+    "trending": ("GET", "/api/trending"),
+    "healthz": ("GET", "/healthz"),
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code < 500:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+def start_mongod(workdir: str):
+    mongod = shutil.which("mongod")
+    if not mongod:
+        raise RuntimeError("mongod not found on PATH; pass --mongo-uri to use a running server")
+    port = free_port()
+    dbpath = os.path.join(workdir, "db")
+    os.makedirs(dbpath)
+    proc = subprocess.Popen(
+        [mongod, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return proc, f"mongodb://127.0.0.1:{port}/loadtest"
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError("mongod did not start")
+
+
+def start_service(app_dir: str, module: str, port: int, workers: int, env: dict, log_path: str):
+    service_env = dict(os.environ)
+    service_env.update(env)
+    service_env["PYTHONPATH"] = os.pathsep.join([ROOT, os.path.join(ROOT, "common"), os.path.join(ROOT, app_dir)])
+    # The child inherits its own copy of the log file descriptor, so ours can be closed once it has started
+    with open(log_path, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--log-level", "warning"],
+            cwd=os.path.join(ROOT, app_dir), env=service_env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """
+    Linear-interpolated percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {name: [] for name in ENDPOINTS}
+        self.errors = {name: 0 for name in ENDPOINTS}
+
+    def record(self, endpoint: str, latency_ms: float, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self.samples[endpoint].append(latency_ms)
+            else:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for name, samples in self.samples.items():
+            if not samples and not self.errors[name]:
+                continue
+            ordered = sorted(samples)
+            endpoints[name] = {
+                "requests": len(ordered) + self.errors[name],
+                "errors": self.errors[name],
+                "throughput_rps": round(len(ordered) / elapsed, 3),
+                "mean_ms": round(sum(ordered) / len(ordered), 3) if ordered else 0.0,
+                "p50_ms": round(percentile(ordered, 50), 3),
+                "p95_ms": round(percentile(ordered, 95), 3),
+                "p99_ms": round(percentile(ordered, 99), 3),
+                "max_ms": round(ordered[-1], 3) if ordered else 0.0,
+            }
+        total = sum(len(s) for s in self.samples.values())
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "total_requests": total + sum(self.errors.values()),
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 3),
+            "endpoints": endpoints,
+        }
+
+
+def drive(base_url: str, weights: dict, tickers: list, concurrency: int, seconds: float,
+          seed: int, recorder: Recorder = None) -> float:
+    """
+    Run `concurrency` workers for `seconds`, each with its own seeded request sequence.
+    """
+    names = list(weights)
+    weight_list = [weights[n] for n in names]
+    deadline = time.monotonic() + seconds
+
+    def worker(index: int):
+        rng = random.Random(seed * 1000 + index)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights=weight_list)[0]
+            method, template = ENDPOINTS[name]
+            url = base_url + template.format(ticker=rng.choice(tickers))
+            start = time.perf_counter()
+            try:
+                ok = session.request(method, url, timeout=120).status_code < 400
+            except requests.RequestException:
+                ok = False
+            if recorder is not None:
+                recorder.record(name, (time.perf_counter() - start) * 1000, ok)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - started
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def comparable_config(args) -> dict:
+    return {
+        "duration": args.duration,
+        "concurrency": args.concurrency,
+        "mix": parse_mix(args.mix),
+        "tickers": args.tickers.split(","),
+        "seed": args.seed,
+        "llm_provider": args.llm_provider,
+        "llm_latency_ms": args.llm_latency_ms,
+        "llm_jitter_ms": args.llm_jitter_ms,
+        "tickertick_latency_ms": args.tickertick_latency_ms,
+        "tickertick_jitter_ms": args.tickertick_jitter_ms,
+        "web_workers": args.web_workers,
+        "llm_workers": args.llm_workers,
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Return a list of human readable regressions of result against baseline.
+    """
+    if result["config"] != baseline.get("config"):
+        print("warning: baseline was recorded with a different configuration", file=sys.stderr)
+    regressions = []
+    for name, current in result["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if previous["throughput_rps"] and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+        if current["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def run(args) -> dict:
+    weights = parse_mix(args.mix)
+    tickers = [t.strip().upper() for t in args.tickers.split(",") if t.strip()]
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    processes = []
+    tickertick = TickertickStub(latency=Latency(args.tickertick_latency_ms, args.tickertick_jitter_ms, args.seed)).start()
+    llm_stub = LLMStub(latency=Latency(args.llm_latency_ms, args.llm_jitter_ms, args.seed)).start()
+    try:
+        mongo_uri = args.mongo_uri
+        if not mongo_uri:
+            mongod, mongo_uri = start_mongod(workdir)
+            processes.append(mongod)
+
+        llm_port, web_port = free_port(), free_port()
+        llm_env = {"MONGO_URI": mongo_uri, "TICKERTICK_API_URL": tickertick.url}
+        if args.llm_provider == "fake":
+            llm_env.update({
+                "LLM_API_PROVIDER": "FAKE",
+                "FAKE_LLM_SEED": str(args.seed),
+                "FAKE_LLM_TTFT": f"uniform:{max(0.0, args.llm_latency_ms - args.llm_jitter_ms)},"
+                                 f"{args.llm_latency_ms + args.llm_jitter_ms}",
+            })
+        else:
+            llm_env.update({
+                "LLM_API_PROVIDER": "OPENAI",
+                "OPENAI_API_KEY": "loadtest",
+                "OPENAI_BASE_URL": llm_stub.url,
+            })
+        processes.append(start_service("llm", "llm_app:app", llm_port, args.llm_workers, llm_env,
+                                       os.path.join(workdir, "llm.log")))
+        web_env = {"MONGO_URI": mongo_uri, "LLM_SERVICE_URL": f"http://127.0.0.1:{llm_port}"}
+        processes.append(start_service("web-app", "app:app", web_port, args.web_workers, web_env,
+                                       os.path.join(workdir, "web.log")))
+        base_url = f"http://127.0.0.1:{web_port}"
+        wait_for(f"http://127.0.0.1:{llm_port}/healthz")
+        wait_for(f"{base_url}/healthz")
+
+        # Make sure every ticker has history before reads are measured
+        for ticker in tickers:
+            requests.post(f"{base_url}/analyze/{ticker}", timeout=120)
+        if args.warmup > 0:
+            drive(base_url, weights, tickers, args.concurrency, args.warmup, args.seed + 1)
+
+        recorder = Recorder()
+        elapsed = drive(base_url, weights, tickers, args.concurrency, args.duration, args.seed, recorder)
+        result = recorder.summary(elapsed)
+        result["config"] = comparable_config(args)
+        result["meta"] = {
+            "git_revision": git_revision(),
+            "recorded_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "logs": workdir,
+        }
+        return result
+    finally:
+        for proc in reversed(processes):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        tickertick.stop()
+        llm_stub.stop()
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    result = run(args)
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
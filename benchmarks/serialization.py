@@ -0,0 +1,92 @@
+# benchmarks/serialization.py
+"""
+Microbenchmark for encoding article lists as JSON responses.
+
+Compares the previous path (format_article on a copy, FastAPI's
+jsonable_encoder, json.dumps) with ArticleModel.view plus
+common.serialization.dumps, for lists of 10 to 10000 articles with and without
+their analysis bodies. Reports the median time per list and per article.
+
+    python benchmarks/serialization.py --repeat 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT]
+
+from common.models import ArticleModel  # noqa: E402
+from common.serialization import dumps, orjson  # noqa: E402
+
+SIZES = [10, 100, 1000, 10000]
+ANALYSIS = "| Title | Sentiment | Summary |\n|---|---|---|\n" + "| Headline | Bullish | A short summary of the story. |\n" * 12
+
+
+def make_articles(count: int) -> list:
+    articles = []
+    for i in range(count):
+        article = ArticleModel.create_article("AAPL", "Bullish", f"Summary {i}", ANALYSIS)
+        article["_id"] = ObjectId()
+        articles.append(article)
+    return articles
+
+
+def old_path(articles: list, include_analysis: bool) -> bytes:
+    formatted = [ArticleModel.format_article(dict(a), include_analysis) for a in articles]
+    return json.dumps(jsonable_encoder({"articles": formatted}), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def new_path(articles: list, include_analysis: bool) -> bytes:
+    return dumps({"articles": [ArticleModel.view(a, include_analysis) for a in articles]})
+
+
+def timed(func, articles, include_analysis, repeat) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(articles, include_analysis)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark article JSON serialization.")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = {"config": {**vars(args), "orjson": orjson is not None}, "runs": []}
+    for size in SIZES:
+        articles = make_articles(size)
+        for include_analysis in (True, False):
+            assert json.loads(old_path(articles, include_analysis)) == json.loads(new_path(articles, include_analysis))
+            old = timed(old_path, articles, include_analysis, args.repeat)
+            new = timed(new_path, articles, include_analysis, args.repeat)
+            results["runs"].append({
+                "articles": size,
+                "include_analysis": include_analysis,
+                "old_ms": round(old * 1e3, 3),
+                "new_ms": round(new * 1e3, 3),
+                "old_us_per_article": round(old * 1e6 / size, 2),
+                "new_us_per_article": round(new * 1e6 / size, 2),
+                "speedup": round(old / new, 1),
+            })
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/stories.py
+"""
+Microbenchmark for decoding Tickertick feed responses.
+
+Compares the previous path (response.json() into full dicts, then rewriting
+every timestamp to ISO in place) with tool.fetch_page's path (msgspec decoding
+the body straight into compact Story records), on stub feed bodies of 1000
+and 10000 stories. Reports, per 1000 stories, the median decode time, the time to build
+the tool output the model sees, the memory held by the decoded stories and the
+size of that tool output.
+
+    python benchmarks/stories.py --repeat 20
+"""
+
+import argparse
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "llm")]
+
+from stubs import make_stories  # noqa: E402
+from tool import _decode_feed_page  # noqa: E402
+
+SIZES = [1000, 10000]
+
+
+def old_decode(body: bytes) -> list:
+    data = json.loads(body)
+    for story in data["stories"]:
+        if "time" in story:
+            story["time"] = datetime.utcfromtimestamp(story["time"] / 1000).isoformat()
+    return data["stories"]
+
+
+def old_output(stories: list) -> str:
+    return json.dumps({"stories": stories}, ensure_ascii=False)
+
+
+def new_decode(body: bytes) -> list:
+    return _decode_feed_page(body).stories
+
+
+def new_output(stories: list) -> str:
+    return json.dumps({"stories": [story.to_dict() for story in stories]}, ensure_ascii=False)
+
+
+def timed(func, arg, repeat) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(arg)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def retained_bytes(decode, body: bytes) -> int:
+    """
+    Memory still allocated after decoding `body`, i.e. held by the decoded stories
+    """
+    gc.collect()
+    tracemalloc.start()
+    stories = decode(body)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del stories
+    return size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Tickertick feed decoding.")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per measurement")
+    parser.add_argument("--output", default=None, help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    results = {"config": vars(args), "runs": []}
+    for size in SIZES:
+        body = json.dumps({"stories": make_stories("z:aapl", size)}).encode()
+        old_stories, new_stories = old_decode(body), new_decode(body)
+        per_1000 = 1000 / size
+        old_decode_s = timed(old_decode, body, args.repeat)
+        new_decode_s = timed(new_decode, body, args.repeat)
+        old_output_s = timed(old_output, old_stories, args.repeat)
+        new_output_s = timed(new_output, new_stories, args.repeat)
+        old_memory = retained_bytes(old_decode, body)
+        new_memory = retained_bytes(new_decode, body)
+        old_context = len(old_output(old_stories).encode())
+        new_context = len(new_output(new_stories).encode())
+        results["runs"].append({
+            "stories": size,
+            "body_bytes": len(body),
+            "old_decode_ms_per_1000": round(old_decode_s * 1e3 * per_1000, 3),
+            "new_decode_ms_per_1000": round(new_decode_s * 1e3 * per_1000, 3),
+            "old_output_ms_per_1000": round(old_output_s * 1e3 * per_1000, 3),
+            "new_output_ms_per_1000": round(new_output_s * 1e3 * per_1000, 3),
+            "old_memory_kb_per_1000": round(old_memory / 1024 * per_1000, 1),
+            "new_memory_kb_per_1000": round(new_memory / 1024 * per_1000, 1),
+            "old_output_kb_per_1000": round(old_context / 1024 * per_1000, 1),
+            "new_output_kb_per_1000": round(new_context / 1024 * per_1000, 1),
+            "decode_speedup": round(old_decode_s / new_decode_s, 1),
+        })
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+# benchmarks/stubs.py
+"""
+Stub upstream services for load testing.
+
+- TickertickStub serves /feed and /tickers with deterministic synthetic stories.
+- LLMStub speaks the OpenAI chat-completions protocol, so the llm service can run
+  unchanged with LLM_API_PROVIDER=OPENAI and OPENAI_BASE_URL pointing at it.
+
+Both add a configurable, seeded latency to every response.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+SITES = ["bloomberg.com", "reuters.com", "cnbc.com", "wsj.com", "ft.com", "marketwatch.com"]
+HEADLINE_TEMPLATES = [
+    "{ticker} beats quarterly earnings estimates",
+    "Analysts downgrade {ticker} on margin pressure",
+    "{ticker} announces new product line",
+    "Regulators open inquiry into {ticker}",
+    "{ticker} shares rally after guidance raise",
+    "{ticker} faces supply chain headwinds",
+]
+SENTIMENTS = ["Strongly Bearish", "Bearish", "Slightly Bearish", "Neutral",
+              "Slightly Bullish", "Bullish", "Strongly Bullish"]
+# Fixed epoch so story timestamps are identical between runs
+BASE_TIME_MS = 1_700_000_000_000
+
+
+class Latency:
+    """
+    Seeded latency model: a fixed mean with uniform jitter, in milliseconds.
+    """
+
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self) -> None:
+        with self._lock:
+            delay = self.mean_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+def _query_seed(text: str) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+def make_stories(query: str, limit: int, last_id: str = None) -> list:
+    """
+    Build Tickertick-shaped stories for a query; the same query always yields
+    the same stories, newest first, and last_id pages further back in time.
+    """
+    ticker = query.split(":", 1)[-1].strip("()").upper() or "MARKET"
+    offset = int(last_id.rsplit("-", 1)[-1]) + 1 if last_id else 0
+    rng = random.Random(_query_seed(query))
+    stories = []
+    for i in range(offset, offset + limit):
+        headline = HEADLINE_TEMPLATES[(rng.randrange(len(HEADLINE_TEMPLATES)) + i) % len(HEADLINE_TEMPLATES)]
+        site = SITES[i % len(SITES)]
+        stories.append({
+            "id": f"{_query_seed(query)}-{i}",
+            "title": headline.format(ticker=ticker),
+            "url": f"https://{site}/news/{ticker.lower()}-{i}",
+            "site": site,
+            "time": BASE_TIME_MS - i * 600_000,
+            "favicon_url": f"https://{site}/favicon.ico",
+            "tags": [f"${ticker.lower()}"],
+            "description": f"Synthetic story {i} about {ticker} for load testing.",
+            "similar_stories": [],
+        })
+    return stories
+
+
+class TickertickStub:
+    """
+    Minimal Tickertick API: GET /feed?q=&n=&last= and GET /tickers?p=&n=.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Latency = None):
+        self.latency = latency or Latency()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.latency.sleep()
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                if parsed.path == "/feed":
+                    limit = min(int(params.get("n", 30)), 1000)
+                    body = {"stories": make_stories(params.get("q", ""), limit, params.get("last"))}
+                elif parsed.path == "/tickers":
+                    prefix = params.get("p", "").upper()
+                    body = {"tickers": [
+                        {"ticker": f"{prefix}{i}" if i else prefix, "company_name": f"{prefix} Corp {i}"}
+                        for i in range(int(params.get("n", 5)))
+                    ]}
+                else:
+                    self.send_error(404)
+                    return
+                _send_json(self, 200, body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "TickertickStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _ticker_from_messages(messages: list) -> str:
+    for message in messages:
+        if message.get("role") == "user":
+            match = re.search(r"analyze is (\S+)", str(message.get("content", "")))
+            if match:
+                return match.group(1)
+    return "MARKET"
+
+
+def _analysis_from_messages(ticker: str, messages: list) -> dict:
+    """
+    Build a NewsAnalysis-shaped result from the tool output in the conversation.
+    """
+    stories = []
+    for message in messages:
+        if message.get("role") == "tool":
+            try:
+                stories.extend(json.loads(message.get("content") or "{}").get("stories", []))
+            except (ValueError, AttributeError):
+                continue
+    rows = ["| Time | Headline | Sentiment | Reason | Source |",
+            "|------|----------|-----------|--------|--------|"]
+    for i, story in enumerate(stories):
+        sentiment = SENTIMENTS[_query_seed(story.get("title", "")) % len(SENTIMENTS)]
+        rows.append(f"| {str(story.get('time', ''))[:16].replace('T', ' ')} | {story.get('title', '')} "
+                    f"| {sentiment} | Synthetic reason {i} | {story.get('site', 'Unknown')} |")
+    return {
+        "ticker": ticker,
+        "overall_sentiment": ["Bearish", "Neutral", "Bullish"][_query_seed(ticker) % 3],
+        "summary": f"Synthetic summary of {len(stories)} stories about {ticker}.",
+        "analysis": "\n".join(rows),
+    }
+
+
+class LLMStub:
+    """
+    OpenAI-compatible /v1/chat/completions that runs one ReAct round:
+    call get_ticker_news_tool, then answer, then emit the structured result.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: Latency = None):
+        self.latency = latency or Latency()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def complete(self, request: dict) -> dict:
+        messages = request.get("messages", [])
+        ticker = _ticker_from_messages(messages)
+        tools = request.get("tools") or []
+        tool_names = [t.get("function", {}).get("name") for t in tools]
+        has_tool_result = any(m.get("role") == "tool" for m in messages)
+        message = {"role": "assistant", "content": None}
+
+        if request.get("response_format"):
+            # Structured output via json_schema response format
+            message["content"] = json.dumps(_analysis_from_messages(ticker, messages))
+        elif tool_names == ["NewsAnalysis"]:
+            # Structured output via forced function calling
+            message["tool_calls"] = [_tool_call("NewsAnalysis", _analysis_from_messages(ticker, messages))]
+        elif tools and not has_tool_result:
+            message["tool_calls"] = [_tool_call("get_ticker_news_tool", {"ticker": ticker, "limit": 10})]
+        else:
+            message["content"] = f"Finished collecting news for {ticker}."
+
+        prompt_tokens = _estimate_tokens(json.dumps(messages))
+        completion_tokens = _estimate_tokens(json.dumps(message))
+        return {
+            "id": f"chatcmpl-{_query_seed(json.dumps(messages))}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                stub.latency.sleep()
+                _send_json(self, 200, stub.complete(request))
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "LLMStub":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+
+def _tool_call(name: str, arguments: dict) -> dict:
+    return {
+        "id": f"call_{_query_seed(name + json.dumps(arguments, sort_keys=True))}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(arguments)},
+    }
+
+
+def _send_json(handler: BaseHTTPRequestHandler, status: int, body: dict) -> None:
+    payload = json.dumps(body).encode()
+    handler.send_response(status)
+    handler.send_header("Content-Type", "application/json")
+    handler.send_header("Content-Length", str(len(payload)))
+    handler.end_headers()
+    handler.wfile.write(payload)
@@ -0,0 +1,88 @@
+"""
+Backfill of the rendered analysis HTML and search keywords for existing articles.
+
+New articles store `analysis_html` next to the markdown, rendered once by
+ArticleModel.create_article, with `analysis_renderer` set to the renderer
+version, and `analysis_keywords`, its distinct words for the search index. Articles
+written before that, or by an older renderer, are rendered on every read
+instead and cannot be found by search. This job renders them once and stores the result, in
+batches with a pause between them so it can run against a live database:
+
+    python -m common.backfill --batch-size 100 --pause-seconds 0.5
+
+It is safe to interrupt and re-run; each pass only touches articles whose
+stored HTML or search keywords are missing or out of date.
+"""
+
+import argparse
+import json
+import logging
+import threading
+from typing import Optional
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+
+from common.metrics import observe_mongo
+from common.models import compress_analysis, decompress_analysis
+from common.rendering import RENDERER_VERSION, keywords, render_analysis
+
+# Full articles whose stored HTML is missing or from another renderer version, or that have no search keywords
+OUTDATED = {"analysis": {"$ne": None},
+            "$or": [{"analysis_renderer": {"$ne": RENDERER_VERSION}}, {"analysis_keywords": {"$exists": False}}]}
+
+
+@observe_mongo("backfill_analysis_html")
+def _render_batch(collection: Collection, batch: list) -> int:
+    updates = []
+    for doc in batch:
+        rendered = render_analysis(decompress_analysis(doc["analysis"], doc.get("analysis_encoding")))
+        html, encoding = compress_analysis(rendered)
+        update = {"$set": {"analysis_html": html, "analysis_keywords": keywords(rendered),
+                           "analysis_renderer": RENDERER_VERSION}}
+        if encoding is None:
+            update["$unset"] = {"analysis_html_encoding": ""}
+        else:
+            update["$set"]["analysis_html_encoding"] = encoding
+        # Skip documents another pass has already updated
+        updates.append(UpdateOne(dict(OUTDATED, _id=doc["_id"]), update))
+    return collection.bulk_write(updates, ordered=False).modified_count
+
+
+def backfill_analysis_html(collection: Collection, batch_size: int = 100, pause_seconds: float = 0.0,
+                           stop: Optional[threading.Event] = None) -> int:
+    """
+    Render and store the analysis HTML of every outdated article and return how
+    many were updated. Setting `stop` ends the pass after the current batch.
+    """
+    stop = stop or threading.Event()
+    updated = 0
+    batch = []
+    cursor = collection.find(OUTDATED, {"analysis": 1, "analysis_encoding": 1}) \
+        .sort("_id", ASCENDING).batch_size(batch_size)
+    for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            updated += _render_batch(collection, batch)
+            batch = []
+            if stop.wait(pause_seconds):
+                break
+    if batch and not stop.is_set():
+        updated += _render_batch(collection, batch)
+    logging.info(f"Backfilled analysis HTML for {updated} articles (renderer {RENDERER_VERSION})")
+    return updated
+
+
+def main():
+    from common.models import MongoDBConnection
+
+    parser = argparse.ArgumentParser(description="Render and store the analysis HTML and search keywords of existing articles")
+    parser.add_argument("--batch-size", type=int, default=100, help="articles per batch")
+    parser.add_argument("--pause-seconds", type=float, default=0.5, help="pause between batches")
+    args = parser.parse_args()
+    updated = backfill_analysis_html(MongoDBConnection().get_collection("articles"), args.batch_size, args.pause_seconds)
+    print(json.dumps({"renderer": RENDERER_VERSION, "updated": updated}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Prometheus metrics shared by the web app and the llm service.
+
+Every collector is defined here so it is registered exactly once per process.
+Services expose them on /metrics through instrument_app().
+"""
+
+import functools
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from common.profiling import record_stage
+from common.tracing import tracer
+
+# Buckets for whole analyses, which take seconds to minutes
+ANALYSIS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+
+HTTP_REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP handler latency by route",
+    ["service", "method", "route", "status"],
+)
+ANALYZE_LATENCY = Histogram(
+    "analyze_news_duration_seconds",
+    "Total latency of analyze_news",
+    ["provider", "outcome"],
+    buckets=ANALYSIS_BUCKETS,
+)
+AGENT_STEPS = Histogram(
+    "analyze_news_agent_steps",
+    "Model calls made by the agent per analysis",
+    ["provider"],
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30),
+)
+TOOL_LATENCY = Histogram(
+    "agent_tool_call_duration_seconds",
+    "Latency of each agent tool call",
+    ["tool", "outcome"],
+)
+TICKERTICK_RESPONSES = Counter(
+    "tickertick_responses_total",
+    "Tickertick API responses by endpoint and HTTP status code",
+    ["endpoint", "status"],
+)
+MONGO_OP_LATENCY = Histogram(
+    "mongo_operation_duration_seconds",
+    "Latency of MongoDB operations by ArticleModel method",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "LLM tokens consumed by provider, model and direction (input/output)",
+    ["provider", "model", "direction"],
+)
+
+ANALYSIS_CACHE = Counter(
+    "analysis_cache_requests_total",
+    "Analyze requests answered from a fresh stored analysis (hit) or by running the agent (miss)",
+    ["result"],
+)
+PREWARM_REFRESHES = Counter(
+    "prewarm_refreshes_total",
+    "Background analysis refreshes by outcome (refreshed, failed, deferred_busy, deferred_budget)",
+    ["outcome"],
+)
+STORY_STORE_READS = Counter(
+    "story_store_reads_total",
+    "News tool feed reads answered from the local stories collection (hit) or fetched live (miss)",
+    ["result"],
+)
+STORIES_INGESTED = Counter(
+    "stories_ingested_total",
+    "New Tickertick stories stored by the ingestion worker",
+)
+
+
+def observe_mongo(operation: str):
+    """
+    Decorator recording the latency of a MongoDB operation under `operation`,
+    tracing it as a `mongo.<operation>` span and adding it to the profiled
+    request's `mongo` stage.
+    """
+    histogram = MONGO_OP_LATENCY.labels(operation=operation)
+    span_name = f"mongo.{operation}"
+    span_attributes = {"db.system": "mongodb", "db.operation": operation}
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with tracer.start_as_current_span(span_name, attributes=span_attributes):
+                    return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                histogram.observe(elapsed)
+                record_stage("mongo", elapsed)
+        return wrapper
+    return decorator
+
+
+def render_metrics() -> bytes:
+    """
+    Render all metrics in the Prometheus text format. With PROMETHEUS_MULTIPROC_DIR
+    set (multi-worker deployments), values from every worker process are merged.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def instrument_app(app, service: str) -> None:
+    """
+    Add per-route latency middleware and a /metrics endpoint to a FastAPI app.
+    """
+    # Imported here so common stays usable without the web stack installed
+    from starlette.responses import Response
+
+    @app.middleware("http")
+    async def record_request_latency(request, call_next):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = request.scope.get("route")
+            HTTP_REQUEST_LATENCY.labels(
+                service, request.method, getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - start)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
@@ -3,69 +3,324 @@ Module for MongoDB models & connection.
 """
 
 import os
+import threading
+import zlib
 from datetime import datetime, timedelta, timezone
-from pymongo import MongoClient, ASCENDING, DESCENDING
+from typing import Optional
+from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT, UpdateOne
 from pymongo.collection import Collection
 from pymongo.database import Database
-from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from bson import Binary, ObjectId
+from common.metrics import observe_mongo
+from common.rendering import RENDERER_VERSION, keywords, render_analysis
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+# MongoClient options read from the environment. Unset options keep pymongo's defaults.
+POOL_OPTIONS = {
+    "maxPoolSize": "MONGO_MAX_POOL_SIZE",
+    "minPoolSize": "MONGO_MIN_POOL_SIZE",
+    "maxIdleTimeMS": "MONGO_MAX_IDLE_TIME_MS",
+    "waitQueueTimeoutMS": "MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    "serverSelectionTimeoutMS": "MONGO_SERVER_SELECTION_TIMEOUT_MS",
+    "connectTimeoutMS": "MONGO_CONNECT_TIMEOUT_MS",
+    "socketTimeoutMS": "MONGO_SOCKET_TIMEOUT_MS",
+}
 
 class MongoDBConnection:
+    """
+    Process-wide connection manager. The MongoClient is created lazily on first
+    use and again in a forked child, so workers never share the parent's client.
+    """
     _instance = None
+    _lock = threading.Lock()
     _client: MongoClient = None
     _db: Database = None
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._connect()
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
 
     def _connect(self):
         uri = os.getenv("MONGO_URI", "mongodb://localhost:27017/mydb")
+        options = {}
+        for option, env_name in POOL_OPTIONS.items():
+            value = os.getenv(env_name)
+            if value:
+                options[option] = int(value)
         # store the client so you can ping it later
-        self._client = MongoClient(uri)
+        self._client = MongoClient(uri, **options)
         # extract the database name from the URI
         db_name = uri.rsplit('/', 1)[-1]
         self._db = self._client[db_name]
 
-    def get_collection(self, name: str) -> Collection:
-        return self._db[name]
+    @property
+    def client(self) -> MongoClient:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._connect()
+        return self._client
+
+    @property
+    def db(self) -> Database:
+        if self._db is None:
+            # Creating the client also selects the database
+            _ = self.client
+        return self._db
+
+    def get_collection(self, name: str) -> "LazyCollection":
+        return LazyCollection(self, name)
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # The parent's client and a lock held at fork time are unusable in the child
+        cls._lock = threading.Lock()
+        if cls._instance is not None:
+            cls._instance._client = None
+            cls._instance._db = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=MongoDBConnection._reset_after_fork)
+
+
+class LazyCollection:
+    """
+    Collection handle resolved against the current process's client on use,
+    so module-level handles stay valid across forks and before the first query.
+    """
+
+    def __init__(self, connection: MongoDBConnection, name: str):
+        self._connection = connection
+        self._name = name
+        self._resolved = (None, None)
+
+    def resolve(self) -> Collection:
+        client, collection = self._resolved
+        if client is None or client is not self._connection.client:
+            collection = self._connection.db[self._name]
+            self._resolved = (self._connection.client, collection)
+        return collection
+
+    def __getattr__(self, attr):
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self._name!r})"
+
+def compress_analysis(text: str, codec: str = None):
+    """
+    Compress an analysis body for storage. Returns (value, encoding), where the
+    encoding is None when the text is stored as is.
+    """
+    codec = (codec or os.getenv("ANALYSIS_COMPRESSION", "zlib")).lower()
+    min_bytes = int(os.getenv("ANALYSIS_COMPRESSION_MIN_BYTES", "512"))
+    raw = text.encode("utf-8")
+    if codec == "none" or len(raw) < min_bytes:
+        return text, None
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("ANALYSIS_COMPRESSION=zstd requires the zstandard package")
+        return Binary(zstandard.ZstdCompressor(level=9).compress(raw)), "zstd"
+    if codec == "zlib":
+        return Binary(zlib.compress(raw, 9)), "zlib"
+    raise ValueError(f"Invalid ANALYSIS_COMPRESSION {codec}")
+
+
+def decompress_analysis(value, encoding: str = None) -> str:
+    """
+    Decode an analysis body stored by compress_analysis.
+    """
+    if encoding is None:
+        return value
+    if encoding == "zlib":
+        return zlib.decompress(value).decode("utf-8")
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("Reading zstd analyses requires the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    raise ValueError(f"Unknown analysis encoding {encoding}")
+
 
 # Schema and helper functions for the articles collection
 class ArticleModel:
     """
     Class for handling article data stored in MongoDB
     """
+    # Projection for list views that do not show the analysis body
+    WITHOUT_ANALYSIS = {"analysis": 0, "analysis_encoding": 0, "analysis_html": 0, "analysis_html_encoding": 0,
+                        "analysis_keywords": 0}
+    # Storage details that are not part of the API view
+    _INTERNAL_FIELDS = ("analysis_encoding", "analysis_html_encoding", "analysis_renderer", "analysis_keywords")
+    # Overall sentiment labels the analysis prompt asks for
+    SENTIMENTS = ("Bearish", "Neutral", "Bullish")
+    # How far back the time_range filters of the trending and search queries reach
+    TIME_RANGES = {"24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+
     @staticmethod
     def create_article(ticker: str, overall_sentiment: str, summary: str, analysis: str) -> dict:
         """
-        Create a new article document
+        Create a new article document.
+        The analysis markdown is rendered to sanitized HTML once, here, and stored
+        with the version of the renderer that produced it. A bounded list of its
+        distinct words is kept for the text index, which cannot read the compressed fields.
         """
+        analysis_html = render_analysis(analysis)
         article = {
             "ticker": ticker.upper(),
             "summary": summary,
             "analysis": analysis,
+            "analysis_html": analysis_html,
+            "analysis_keywords": keywords(analysis_html),
+            "analysis_renderer": RENDERER_VERSION,
             "overall_sentiment": overall_sentiment,
             "created_at": datetime.utcnow()
         }
         return article
     
     @staticmethod
-    def get_articles_by_ticker(collection: Collection, ticker: str) -> list:
+    def ensure_indexes(collection: Collection) -> None:
+        """
+        Create the indexes behind the per-ticker, trending and search queries
+        """
+        collection.create_index([("ticker", ASCENDING), ("created_at", DESCENDING)])
+        collection.create_index([("created_at", DESCENDING)])
+        # Covers the sentiment history query, so it never reads the article bodies
+        collection.create_index([("ticker", ASCENDING), ("created_at", ASCENDING), ("overall_sentiment", ASCENDING)])
+        # A collection has at most one text index; matches in the summary count most
+        collection.create_index([("summary", TEXT), ("analysis_keywords", TEXT)],
+                                weights={"summary": 10, "analysis_keywords": 2}, name="article_text")
+
+    @staticmethod
+    @observe_mongo("insert_article")
+    def insert_article(collection: Collection, article: dict):
+        """
+        Insert an article document and return the InsertOneResult.
+        The analysis body and its HTML are stored compressed (see compress_analysis).
+        """
+        stored = dict(article)
+        for field in ("analysis", "analysis_html"):
+            if isinstance(article.get(field), str):
+                value, encoding = compress_analysis(article[field])
+                if encoding is not None:
+                    stored[field] = value
+                    stored[f"{field}_encoding"] = encoding
+        return collection.insert_one(stored)
+    
+    @staticmethod
+    @observe_mongo("get_articles_by_ticker")
+    def get_articles_by_ticker(collection: Collection, ticker: str, include_analysis: bool = True,
+                               since: Optional[datetime] = None) -> list:
         """
-        Get all articles for a specific ticker
+        Get all articles for a specific ticker, or only those created after `since`
         """
-        return list(collection.find({"ticker": ticker.upper()}).sort("created_at", DESCENDING))
+        query = {"ticker": ticker.upper()}
+        if since is not None:
+            query["created_at"] = {"$gt": since}
+        cursor = collection.find(query) if include_analysis else collection.find(query, ArticleModel.WITHOUT_ANALYSIS)
+        return list(cursor.sort("created_at", DESCENDING))
     
     @staticmethod
-    def format_article(article: dict) -> dict:
+    @observe_mongo("get_sentiment_history")
+    def get_sentiment_history(collection: Collection, ticker: str, since: Optional[datetime] = None) -> list:
         """
-        Format article for API response
+        (created_at, overall_sentiment) of every article for a ticker, oldest first,
+        or only of those created at or after `since`. Answered from the index alone.
         """
+        query = {"ticker": ticker.upper()}
+        if since is not None:
+            query["created_at"] = {"$gte": since}
+        cursor = collection.find(query, {"_id": 0, "created_at": 1, "overall_sentiment": 1})
+        return [(doc["created_at"], doc.get("overall_sentiment")) for doc in cursor.sort("created_at", ASCENDING)]
+
+    @staticmethod
+    @observe_mongo("get_latest_article")
+    def get_latest_article(collection: Collection, ticker: str, projection: Optional[dict] = None) -> Optional[dict]:
+        """
+        Get the newest article for a ticker, or None. Served by the (ticker, created_at) index.
+        """
+        return collection.find_one({"ticker": ticker.upper()}, projection, sort=[("created_at", DESCENDING)])
+
+    @staticmethod
+    def latest_pipeline(tickers: list) -> list:
+        """
+        Build the aggregation returning the newest article's sentiment and summary for each ticker.
+        The $sort matches the (ticker, created_at) index, so $group can take the first
+        article of each ticker from it instead of sorting every matching article.
+        """
+        return [
+            {"$match": {"ticker": {"$in": [ticker.upper() for ticker in tickers]}}},
+            {"$sort": {"ticker": ASCENDING, "created_at": DESCENDING}},
+            {"$group": {
+                "_id": "$ticker",
+                "id": {"$first": "$_id"},
+                "overall_sentiment": {"$first": "$overall_sentiment"},
+                "summary": {"$first": "$summary"},
+                "created_at": {"$first": "$created_at"},
+            }},
+            {"$project": {"_id": 0, "ticker": "$_id", "id": 1, "overall_sentiment": 1, "summary": 1, "created_at": 1}},
+        ]
+
+    @staticmethod
+    @observe_mongo("get_latest_articles")
+    def get_latest_articles(collection: Collection, tickers: list) -> dict:
+        """
+        The newest article of each of `tickers` in one round trip, by ticker.
+        Tickers without articles are left out.
+        """
+        return {doc["ticker"]: doc for doc in collection.aggregate(ArticleModel.latest_pipeline(tickers))}
+
+    @staticmethod
+    @observe_mongo("get_article_created_at")
+    def get_article_created_at(collection: Collection, ticker: str, article_id: ObjectId) -> Optional[datetime]:
+        """
+        Get the creation time of one of the ticker's articles, or None if there is no such article
+        """
+        article = collection.find_one({"_id": article_id, "ticker": ticker.upper()}, {"created_at": 1})
+        return article["created_at"] if article else None
+
+    @staticmethod
+    def view(article: dict, include_analysis: bool = True) -> dict:
+        """
+        Shallow copy of an article for API responses, with `_id` renamed to `id`.
+        ObjectId and datetime values are left for common.serialization.dumps.
+        """
+        view = {}
+        for key, value in article.items():
+            if key == "_id":
+                view["id"] = value
+            elif key in ("analysis", "analysis_html"):
+                # Decompress the analysis only when the response includes it
+                if include_analysis and value is not None:
+                    view[key] = decompress_analysis(value, article.get(f"{key}_encoding"))
+                elif include_analysis:
+                    view[key] = None
+            elif key not in ArticleModel._INTERNAL_FIELDS:
+                view[key] = value
+        if include_analysis and view.get("analysis") is not None \
+                and article.get("analysis_renderer") != RENDERER_VERSION:
+            # Stored before analysis_html existed or by an older renderer (see common.backfill)
+            view["analysis_html"] = render_analysis(view["analysis"])
+        return view
+
+    @staticmethod
+    def format_article(article: dict, include_analysis: bool = True) -> dict:
+        """
+        Format article for API response, without modifying the given document
+        """
+        article = ArticleModel.view(article, include_analysis)
+
         # Convert ObjectId to string for JSON serialization
-        if "_id" in article:
-            article["id"] = str(article["_id"])
-            del article["_id"]
+        if "id" in article:
+            article["id"] = str(article["id"])
             
         # Format datetime to ISO string with UTC indicator for JSON serialization
         if "created_at" in article and isinstance(article["created_at"], datetime):
@@ -76,7 +331,9 @@ class ArticleModel:
         return article
         
     @staticmethod
-    def get_trending_articles(collection: Collection, time_range: str = None, limit: int = 10) -> list:
+    @observe_mongo("get_trending_articles")
+    def get_trending_articles(collection: Collection, time_range: str = None, limit: int = 10,
+                              include_analysis: bool = True) -> list:
         """
         Get recent articles based on time range
         
@@ -84,6 +341,7 @@ class ArticleModel:
             collection: MongoDB collection to query
             time_range: One of "24h", "7d", "30d" or None (for all)
             limit: Maximum number of articles to return (default 10)
+            include_analysis: Whether to fetch the analysis body (default True)
         
         Returns:
             List of articles sorted by creation date (most recent first)
@@ -91,24 +349,248 @@ class ArticleModel:
         query = {}
         
         # Apply time filter if specified
-        if time_range:
-            current_time = datetime.utcnow()
-            
-            if time_range == "24h":
-                since = current_time - timedelta(hours=24)
-            elif time_range == "7d":
-                since = current_time - timedelta(days=7)
-            elif time_range == "30d":
-                since = current_time - timedelta(days=30)
-            else:
-                since = None
-                
-            if since:
-                query["created_at"] = {"$gte": since}
+        if time_range in ArticleModel.TIME_RANGES:
+            query["created_at"] = {"$gte": datetime.utcnow() - ArticleModel.TIME_RANGES[time_range]}
         
         # Execute query sorted by time (newest first) with limit
+        cursor = collection.find(query) if include_analysis else collection.find(query, ArticleModel.WITHOUT_ANALYSIS)
         return list(
-            collection.find(query)
+            cursor
             .sort("created_at", DESCENDING)
             .limit(limit)
-        )
\ No newline at end of file
+        )
+
+    @staticmethod
+    @observe_mongo("search_articles")
+    def search_articles(collection: Collection, text: str, ticker: Optional[str] = None,
+                        sentiment: Optional[str] = None, time_range: Optional[str] = None,
+                        skip: int = 0, limit: int = 20) -> list:
+        """
+        Articles matching `text` in their summary or analysis, best match first
+        and newest first among equal scores, without the analysis body.
+
+        `text` uses MongoDB text search syntax: words match any of them after
+        stemming, "quoted phrases" must all appear and -word excludes. The
+        text index finds the matches; ticker, sentiment and time_range narrow them.
+        Each result carries its relevance as `score`.
+        """
+        query = {"$text": {"$search": text}}
+        if ticker:
+            query["ticker"] = ticker.upper()
+        if sentiment:
+            query["overall_sentiment"] = sentiment
+        if time_range in ArticleModel.TIME_RANGES:
+            query["created_at"] = {"$gte": datetime.utcnow() - ArticleModel.TIME_RANGES[time_range]}
+        projection = dict(ArticleModel.WITHOUT_ANALYSIS, score={"$meta": "textScore"})
+        return list(
+            collection.find(query, projection)
+            .sort([("score", {"$meta": "textScore"}), ("created_at", DESCENDING)])
+            .skip(skip)
+            .limit(limit)
+        )
+
+# Schema and helper functions for the analysis_runs collection
+class AnalysisRunModel:
+    """
+    Class for handling the performance record of each analysis, linked to its article
+    """
+    # Fields that stats can be grouped by, mapped to their aggregation expression
+    GROUP_FIELDS = {
+        "provider": "$provider",
+        "model": "$model",
+        "ticker": "$ticker",
+        "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+    }
+    STAGES = ("agent", "llm", "tools", "insert", "total")
+
+    @staticmethod
+    def create_run(article_id, ticker: str, provider: str, model: str, stage_seconds: dict,
+                   agent_steps: int, tool_calls: int, input_tokens: int, output_tokens: int) -> dict:
+        """
+        Create a new analysis run document
+        """
+        return {
+            "article_id": article_id,
+            "ticker": ticker.upper(),
+            "provider": provider,
+            "model": model,
+            "stage_seconds": stage_seconds,
+            "agent_steps": agent_steps,
+            "tool_calls": tool_calls,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "created_at": datetime.utcnow()
+        }
+
+    @staticmethod
+    def ensure_indexes(collection: Collection) -> None:
+        """
+        Create the index behind the time window of the stats query
+        """
+        collection.create_index([("created_at", DESCENDING)])
+
+    @staticmethod
+    @observe_mongo("insert_run")
+    def insert_run(collection: Collection, run: dict):
+        """
+        Insert an analysis run document and return the InsertOneResult
+        """
+        return collection.insert_one(run)
+
+    @staticmethod
+    def stats_pipeline(group_by: list, days: int) -> list:
+        """
+        Build the aggregation computing latency percentiles and token usage per group
+        """
+        percentiles = {"input": "$stage_seconds.total", "p": [0.5, 0.95, 0.99], "method": "approximate"}
+        group = {
+            "_id": {field: AnalysisRunModel.GROUP_FIELDS[field] for field in group_by},
+            "runs": {"$sum": 1},
+            "latency": {"$percentile": percentiles},
+            "avg_agent_steps": {"$avg": "$agent_steps"},
+            "avg_tool_calls": {"$avg": "$tool_calls"},
+            "input_tokens": {"$sum": "$input_tokens"},
+            "output_tokens": {"$sum": "$output_tokens"},
+            "avg_total_tokens": {"$avg": "$total_tokens"},
+        }
+        for stage in AnalysisRunModel.STAGES:
+            group[f"p95_{stage}"] = {"$percentile": {**percentiles, "input": f"$stage_seconds.{stage}", "p": [0.95]}}
+
+        return [
+            {"$match": {"created_at": {"$gte": datetime.utcnow() - timedelta(days=days)}}},
+            {"$group": group},
+            {"$sort": {f"_id.{field}": ASCENDING for field in group_by}},
+            {"$project": {
+                "_id": 0,
+                **{field: f"$_id.{field}" for field in group_by},
+                "runs": 1,
+                "p50_seconds": {"$arrayElemAt": ["$latency", 0]},
+                "p95_seconds": {"$arrayElemAt": ["$latency", 1]},
+                "p99_seconds": {"$arrayElemAt": ["$latency", 2]},
+                "stage_p95_seconds": {stage: {"$arrayElemAt": [f"$p95_{stage}", 0]} for stage in AnalysisRunModel.STAGES},
+                "avg_agent_steps": 1,
+                "avg_tool_calls": 1,
+                "input_tokens": 1,
+                "output_tokens": 1,
+                "avg_total_tokens": 1,
+            }},
+        ]
+
+    @staticmethod
+    @observe_mongo("get_run_stats")
+    def get_run_stats(collection: Collection, group_by: list, days: int = 7) -> list:
+        """
+        Get p50/p95/p99 latency and token usage of recent analyses
+
+        Args:
+            collection: MongoDB collection to query
+            group_by: Fields from GROUP_FIELDS to group by, e.g. ["provider", "day"]
+            days: Only include analyses from the last `days` days
+
+        Returns:
+            One document per group, sorted by the group fields
+        """
+        return list(collection.aggregate(AnalysisRunModel.stats_pipeline(group_by, days)))
+
+
+class StoryModel:
+    """
+    Class for handling Tickertick stories ingested into the local `stories`
+    collection, and the poll state of each ingested feed query in `story_feeds`.
+
+    A story is stored once, keyed by its Tickertick id, with the list of feed
+    queries it arrived through so each query can be answered locally.
+    """
+    DUPLICATE_KEY = 11000
+
+    @staticmethod
+    def create_story(story: dict) -> dict:
+        """
+        Create a story document from a Tickertick story whose `time` is an ISO string (see get_feed)
+        """
+        doc = {key: value for key, value in story.items() if key not in ("id", "time")}
+        doc["story_id"] = story["id"]
+        if "time" in story:
+            doc["time"] = datetime.fromisoformat(story["time"])
+        doc["ingested_at"] = datetime.utcnow()
+        return doc
+
+    @staticmethod
+    def to_feed(doc: dict) -> dict:
+        """
+        Turn a stored story back into the shape get_feed returns
+        """
+        story = {key: value for key, value in doc.items()
+                 if key not in ("_id", "story_id", "time", "queries", "ingested_at")}
+        story["id"] = doc["story_id"]
+        if "time" in doc:
+            story["time"] = doc["time"].isoformat()
+        return story
+
+    @staticmethod
+    def ensure_indexes(collection: Collection, feeds: Collection, retention_days: float = 30) -> None:
+        """
+        Create the unique story id index, the per-query read index, and a TTL
+        index that drops stories `retention_days` after they were published
+        """
+        collection.create_index([("story_id", ASCENDING)], unique=True)
+        collection.create_index([("queries", ASCENDING), ("time", DESCENDING)])
+        collection.create_index([("time", ASCENDING)], expireAfterSeconds=int(retention_days * 86400))
+
+    @staticmethod
+    @observe_mongo("upsert_stories")
+    def upsert_stories(collection: Collection, query: str, stories: list) -> int:
+        """
+        Store Tickertick stories seen through `query` with one unordered bulk
+        upsert and return how many were new. Stories already stored only gain the query.
+        """
+        if not stories:
+            return 0
+        docs = [StoryModel.create_story(story) for story in stories]
+        updates = [
+            UpdateOne({"story_id": doc["story_id"]}, {"$setOnInsert": doc, "$addToSet": {"queries": query}}, upsert=True)
+            for doc in docs
+        ]
+        try:
+            return collection.bulk_write(updates, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Two writers upserting the same new story race on the unique index and one insert wins.
+            # The story exists now, so the losers only need to add the query to it.
+            errors = e.details["writeErrors"]
+            if any(error["code"] != StoryModel.DUPLICATE_KEY for error in errors):
+                raise
+            collection.bulk_write([
+                UpdateOne({"story_id": docs[error["index"]]["story_id"]}, {"$addToSet": {"queries": query}})
+                for error in errors
+            ], ordered=False)
+            return e.details["nUpserted"]
+
+    @staticmethod
+    @observe_mongo("get_stories")
+    def get_stories(collection: Collection, query: str, limit: int = 30) -> list:
+        """
+        Get the newest stored stories for a feed query, in the shape get_feed returns
+        """
+        cursor = collection.find({"queries": query}).sort("time", DESCENDING).limit(limit)
+        return [StoryModel.to_feed(doc) for doc in cursor]
+
+    @staticmethod
+    @observe_mongo("get_feed_state")
+    def get_feed_state(feeds: Collection, query: str) -> Optional[dict]:
+        """
+        Get the poll state of a feed query: its cursor (newest story id and
+        time) and when it was last polled, or None if it was never polled
+        """
+        return feeds.find_one({"_id": query})
+
+    @staticmethod
+    @observe_mongo("set_feed_state")
+    def set_feed_state(feeds: Collection, query: str, cursor: Optional[str], cursor_time: Optional[datetime]) -> None:
+        """
+        Record a completed poll of a feed query, moving its cursor when it saw newer stories
+        """
+        update = {"polled_at": datetime.utcnow()}
+        if cursor is not None:
+            update.update({"cursor": cursor, "cursor_time": cursor_time})
+        feeds.update_one({"_id": query}, {"$set": update}, upsert=True)
@@ -0,0 +1,154 @@
+"""
+On-demand request profiling shared by the web app and the llm service.
+
+A request is profiled when it carries the X-Profile-Token header matching
+PROFILING_TOKEN, or for one in every PROFILING_SAMPLE_EVERY requests. While it
+runs, a sampling profiler records the stacks of every thread in the process, so
+agent tools running on worker threads are included. The samples are written as
+collapsed stacks ("frame;frame;frame count" lines), which flamegraph.pl,
+speedscope and inferno read directly, and the response gets a Server-Timing
+header with the stage durations:
+
+    PROFILING_TOKEN          shared secret that enables profiling per request
+    PROFILING_SAMPLE_EVERY   profile 1 in N requests; 0 disables (default 0)
+    PROFILING_DIR            directory for .folded output (default profiles)
+    PROFILING_INTERVAL_MS    sampling interval (default 5)
+
+With neither PROFILING_TOKEN nor PROFILING_SAMPLE_EVERY set no middleware is
+installed, and stage() reduces to a context variable lookup.
+"""
+
+import hmac
+import itertools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Optional
+
+PROFILE_HEADER = "X-Profile-Token"
+
+# Stage durations (seconds) of the request being profiled, None otherwise
+_stage_timings: ContextVar[Optional[dict]] = ContextVar("stage_timings", default=None)
+
+
+def record_stage(name: str, seconds: float) -> None:
+    """
+    Add `seconds` to stage `name` of the request being profiled, if any.
+    """
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time the enclosed block as stage `name` of the request being profiled.
+    """
+    if _stage_timings.get() is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+def format_server_timing(timings: dict) -> str:
+    """
+    Format stage durations as a Server-Timing header value (milliseconds).
+    """
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
+
+
+class StackSampler:
+    """
+    Sampling profiler counting the collapsed stacks of all other threads.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiling-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def write(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def instrument_profiling(app, service: str) -> bool:
+    """
+    Add the profiling middleware to a FastAPI app when profiling is configured.
+    Returns True when the middleware was installed.
+    """
+    token = os.getenv("PROFILING_TOKEN", "")
+    sample_every = int(os.getenv("PROFILING_SAMPLE_EVERY", "0"))
+    if not token and sample_every <= 0:
+        return False
+
+    directory = os.getenv("PROFILING_DIR", "profiles")
+    interval = float(os.getenv("PROFILING_INTERVAL_MS", "5")) / 1000
+    os.makedirs(directory, exist_ok=True)
+    counter = itertools.count(1)
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        requested = bool(token) and hmac.compare_digest(request.headers.get(PROFILE_HEADER, ""), token)
+        sampled = sample_every > 0 and next(counter) % sample_every == 0
+        if not requested and not sampled:
+            return await call_next(request)
+
+        timings = {}
+        context_token = _stage_timings.set(timings)
+        sampler = StackSampler(interval)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+            _stage_timings.reset(context_token)
+        timings["total"] = time.perf_counter() - start
+
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", request.url.path).strip("_") or "root"
+        path = os.path.join(directory, f"{service}-{datetime.utcnow():%Y%m%dT%H%M%S%f}-{request.method}-{slug}.folded")
+        sampler.write(path)
+        logging.info(f"Profiled {request.method} {request.url.path} in {timings['total']:.3f}s: {path}")
+
+        response.headers["Server-Timing"] = format_server_timing(timings)
+        return response
+
+    logging.info(f"Request profiling enabled for {service}: output in {directory}")
+    return True
@@ -0,0 +1,85 @@
+"""
+Server-side rendering of analysis markdown to sanitized HTML.
+
+The LLM writes each analysis as markdown with a table of news items. The
+browser used to run marked over it on every view; render_analysis() produces
+the equivalent HTML with Python-Markdown (GFM-style tables) and then passes it
+through nh3, so model output can be inserted into pages without escaping.
+plain_text() reduces that HTML to the words a reader sees, and keywords() to a
+bounded list of its distinct words for the text index.
+"""
+
+import html
+import re
+
+import markdown
+import nh3
+
+# Bump when the output of render_analysis changes
+RENDERER_VERSION = 1
+
+_EXTENSIONS = ["tables", "sane_lists"]
+_TAGS = {
+    "a", "b", "blockquote", "br", "code", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr",
+    "i", "li", "ol", "p", "pre", "strong", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+_ATTRIBUTES = {"a": {"href", "title"}, "td": {"align", "style"}, "th": {"align", "style"}}
+# Tags in sanitized HTML, which nh3 leaves well-formed with attribute values escaped
+_TAG = re.compile(r"<[^>]*>")
+_WHITESPACE = re.compile(r"\s+")
+_WORD = re.compile(r"[^\W_]+(?:['&.-][^\W_]+)*")
+# Words every analysis repeats, and English words the text index ignores anyway
+_STOP_WORDS = frozenset("""
+    a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+    time headline sentiment reason source bullish bearish neutral slightly strongly
+""".split())
+# Links, which the Source column may hold instead of a site name
+_URL = re.compile(r"(?:https?://|www\.)\S+")
+# Numbers, dates and times (the Time column) and domains (the Source column) are
+# not worth searching for, and would use up the keyword budget before the headlines do
+_NOISE = re.compile(r"\d[\d.,:/-]*(?:t\d[\d.:]*)?|[a-z0-9-]{2,}(?:\.[a-z0-9-]+)*\.[a-z]{2,}")
+# Upper bound on the keywords stored with each article
+KEYWORDS_MAX_CHARS = 512
+
+
+def render_analysis(text: str) -> str:
+    """
+    Render analysis markdown to HTML that is safe to insert into a page.
+    """
+    html = markdown.markdown(text or "", extensions=_EXTENSIONS, output_format="html")
+    return nh3.clean(
+        html,
+        tags=_TAGS,
+        attributes=_ATTRIBUTES,
+        url_schemes={"http", "https", "mailto"},
+        link_rel="noopener noreferrer nofollow",
+        filter_style_properties={"text-align"},
+    )
+
+
+def plain_text(html_text: str) -> str:
+    """
+    The visible text of HTML from render_analysis, with tags replaced by spaces
+    so table cells do not run together.
+    """
+    return _WHITESPACE.sub(" ", html.unescape(_TAG.sub(" ", html_text or ""))).strip()
+
+
+def keywords(html_text: str, max_chars: int = KEYWORDS_MAX_CHARS) -> str:
+    """
+    The distinct words of HTML from render_analysis, lower-cased, in order of
+    first appearance and cut at a word boundary to at most `max_chars`. Links,
+    numbers, dates, times and domains are left out.
+    """
+    seen = set()
+    words = []
+    length = -1
+    for word in _WORD.findall(_URL.sub(" ", plain_text(html_text).lower())):
+        if word in seen or word in _STOP_WORDS or _NOISE.fullmatch(word):
+            continue
+        if length + 1 + len(word) > max_chars:
+            break
+        seen.add(word)
+        words.append(word)
+        length += 1 + len(word)
+    return " ".join(words)
@@ -0,0 +1,238 @@
+"""
+Retention policy and compaction for the articles collection.
+
+Every analysis stores a full markdown body, which dominates the collection's
+size. An article keeps its body while it is one of the newest
+RETENTION_KEEP_PER_TICKER articles for its ticker or younger than
+RETENTION_KEEP_DAYS; older ones are compacted in place to a summary record
+(ticker, sentiment, summary, timestamps) by unsetting `analysis`. With
+RETENTION_ARCHIVE_TTL_DAYS the removed bodies are first copied to the
+article_archive collection, where a TTL index expires them.
+
+Work is done per ticker in batches of RETENTION_BATCH_SIZE with a pause of
+RETENTION_PAUSE_SECONDS between batches, so a pass never floods the server:
+
+    RETENTION_KEEP_PER_TICKER     full analyses kept per ticker (unset: no count rule)
+    RETENTION_KEEP_DAYS           full analyses kept for this many days (unset: no age rule)
+    RETENTION_ARCHIVE_TTL_DAYS    keep compacted bodies in article_archive this long (unset: drop)
+    RETENTION_BATCH_SIZE          documents per batch (default 100)
+    RETENTION_PAUSE_SECONDS       pause between batches (default 0.5)
+    RETENTION_INTERVAL_SECONDS    time between background passes (default 3600)
+
+Retention is off unless at least one of the two keep rules is set.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional
+
+import bson
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from common.metrics import observe_mongo
+
+
+# Name of the TTL index on article_archive
+ARCHIVE_TTL_INDEX = "archived_at_ttl"
+
+
+@dataclass
+class RetentionPolicy:
+    keep_per_ticker: Optional[int] = None
+    keep_days: Optional[float] = None
+    archive_ttl_days: Optional[float] = None
+    batch_size: int = 100
+    pause_seconds: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        def optional(name, cast):
+            value = os.getenv(name)
+            return cast(value) if value else None
+
+        return cls(
+            keep_per_ticker=optional("RETENTION_KEEP_PER_TICKER", int),
+            keep_days=optional("RETENTION_KEEP_DAYS", float),
+            archive_ttl_days=optional("RETENTION_ARCHIVE_TTL_DAYS", float),
+            batch_size=int(os.getenv("RETENTION_BATCH_SIZE", "100")),
+            pause_seconds=float(os.getenv("RETENTION_PAUSE_SECONDS", "0.5")),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.keep_per_ticker is not None or self.keep_days is not None
+
+
+@dataclass
+class RetentionReport:
+    tickers: int = 0
+    compacted: int = 0
+    archived: int = 0
+    # BSON size of the removed analysis bodies
+    reclaimed_bytes: int = 0
+    errors: list = field(default_factory=list)
+
+
+def ensure_archive_indexes(archive: Collection, ttl_days: float) -> None:
+    """
+    Create the TTL index that expires archived bodies after `ttl_days`, or change
+    its expiry with collMod when RETENTION_ARCHIVE_TTL_DAYS changed since it was
+    created (create_index would fail with IndexOptionsConflict instead).
+    """
+    seconds = int(ttl_days * 86400)
+    for name, info in archive.index_information().items():
+        # Matched by key, as indexes created before the index had a name are called archived_at_1
+        if [key for key, _ in info["key"]] == ["archived_at"]:
+            if info.get("expireAfterSeconds") != seconds:
+                archive.database.command("collMod", archive.name, index={"name": name, "expireAfterSeconds": seconds})
+            return
+    archive.create_index([("archived_at", ASCENDING)], expireAfterSeconds=seconds, name=ARCHIVE_TTL_INDEX)
+
+
+def _candidates(collection: Collection, ticker: str, policy: RetentionPolicy, now: datetime):
+    """
+    Cursor over the full articles of `ticker` that fall outside both keep rules, newest first.
+    """
+    query = {"ticker": ticker, "compacted": {"$ne": True}}
+    if policy.keep_days is not None:
+        query["created_at"] = {"$lt": now - timedelta(days=policy.keep_days)}
+    cursor = collection.find(query, {"analysis": 1, "analysis_encoding": 1, "analysis_html": 1, "analysis_keywords": 1,
+                                     "ticker": 1, "created_at": 1}) \
+        .sort("created_at", DESCENDING).batch_size(policy.batch_size)
+
+    if policy.keep_per_ticker is not None:
+        # The newest K are kept whatever their age, so skip those that also match the age rule
+        newer = 0
+        if policy.keep_days is not None:
+            newer = collection.count_documents(
+                {"ticker": ticker, "created_at": {"$gte": query["created_at"]["$lt"]}},
+                limit=policy.keep_per_ticker,
+            )
+        cursor = cursor.skip(max(0, policy.keep_per_ticker - newer))
+    return cursor
+
+
+@observe_mongo("compact_batch")
+def _compact_batch(collection: Collection, archive: Optional[Collection], batch: list,
+                   now: datetime, report: RetentionReport) -> None:
+    if archive is not None:
+        archived = [{
+            "_id": doc["_id"],
+            "ticker": doc.get("ticker"),
+            "analysis": doc.get("analysis"),
+            "analysis_encoding": doc.get("analysis_encoding"),
+            "created_at": doc.get("created_at"),
+            "archived_at": now,
+        } for doc in batch if doc.get("analysis") is not None]
+        if archived:
+            try:
+                report.archived += len(archive.insert_many(archived, ordered=False).inserted_ids)
+            except BulkWriteError as e:
+                # Already archived by an earlier, interrupted pass
+                report.archived += e.details.get("nInserted", 0)
+
+    collection.bulk_write([
+        UpdateOne({"_id": doc["_id"]}, {
+            "$unset": {"analysis": "", "analysis_encoding": "", "analysis_html": "", "analysis_html_encoding": "",
+                       "analysis_renderer": "", "analysis_keywords": ""},
+            "$set": {"compacted": True, "compacted_at": now},
+        })
+        for doc in batch
+    ], ordered=False)
+    report.compacted += len(batch)
+    report.reclaimed_bytes += sum(
+        len(bson.encode({k: doc[k] for k in ("analysis", "analysis_html", "analysis_keywords") if k in doc}))
+        for doc in batch if doc.get("analysis") is not None)
+
+
+def run_retention(collection: Collection, policy: RetentionPolicy, archive: Optional[Collection] = None,
+                  stop: Optional[threading.Event] = None) -> RetentionReport:
+    """
+    Run one incremental retention pass over every ticker and return what it did.
+    Setting `stop` ends the pass after the current batch.
+    """
+    report = RetentionReport()
+    if not policy.enabled:
+        return report
+    stop = stop or threading.Event()
+    now = datetime.utcnow()
+    if policy.archive_ttl_days is None:
+        archive = None
+    elif archive is not None:
+        ensure_archive_indexes(archive, policy.archive_ttl_days)
+
+    for ticker in collection.distinct("ticker"):
+        if stop.is_set():
+            break
+        report.tickers += 1
+        try:
+            batch = []
+            for doc in _candidates(collection, ticker, policy, now):
+                batch.append(doc)
+                if len(batch) >= policy.batch_size:
+                    _compact_batch(collection, archive, batch, now, report)
+                    batch = []
+                    if stop.wait(policy.pause_seconds):
+                        break
+            if batch and not stop.is_set():
+                _compact_batch(collection, archive, batch, now, report)
+        except PyMongoError as e:
+            logging.error(f"Retention failed for ticker {ticker}: {e}")
+            report.errors.append(f"{ticker}: {e}")
+
+    logging.info(f"Retention pass compacted {report.compacted} articles across {report.tickers} tickers, "
+                 f"reclaimed {report.reclaimed_bytes} bytes")
+    return report
+
+
+class RetentionWorker:
+    """
+    Background thread running a retention pass every `interval_seconds`.
+    """
+
+    def __init__(self, collection: Collection, policy: RetentionPolicy, archive: Optional[Collection] = None,
+                 interval_seconds: float = 3600.0):
+        self.collection = collection
+        self.policy = policy
+        self.archive = archive
+        self.interval_seconds = interval_seconds
+        self.last_report: Optional[RetentionReport] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="article-retention", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_report = run_retention(self.collection, self.policy, self.archive, self._stop)
+            except PyMongoError as e:
+                logging.error(f"Retention pass failed: {e}")
+            self._stop.wait(self.interval_seconds)
+
+
+def main():
+    from common.models import MongoDBConnection
+
+    argparse.ArgumentParser(description="Run one article retention pass with the RETENTION_* settings").parse_args()
+    policy = RetentionPolicy.from_env()
+    conn = MongoDBConnection()
+    report = run_retention(conn.get_collection("articles"), policy, conn.get_collection("article_archive"))
+    print(json.dumps({"policy": asdict(policy), "report": asdict(report)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
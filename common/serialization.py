@@ -0,0 +1,43 @@
+"""
+Fast JSON encoding for MongoDB documents.
+
+dumps() writes pymongo documents straight to bytes with orjson, which encodes
+datetimes natively (naive values are treated as UTC, like format_article) and
+calls back only for BSON types such as ObjectId. Without orjson installed it
+falls back to the standard library with the same output.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib fallback is slower but equivalent
+    orjson = None
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        # Only reached by the stdlib fallback; orjson handles datetimes itself
+        return (obj if obj.tzinfo else obj.replace(tzinfo=timezone.utc)).isoformat()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_NAIVE_UTC
+
+    def dumps(obj) -> bytes:
+        """
+        Encode `obj` as compact JSON bytes.
+        """
+        return orjson.dumps(obj, default=_default, option=_OPTIONS)
+else:
+    def dumps(obj) -> bytes:
+        """
+        Encode `obj` as compact JSON bytes.
+        """
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,302 @@
+"""
+Fixed-memory demand tracking with probabilistic sketches.
+
+DemandTracker counts requests per ticker in a time-decayed count-min sketch and
+unique requesters per ticker in HyperLogLogs, in memory that does not grow with
+the number of symbols:
+
+    SKETCH_WIDTH, SKETCH_DEPTH       count-min sketch size (default 2048 x 4)
+    SKETCH_HALF_LIFE_SECONDS         request counts halve this often (default 3600)
+    SKETCH_CANDIDATES                tickers ranked and given a HyperLogLog (default 128)
+    SKETCH_HLL_PRECISION             HyperLogLog registers = 2^p, about 1.04/sqrt(2^p) error (default 10)
+    SKETCH_UNIQUE_WINDOW_SECONDS     unique requesters are counted per window (default 86400)
+
+Decay uses forward decay: a request at time t adds 2^((t - L) / half_life) for a
+landmark L shared by every replica, so counts never have to be aged in place
+and sketches from different replicas add up. Each replica stores a snapshot in
+MongoDB (see SnapshotWorker) and hot() merges them all.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import socket
+import threading
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Optional
+
+from bson import Binary
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from common.metrics import observe_mongo
+
+# The landmark moves every RESCALE_HALF_LIVES half-lives, keeping weights below 2^32
+RESCALE_HALF_LIVES = 32
+
+
+def _hash(key: str):
+    """
+    Two independent 64-bit hashes of `key`, stable across processes.
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little")
+
+
+class CountMinSketch:
+    """
+    Count-min sketch over float weights. Estimates never undercount; they
+    overcount by at most e/width of the total weight with probability 1 - e^-depth.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, counters: Optional[array] = None):
+        self.width = width
+        self.depth = depth
+        self.counters = counters if counters is not None else array("d", bytes(8 * width * depth))
+
+    def _cells(self, key: str):
+        h1, h2 = _hash(key)
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str, weight: float = 1.0) -> float:
+        """
+        Add `weight` to `key` and return its new estimate.
+        """
+        cells = self._cells(key)
+        counters = self.counters
+        for cell in cells:
+            counters[cell] += weight
+        return min(counters[cell] for cell in cells)
+
+    def estimate(self, key: str) -> float:
+        return min(self.counters[cell] for cell in self._cells(key))
+
+    def scale(self, factor: float) -> None:
+        counters = self.counters
+        for i in range(len(counters)):
+            counters[i] *= factor
+
+    def merge(self, other: "CountMinSketch", factor: float = 1.0) -> None:
+        """
+        Add `other`, scaled by `factor`, into this sketch.
+        """
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different sizes")
+        counters = self.counters
+        for i, value in enumerate(other.counters):
+            counters[i] += value * factor
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality estimator with 2^precision one-byte registers.
+    """
+
+    def __init__(self, precision: int = 10, registers: Optional[bytearray] = None):
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, key: str) -> None:
+        value = _hash(key)[0]
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class DemandTracker:
+    """
+    Decayed request counts and unique requesters per ticker for one replica.
+
+    The SKETCH_CANDIDATES tickers with the highest counts are remembered by name
+    and get a HyperLogLog of their requesters; the count-min sketch covers every ticker.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, half_life_seconds: float = 3600.0,
+                 candidates: int = 128, hll_precision: int = 10, unique_window_seconds: float = 86400.0,
+                 replica: Optional[str] = None, clock=time.time):
+        self.half_life_seconds = half_life_seconds
+        self.max_candidates = candidates
+        self.hll_precision = hll_precision
+        self.unique_window_seconds = unique_window_seconds
+        self.replica = replica or f"{socket.gethostname()}:{os.getpid()}"
+        self._clock = clock
+        self.sketch = CountMinSketch(width, depth)
+        # Candidate ticker -> forward-decayed count, comparable while the landmark is fixed
+        self.candidates = {}
+        self.uniques = {}
+        self.landmark = self._landmark(clock())
+        self.window = self._window(clock())
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "DemandTracker":
+        return cls(
+            width=int(os.getenv("SKETCH_WIDTH", "2048")),
+            depth=int(os.getenv("SKETCH_DEPTH", "4")),
+            half_life_seconds=float(os.getenv("SKETCH_HALF_LIFE_SECONDS", "3600")),
+            candidates=int(os.getenv("SKETCH_CANDIDATES", "128")),
+            hll_precision=int(os.getenv("SKETCH_HLL_PRECISION", "10")),
+            unique_window_seconds=float(os.getenv("SKETCH_UNIQUE_WINDOW_SECONDS", "86400")),
+        )
+
+    def _landmark(self, now: float) -> float:
+        period = self.half_life_seconds * RESCALE_HALF_LIVES
+        return math.floor(now / period) * period
+
+    def _window(self, now: float) -> int:
+        return int(now // self.unique_window_seconds)
+
+    def _advance(self, now: float) -> None:
+        landmark = self._landmark(now)
+        if landmark != self.landmark:
+            factor = 2.0 ** ((self.landmark - landmark) / self.half_life_seconds)
+            self.sketch.scale(factor)
+            self.candidates = {ticker: score * factor for ticker, score in self.candidates.items()}
+            self.landmark = landmark
+        window = self._window(now)
+        if window != self.window:
+            self.uniques = {}
+            self.window = window
+
+    def record(self, ticker: str, requester: Optional[str] = None) -> None:
+        with self._lock:
+            now = self._clock()
+            self._advance(now)
+            score = self.sketch.add(ticker, 2.0 ** ((now - self.landmark) / self.half_life_seconds))
+            if ticker not in self.candidates and len(self.candidates) >= self.max_candidates:
+                weakest = min(self.candidates, key=self.candidates.get)
+                if self.candidates[weakest] >= score:
+                    return
+                del self.candidates[weakest]
+                self.uniques.pop(weakest, None)
+            self.candidates[ticker] = score
+            if requester is not None:
+                self.uniques.setdefault(ticker, HyperLogLog(self.hll_precision)).add(requester)
+
+    def snapshot(self) -> dict:
+        """
+        The tracker's state as a MongoDB document for its replica.
+        """
+        with self._lock:
+            self._advance(self._clock())
+            return {
+                "_id": self.replica,
+                "updated_at": datetime.utcnow(),
+                "landmark": self.landmark,
+                "half_life_seconds": self.half_life_seconds,
+                "width": self.sketch.width,
+                "depth": self.sketch.depth,
+                "counters": Binary(self.sketch.counters.tobytes()),
+                "candidates": list(self.candidates),
+                "window": self.window,
+                "hll_precision": self.hll_precision,
+                "uniques": {ticker: Binary(bytes(hll.registers)) for ticker, hll in self.uniques.items()},
+            }
+
+    def hot(self, snapshots: list = (), limit: int = 10) -> list:
+        """
+        Rank tickers by decayed request count across this replica and the
+        `snapshots` of the others. Counts are in requests, as of now.
+        """
+        with self._lock:
+            now = self._clock()
+            self._advance(now)
+            merged = CountMinSketch(self.sketch.width, self.sketch.depth, array("d", self.sketch.counters))
+            candidates = set(self.candidates)
+            uniques = {ticker: HyperLogLog(self.hll_precision, bytearray(hll.registers))
+                       for ticker, hll in self.uniques.items()}
+
+        for snapshot in snapshots:
+            if snapshot["_id"] == self.replica:
+                continue
+            if (snapshot["width"], snapshot["depth"], snapshot["half_life_seconds"]) != \
+                    (merged.width, merged.depth, self.half_life_seconds):
+                logging.error(f"Skipping demand snapshot from {snapshot['_id']} with different sketch settings")
+                continue
+            counters = array("d")
+            counters.frombytes(snapshot["counters"])
+            factor = 2.0 ** ((snapshot["landmark"] - self.landmark) / self.half_life_seconds)
+            merged.merge(CountMinSketch(merged.width, merged.depth, counters), factor)
+            candidates.update(snapshot["candidates"])
+            if snapshot["window"] == self.window and snapshot["hll_precision"] == self.hll_precision:
+                for ticker, registers in snapshot["uniques"].items():
+                    hll = uniques.setdefault(ticker, HyperLogLog(self.hll_precision))
+                    hll.merge(HyperLogLog(self.hll_precision, bytearray(registers)))
+
+        decay = 2.0 ** ((self.landmark - now) / self.half_life_seconds)
+        ranked = sorted(((merged.estimate(t) * decay, t) for t in candidates), reverse=True)[:limit]
+        return [
+            {"ticker": ticker, "score": round(score, 3),
+             "unique_requesters": uniques[ticker].count() if ticker in uniques else 0}
+            for score, ticker in ranked
+        ]
+
+
+def ensure_snapshot_indexes(collection: Collection, ttl_days: float = 7) -> None:
+    """
+    Expire the snapshots of replicas that stopped reporting.
+    """
+    collection.create_index([("updated_at", ASCENDING)], expireAfterSeconds=int(ttl_days * 86400))
+
+
+@observe_mongo("save_demand_snapshot")
+def save_snapshot(collection: Collection, tracker: DemandTracker) -> None:
+    snapshot = tracker.snapshot()
+    collection.replace_one({"_id": snapshot["_id"]}, snapshot, upsert=True)
+
+
+@observe_mongo("load_demand_snapshots")
+def load_snapshots(collection: Collection, max_age_seconds: float) -> list:
+    """
+    Snapshots of every replica that reported within `max_age_seconds`.
+    """
+    return list(collection.find({"updated_at": {"$gte": datetime.utcnow() - timedelta(seconds=max_age_seconds)}}))
+
+
+class SnapshotWorker:
+    """
+    Background thread saving the tracker's snapshot every `interval_seconds`.
+    """
+
+    def __init__(self, collection: Collection, tracker: DemandTracker, interval_seconds: float = 30.0):
+        self.collection = collection
+        self.tracker = tracker
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="demand-snapshots", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                save_snapshot(self.collection, self.tracker)
+            except PyMongoError as e:
+                logging.error(f"Failed to save the demand snapshot: {e}")
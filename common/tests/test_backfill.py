@@ -0,0 +1,58 @@
+import unittest
+from unittest.mock import MagicMock
+import threading
+
+from bson import ObjectId
+
+from common.backfill import OUTDATED, backfill_analysis_html
+from common.models import compress_analysis, decompress_analysis
+from common.rendering import RENDERER_VERSION
+
+
+class TestBackfill(unittest.TestCase):
+    """Test for the analysis HTML backfill in common/backfill.py"""
+
+    def _collection(self, docs):
+        collection = MagicMock()
+        collection.find.return_value.sort.return_value.batch_size.return_value = iter(docs)
+        collection.bulk_write.side_effect = lambda updates, ordered: MagicMock(modified_count=len(updates))
+        return collection
+
+    def test_renders_outdated_articles_in_batches(self):
+        """Test if outdated articles are rendered, stored compressed and written in batches"""
+        long_value, encoding = compress_analysis("| A | B |\n|---|---|\n" + "| 1 | 2 |\n" * 100, "zlib")
+        docs = [{"_id": ObjectId(), "analysis": long_value, "analysis_encoding": encoding}] + \
+            [{"_id": ObjectId(), "analysis": "**short**"} for _ in range(4)]
+        collection = self._collection(docs)
+
+        updated = backfill_analysis_html(collection, batch_size=2)
+
+        self.assertEqual(updated, 5)
+        collection.find.assert_called_once_with(OUTDATED, {"analysis": 1, "analysis_encoding": 1})
+        self.assertEqual([len(c[0][0]) for c in collection.bulk_write.call_args_list], [2, 2, 1])
+
+        first = collection.bulk_write.call_args_list[0][0][0][0]._doc
+        self.assertEqual(first["$set"]["analysis_renderer"], RENDERER_VERSION)
+        html = decompress_analysis(first["$set"]["analysis_html"], first["$set"]["analysis_html_encoding"])
+        self.assertIn("<td>1</td>", html)
+        self.assertEqual(first["$set"]["analysis_keywords"], "b")
+
+        short = collection.bulk_write.call_args_list[0][0][0][1]._doc
+        self.assertEqual(short["$set"]["analysis_html"], "<p><strong>short</strong></p>")
+        self.assertEqual(short["$unset"], {"analysis_html_encoding": ""})
+        self.assertEqual(short["$set"]["analysis_keywords"], "short")
+
+    def test_stop_ends_after_current_batch(self):
+        """Test if setting stop ends the pass after the batch in progress"""
+        collection = self._collection([{"_id": ObjectId(), "analysis": "text"} for _ in range(5)])
+        stop = threading.Event()
+        stop.set()
+
+        updated = backfill_analysis_html(collection, batch_size=2, stop=stop)
+
+        self.assertEqual(updated, 2)
+        collection.bulk_write.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+
+from prometheus_client import REGISTRY
+
+from common.metrics import observe_mongo, render_metrics, MONGO_OP_LATENCY
+from common.models import ArticleModel
+
+
+class TestMetrics(unittest.TestCase):
+    """Test for the shared Prometheus helpers in common/metrics.py"""
+
+    def _count(self, operation):
+        return REGISTRY.get_sample_value(
+            "mongo_operation_duration_seconds_count", {"operation": operation}
+        ) or 0.0
+
+    def test_observe_mongo_records_latency(self):
+        """Test if observe_mongo records one observation per call"""
+        @observe_mongo("test_operation")
+        def operation(value):
+            return value * 2
+
+        before = self._count("test_operation")
+        self.assertEqual(operation(21), 42)
+        self.assertEqual(self._count("test_operation"), before + 1)
+
+    def test_observe_mongo_records_failures(self):
+        """Test if observe_mongo records latency even when the operation raises"""
+        @observe_mongo("test_failing_operation")
+        def operation():
+            raise RuntimeError("boom")
+
+        before = self._count("test_failing_operation")
+        with self.assertRaises(RuntimeError):
+            operation()
+        self.assertEqual(self._count("test_failing_operation"), before + 1)
+
+    def test_article_model_methods_are_observed(self):
+        """Test if ArticleModel queries are recorded under their method name"""
+        mock_collection = MagicMock()
+        mock_collection.find.return_value.sort.return_value = []
+
+        before = self._count("get_articles_by_ticker")
+        ArticleModel.get_articles_by_ticker(mock_collection, "AAPL")
+        self.assertEqual(self._count("get_articles_by_ticker"), before + 1)
+
+    def test_insert_article(self):
+        """Test if insert_article inserts the document and is observed"""
+        mock_collection = MagicMock()
+        article = {"ticker": "AAPL"}
+
+        before = self._count("insert_article")
+        result = ArticleModel.insert_article(mock_collection, article)
+
+        mock_collection.insert_one.assert_called_once_with(article)
+        self.assertEqual(result, mock_collection.insert_one.return_value)
+        self.assertEqual(self._count("insert_article"), before + 1)
+
+    def test_render_metrics(self):
+        """Test if render_metrics produces the Prometheus text format"""
+        output = render_metrics().decode()
+        self.assertIn("# TYPE mongo_operation_duration_seconds histogram", output)
+        self.assertIn("# TYPE llm_tokens_total counter", output)
+
+    @patch.dict(os.environ, {"PROMETHEUS_MULTIPROC_DIR": "/tmp/metrics"})
+    @patch('common.metrics.multiprocess.MultiProcessCollector')
+    def test_render_metrics_multiprocess(self, mock_collector):
+        """Test if render_metrics merges worker files in multiprocess mode"""
+        render_metrics()
+        mock_collector.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ import unittest
 from unittest.mock import patch, MagicMock
 import sys
 import os
+import threading
+import multiprocessing
 from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 
@@ -9,7 +11,10 @@ from bson import ObjectId
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Use absolute imports instead
-from common.models import MongoDBConnection, ArticleModel
+from common.models import MongoDBConnection, ArticleModel, AnalysisRunModel, LazyCollection, StoryModel, \
+    compress_analysis, decompress_analysis
+from pymongo.errors import BulkWriteError
+from common.rendering import RENDERER_VERSION
 
 
 class TestMongoDBConnection(unittest.TestCase):
@@ -37,7 +42,9 @@ class TestMongoDBConnection(unittest.TestCase):
         # Check if they are the same instance
         self.assertIs(conn1, conn2)
         
-        # Check if MongoClient was called only once
+        # Check if the client is only created on first use, and only once
+        mock_mongo_client.assert_not_called()
+        self.assertIs(conn1.client, conn2.client)
         mock_mongo_client.assert_called_once()
     
     @patch('common.models.MongoClient')
@@ -63,17 +70,16 @@ class TestMongoDBConnection(unittest.TestCase):
         conn = MongoDBConnection()
         
         # Check if MongoClient was called with default URI
+        self.assertEqual(conn.db.name, "mydb")
         mock_mongo_client.assert_called_once_with("mongodb://localhost:27017/mydb")
-        
-        # Check if the database name was accessed correctly
-        self.assertEqual(conn._db.name, "mydb")
     
     @patch('common.models.MongoClient')
     @patch('common.models.os.getenv')
     def test_connect_with_custom_uri(self, mock_getenv, mock_mongo_client):
         """Test if _connect method uses custom URI from environment variable"""
         # Set up mock for os.getenv to return custom URI
-        mock_getenv.return_value = "mongodb://mongodb:27017/stockDB"
+        mock_getenv.side_effect = lambda key, default=None: \
+            "mongodb://mongodb:27017/stockDB" if key == "MONGO_URI" else None
         
         # Set up return values for MongoClient mock
         mock_client = MagicMock()
@@ -86,10 +92,19 @@ class TestMongoDBConnection(unittest.TestCase):
         conn = MongoDBConnection()
         
         # Check if MongoClient was called with custom URI
+        self.assertEqual(conn.db.name, "stockDB")
         mock_mongo_client.assert_called_once_with("mongodb://mongodb:27017/stockDB")
-        
-        # Check if the database name was accessed correctly
-        self.assertEqual(conn._db.name, "stockDB")
+
+    @patch('common.models.MongoClient')
+    @patch.dict(os.environ, {"MONGO_URI": "mongodb://mongodb:27017/stockDB", "MONGO_MAX_POOL_SIZE": "50",
+                             "MONGO_WAIT_QUEUE_TIMEOUT_MS": "2000", "MONGO_SERVER_SELECTION_TIMEOUT_MS": "5000"})
+    def test_connect_with_pool_options(self, mock_mongo_client):
+        """Test if pool size and timeouts are passed to MongoClient from the environment"""
+        MongoDBConnection().client
+
+        mock_mongo_client.assert_called_once_with(
+            "mongodb://mongodb:27017/stockDB", maxPoolSize=50, waitQueueTimeoutMS=2000, serverSelectionTimeoutMS=5000
+        )
     
     @patch('common.models.MongoClient')
     def test_get_collection(self, mock_mongo_client):
@@ -106,9 +121,86 @@ class TestMongoDBConnection(unittest.TestCase):
         conn = MongoDBConnection()
         collection = conn.get_collection("test_collection")
         
-        # Check if the correct collection was returned
+        # Check if the handle is lazy and resolves to the correct collection
+        self.assertIsInstance(collection, LazyCollection)
+        mock_mongo_client.assert_not_called()
+        self.assertIs(collection.find, mock_collection.find)
         mock_db.__getitem__.assert_called_with("test_collection")
-        self.assertEqual(collection, mock_collection)
+
+    @patch('common.models.MongoClient')
+    def test_collection_follows_new_client(self, mock_mongo_client):
+        """Test if a collection handle resolves against the client created after a fork"""
+        mock_mongo_client.side_effect = lambda *args, **kwargs: MagicMock()
+        conn = MongoDBConnection()
+        collection = conn.get_collection("articles")
+        before = collection.resolve()
+
+        MongoDBConnection._reset_after_fork()
+
+        self.assertIsNot(collection.resolve(), before)
+        self.assertEqual(mock_mongo_client.call_count, 2)
+
+
+def _client_for_this_process(*args, **kwargs):
+    return MagicMock(pid=os.getpid())
+
+
+def _child_uses_new_client(results):
+    conn = MongoDBConnection()
+    results.put((conn.client.pid == os.getpid(), conn.get_collection("articles").resolve() is not None))
+
+
+class TestMongoDBConnectionStress(unittest.TestCase):
+    """Stress test for MongoDBConnection across threads and forked processes"""
+
+    def setUp(self):
+        MongoDBConnection._instance = None
+        MongoDBConnection._client = None
+        MongoDBConnection._db = None
+
+    @patch('common.models.MongoClient')
+    def test_many_threads_share_one_client(self, mock_mongo_client):
+        """Test if concurrent first use from many threads creates exactly one client"""
+        mock_mongo_client.side_effect = lambda *args, **kwargs: MagicMock()
+        barrier = threading.Barrier(32)
+        clients = []
+
+        def worker():
+            barrier.wait()
+            for _ in range(200):
+                conn = MongoDBConnection()
+                clients.append(conn.client)
+                conn.get_collection("articles").find_one({})
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        mock_mongo_client.assert_called_once()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "requires fork")
+    @patch('common.models.MongoClient')
+    def test_forked_processes_create_their_own_client(self, mock_mongo_client):
+        """Test if every forked worker creates its own client instead of reusing the parent's"""
+        mock_mongo_client.side_effect = _client_for_this_process
+        parent_client = MongoDBConnection().client
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+
+        processes = [context.Process(target=_child_uses_new_client, args=(results,)) for _ in range(8)]
+        for process in processes:
+            process.start()
+        outcomes = [results.get(timeout=30) for _ in processes]
+        for process in processes:
+            process.join(timeout=30)
+
+        self.assertEqual(outcomes, [(True, True)] * 8)
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertIs(MongoDBConnection().client, parent_client)
+        self.assertEqual(parent_client.pid, os.getpid())
 
 
 class TestArticleModel(unittest.TestCase):
@@ -213,6 +305,215 @@ class TestArticleModel(unittest.TestCase):
         expected_iso = test_dt.replace(tzinfo=timezone.utc).isoformat()
         self.assertEqual(formatted["created_at"], expected_iso)
     
+    def test_ensure_indexes(self):
+        """Test if ensure_indexes creates the per-ticker and trending indexes"""
+        mock_collection = MagicMock()
+
+        ArticleModel.ensure_indexes(mock_collection)
+
+        mock_collection.create_index.assert_any_call([("ticker", 1), ("created_at", -1)])
+        mock_collection.create_index.assert_any_call([("created_at", -1)])
+        mock_collection.create_index.assert_any_call([("ticker", 1), ("created_at", 1), ("overall_sentiment", 1)])
+        mock_collection.create_index.assert_any_call([("summary", "text"), ("analysis_keywords", "text")],
+                                                     weights={"summary": 10, "analysis_keywords": 2}, name="article_text")
+
+    def test_get_latest_articles(self):
+        """Test if get_latest_articles takes each ticker's newest article from one aggregation"""
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value = iter([
+            {"ticker": "AAPL", "overall_sentiment": "Bullish", "summary": "Up"},
+            {"ticker": "MSFT", "overall_sentiment": "Neutral", "summary": "Flat"},
+        ])
+
+        latest = ArticleModel.get_latest_articles(mock_collection, ["aapl", "MSFT", "GOOG"])
+
+        self.assertEqual(set(latest), {"AAPL", "MSFT"})
+        self.assertEqual(latest["AAPL"]["summary"], "Up")
+        pipeline = mock_collection.aggregate.call_args[0][0]
+        self.assertEqual(pipeline[0], {"$match": {"ticker": {"$in": ["AAPL", "MSFT", "GOOG"]}}})
+        # Same key order as the (ticker, created_at) index
+        self.assertEqual(list(pipeline[1]["$sort"].items()), [("ticker", 1), ("created_at", -1)])
+        self.assertEqual(pipeline[2]["$group"]["_id"], "$ticker")
+        self.assertEqual(pipeline[2]["$group"]["summary"], {"$first": "$summary"})
+        self.assertEqual(pipeline[2]["$group"]["overall_sentiment"], {"$first": "$overall_sentiment"})
+
+    def test_get_sentiment_history(self):
+        """Test if get_sentiment_history reads only indexed fields, oldest first, from `since`"""
+        mock_collection = MagicMock()
+        since = datetime(2024, 1, 1)
+        mock_collection.find.return_value.sort.return_value = [
+            {"created_at": datetime(2024, 1, 2), "overall_sentiment": "Bullish"}, {"created_at": datetime(2024, 1, 3)}]
+
+        history = ArticleModel.get_sentiment_history(mock_collection, "aapl", since=since)
+
+        self.assertEqual(history, [(datetime(2024, 1, 2), "Bullish"), (datetime(2024, 1, 3), None)])
+        mock_collection.find.assert_called_once_with(
+            {"ticker": "AAPL", "created_at": {"$gte": since}}, {"_id": 0, "created_at": 1, "overall_sentiment": 1})
+        mock_collection.find.return_value.sort.assert_called_once_with("created_at", 1)
+
+    @patch('common.models.datetime')
+    def test_search_articles(self, mock_datetime):
+        """Test if search_articles filters the text matches and ranks them by score, then recency"""
+        current_time = datetime(2023, 1, 10, 12, 0, 0)
+        mock_datetime.utcnow.return_value = current_time
+        mock_collection = MagicMock()
+        cursor = mock_collection.find.return_value
+        cursor.sort.return_value = cursor
+        cursor.skip.return_value = cursor
+        cursor.limit.return_value = [{"ticker": "AAPL", "score": 1.5}]
+
+        articles = ArticleModel.search_articles(mock_collection, "fda approval", ticker="aapl", sentiment="Bullish",
+                                                time_range="7d", skip=20, limit=21)
+
+        self.assertEqual(articles, [{"ticker": "AAPL", "score": 1.5}])
+        query, projection = mock_collection.find.call_args[0]
+        self.assertEqual(query, {
+            "$text": {"$search": "fda approval"},
+            "ticker": "AAPL",
+            "overall_sentiment": "Bullish",
+            "created_at": {"$gte": current_time - timedelta(days=7)},
+        })
+        self.assertEqual(projection["score"], {"$meta": "textScore"})
+        self.assertEqual(projection["analysis"], 0)
+        self.assertEqual(projection["analysis_keywords"], 0)
+        cursor.sort.assert_called_once_with([("score", {"$meta": "textScore"}), ("created_at", -1)])
+        cursor.skip.assert_called_once_with(20)
+        cursor.limit.assert_called_once_with(21)
+
+    def test_view_hides_search_text(self):
+        """Test if the stored search keywords are not part of the API view"""
+        article = ArticleModel.create_article("AAPL", "Bullish", "Summary", "**Strong** quarter")
+
+        self.assertNotIn("analysis_keywords", ArticleModel.view(article))
+        self.assertNotIn("analysis_keywords", ArticleModel.view(article, include_analysis=False))
+
+    def test_format_article_does_not_modify_document(self):
+        """Test if format_article leaves the pymongo document untouched"""
+        test_id = ObjectId()
+        article = {"_id": test_id, "created_at": datetime(2023, 1, 1, 12, 0, 0), "analysis": "text"}
+        original = dict(article)
+
+        formatted = ArticleModel.format_article(article)
+
+        self.assertEqual(article, original)
+        self.assertEqual(formatted["id"], str(test_id))
+        self.assertNotIn("_id", formatted)
+
+    def test_compress_analysis_round_trip(self):
+        """Test if analyses survive compression with each codec"""
+        text = "| 2024-05-01 14:30 | Apple beats estimates | Bullish | Strong iPhone sales | cnbc.com |\n" * 40
+
+        for codec in ("zlib", "zstd"):
+            value, encoding = compress_analysis(text, codec)
+            self.assertEqual(encoding, codec)
+            self.assertLess(len(value), len(text) / 4)
+            self.assertEqual(decompress_analysis(value, encoding), text)
+
+    def test_compress_analysis_skips_short_text(self):
+        """Test if short analyses are stored as is"""
+        self.assertEqual(compress_analysis("No news found."), ("No news found.", None))
+        self.assertEqual(decompress_analysis("No news found.", None), "No news found.")
+
+    def test_insert_article_compresses_analysis(self):
+        """Test if insert_article stores a compressed analysis without changing the caller's dict"""
+        mock_collection = MagicMock()
+        article = ArticleModel.create_article("AAPL", "Bullish", "Summary", "| row |\n" * 200)
+
+        ArticleModel.insert_article(mock_collection, article)
+
+        stored = mock_collection.insert_one.call_args[0][0]
+        self.assertEqual(stored["analysis_encoding"], "zlib")
+        self.assertEqual(decompress_analysis(stored["analysis"], "zlib"), article["analysis"])
+        self.assertNotIn("analysis_encoding", article)
+
+    def test_format_article_decodes_or_drops_analysis(self):
+        """Test if format_article decompresses the analysis only when it is requested"""
+        value, encoding = compress_analysis("| row |\n" * 200, "zlib")
+
+        formatted = ArticleModel.format_article({"analysis": value, "analysis_encoding": encoding})
+        self.assertEqual(formatted["analysis"], "| row |\n" * 200)
+
+        formatted = ArticleModel.format_article({"analysis": value, "analysis_encoding": encoding}, include_analysis=False)
+        self.assertEqual(formatted, {})
+
+    def test_create_article_renders_html(self):
+        """Test if create_article stores the rendered analysis with the renderer version"""
+        article = ArticleModel.create_article("AAPL", "Bullish", "Summary", "| A | B |\n|---|---|\n| 1 | 2 |")
+
+        self.assertIn("<td>1</td>", article["analysis_html"])
+        self.assertEqual(article["analysis_renderer"], RENDERER_VERSION)
+        self.assertEqual(article["analysis_keywords"], "b")
+
+    def test_insert_article_compresses_html(self):
+        """Test if insert_article compresses the stored HTML and view serves it back"""
+        mock_collection = MagicMock()
+        article = ArticleModel.create_article("AAPL", "Bullish", "Summary", "| A | B |\n|---|---|\n" + "| 1 | 2 |\n" * 100)
+
+        ArticleModel.insert_article(mock_collection, article)
+
+        stored = mock_collection.insert_one.call_args[0][0]
+        self.assertEqual(stored["analysis_html_encoding"], "zlib")
+        view = ArticleModel.view(stored)
+        self.assertEqual(view["analysis_html"], article["analysis_html"])
+        self.assertNotIn("analysis_html_encoding", view)
+        self.assertNotIn("analysis_renderer", view)
+
+    @patch("common.models.render_analysis", return_value="<p>rendered</p>")
+    def test_view_renders_outdated_html(self, mock_render):
+        """Test if view renders the analysis when the stored HTML is missing or from an older renderer"""
+        self.assertEqual(ArticleModel.view({"analysis": "text"})["analysis_html"], "<p>rendered</p>")
+        old = {"analysis": "text", "analysis_html": "<p>old</p>", "analysis_renderer": RENDERER_VERSION - 1}
+        self.assertEqual(ArticleModel.view(old)["analysis_html"], "<p>rendered</p>")
+
+        mock_render.reset_mock()
+        current = {"analysis": "text", "analysis_html": "<p>stored</p>", "analysis_renderer": RENDERER_VERSION}
+        self.assertEqual(ArticleModel.view(current)["analysis_html"], "<p>stored</p>")
+        self.assertNotIn("analysis_html", ArticleModel.view(current, include_analysis=False))
+        mock_render.assert_not_called()
+
+    def test_get_articles_by_ticker_since(self):
+        """Test if get_articles_by_ticker only asks for articles newer than since"""
+        mock_collection = MagicMock()
+        mock_collection.find.return_value.sort.return_value = []
+        since = datetime(2024, 5, 1)
+
+        ArticleModel.get_articles_by_ticker(mock_collection, "aapl", since=since)
+
+        mock_collection.find.assert_called_once_with({"ticker": "AAPL", "created_at": {"$gt": since}})
+
+    def test_get_article_created_at(self):
+        """Test if get_article_created_at looks the article up within its ticker"""
+        mock_collection = MagicMock()
+        article_id = ObjectId()
+        mock_collection.find_one.return_value = {"_id": article_id, "created_at": datetime(2024, 5, 1)}
+
+        self.assertEqual(ArticleModel.get_article_created_at(mock_collection, "aapl", article_id), datetime(2024, 5, 1))
+        mock_collection.find_one.assert_called_once_with({"_id": article_id, "ticker": "AAPL"}, {"created_at": 1})
+
+        mock_collection.find_one.return_value = None
+        self.assertIsNone(ArticleModel.get_article_created_at(mock_collection, "aapl", article_id))
+
+    def test_get_latest_article(self):
+        """Test if get_latest_article fetches the newest article for the ticker"""
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = {"ticker": "AAPL"}
+
+        article = ArticleModel.get_latest_article(mock_collection, "aapl")
+
+        mock_collection.find_one.assert_called_once_with({"ticker": "AAPL"}, None, sort=[("created_at", -1)])
+        self.assertEqual(article, {"ticker": "AAPL"})
+
+    def test_get_articles_by_ticker_without_analysis(self):
+        """Test if the analysis body is projected out when not requested"""
+        mock_collection = MagicMock()
+        mock_collection.find.return_value.sort.return_value = []
+
+        ArticleModel.get_articles_by_ticker(mock_collection, "aapl", include_analysis=False)
+
+        mock_collection.find.assert_called_once_with(
+            {"ticker": "AAPL"}, {"analysis": 0, "analysis_encoding": 0, "analysis_html": 0, "analysis_html_encoding": 0,
+                                 "analysis_keywords": 0})
+
     def test_get_trending_articles_no_time_range(self):
         """Test if get_trending_articles method works with no time range specified"""
         # Create mock collection
@@ -341,5 +642,124 @@ class TestArticleModel(unittest.TestCase):
         mock_collection.find.assert_called_once_with({})
 
 
+class TestAnalysisRunModel(unittest.TestCase):
+    """Test for the AnalysisRunModel class in common/models.py"""
+
+    def test_create_run(self):
+        """Test if create_run builds a run document linked to its article"""
+        article_id = ObjectId()
+        run = AnalysisRunModel.create_run(article_id, "aapl", "OPENAI", "gpt-4.1", {"total": 2.5}, 3, 1, 1200, 300)
+
+        self.assertEqual(run["article_id"], article_id)
+        self.assertEqual(run["ticker"], "AAPL")
+        self.assertEqual(run["model"], "gpt-4.1")
+        self.assertEqual(run["stage_seconds"], {"total": 2.5})
+        self.assertEqual(run["total_tokens"], 1500)
+        self.assertIsInstance(run["created_at"], datetime)
+
+    @patch('common.models.datetime')
+    def test_stats_pipeline(self, mock_datetime):
+        """Test if the stats pipeline filters by age and groups by the requested fields"""
+        current_time = datetime(2023, 1, 10, 12, 0, 0)
+        mock_datetime.utcnow.return_value = current_time
+
+        pipeline = AnalysisRunModel.stats_pipeline(["provider", "day"], days=7)
+
+        self.assertEqual(pipeline[0], {"$match": {"created_at": {"$gte": current_time - timedelta(days=7)}}})
+        group = pipeline[1]["$group"]
+        self.assertEqual(group["_id"]["provider"], "$provider")
+        self.assertIn("$dateToString", group["_id"]["day"])
+        self.assertNotIn("ticker", group["_id"])
+        self.assertEqual(group["latency"]["$percentile"]["p"], [0.5, 0.95, 0.99])
+        self.assertEqual(group["input_tokens"], {"$sum": "$input_tokens"})
+        self.assertEqual(pipeline[2], {"$sort": {"_id.provider": 1, "_id.day": 1}})
+        self.assertEqual(pipeline[3]["$project"]["p99_seconds"], {"$arrayElemAt": ["$latency", 2]})
+
+    def test_get_run_stats(self):
+        """Test if get_run_stats runs the aggregation and returns its documents"""
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value = iter([{"provider": "OPENAI", "runs": 4}])
+
+        stats = AnalysisRunModel.get_run_stats(mock_collection, ["provider"], days=1)
+
+        mock_collection.aggregate.assert_called_once()
+        self.assertEqual(stats, [{"provider": "OPENAI", "runs": 4}])
+
+
+
+class TestStoryModel(unittest.TestCase):
+    """Test for the StoryModel class in common/models.py"""
+
+    STORY = {"id": "-4915", "title": "Apple ships", "url": "https://example.com/a", "site": "example.com",
+             "time": "2025-01-01T12:00:00", "tickers": ["aapl"]}
+
+    def test_create_story_and_back(self):
+        """Test if a stored story turns back into the story get_feed returned"""
+        doc = StoryModel.create_story(self.STORY)
+
+        self.assertEqual(doc["story_id"], "-4915")
+        self.assertEqual(doc["time"], datetime(2025, 1, 1, 12))
+        self.assertNotIn("id", doc)
+        self.assertEqual(StoryModel.to_feed({**doc, "_id": ObjectId(), "queries": ["z:AAPL"]}), self.STORY)
+
+    def test_upsert_stories(self):
+        """Test if stories are upserted in one unordered bulk write keyed by story id"""
+        mock_collection = MagicMock()
+        mock_collection.bulk_write.return_value.upserted_count = 1
+
+        new = StoryModel.upsert_stories(mock_collection, "z:AAPL", [self.STORY])
+
+        self.assertEqual(new, 1)
+        (updates,), kwargs = mock_collection.bulk_write.call_args
+        self.assertEqual(kwargs, {"ordered": False})
+        self.assertEqual(updates[0]._filter, {"story_id": "-4915"})
+        self.assertEqual(updates[0]._doc["$addToSet"], {"queries": "z:AAPL"})
+        self.assertTrue(updates[0]._upsert)
+        self.assertEqual(StoryModel.upsert_stories(mock_collection, "z:AAPL", []), 0)
+        mock_collection.bulk_write.assert_called_once()
+
+    def test_upsert_stories_tolerates_duplicate_keys(self):
+        """Test if losing an upsert race on the unique index still adds the query to the story"""
+        mock_collection = MagicMock()
+        other = dict(self.STORY, id="-4916")
+        mock_collection.bulk_write.side_effect = [
+            BulkWriteError({"writeErrors": [{"code": 11000, "index": 1}], "nUpserted": 1}), MagicMock()]
+        self.assertEqual(StoryModel.upsert_stories(mock_collection, "z:AAPL", [self.STORY, other]), 1)
+
+        retries = mock_collection.bulk_write.call_args_list[1][0][0]
+        self.assertEqual(len(retries), 1)
+        self.assertEqual(retries[0]._filter, {"story_id": "-4916"})
+        self.assertEqual(retries[0]._doc, {"$addToSet": {"queries": "z:AAPL"}})
+        self.assertFalse(retries[0]._upsert)
+
+        mock_collection.bulk_write.side_effect = BulkWriteError(
+            {"writeErrors": [{"code": 121, "index": 0}], "nUpserted": 0})
+        with self.assertRaises(BulkWriteError):
+            StoryModel.upsert_stories(mock_collection, "z:AAPL", [self.STORY])
+
+    def test_ensure_indexes(self):
+        """Test if the story id is indexed as unique and stories expire"""
+        mock_collection = MagicMock()
+
+        StoryModel.ensure_indexes(mock_collection, MagicMock(), retention_days=2)
+
+        mock_collection.create_index.assert_any_call([("story_id", 1)], unique=True)
+        mock_collection.create_index.assert_any_call([("queries", 1), ("time", -1)])
+        mock_collection.create_index.assert_any_call([("time", 1)], expireAfterSeconds=172800)
+
+    def test_set_feed_state(self):
+        """Test if a poll without new stories keeps the cursor"""
+        mock_feeds = MagicMock()
+
+        StoryModel.set_feed_state(mock_feeds, "z:AAPL", None, None)
+        update = mock_feeds.update_one.call_args[0][1]["$set"]
+        self.assertEqual(set(update), {"polled_at"})
+
+        StoryModel.set_feed_state(mock_feeds, "z:AAPL", "-4915", datetime(2025, 1, 1))
+        update = mock_feeds.update_one.call_args[0][1]["$set"]
+        self.assertEqual(update["cursor"], "-4915")
+        self.assertEqual(mock_feeds.update_one.call_args[1], {"upsert": True})
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
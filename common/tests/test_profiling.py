@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import patch
+import os
+import tempfile
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.metrics import observe_mongo
+from common.profiling import (
+    PROFILE_HEADER,
+    StackSampler,
+    format_server_timing,
+    instrument_profiling,
+    stage,
+)
+
+
+class TestProfiling(unittest.TestCase):
+    """Test for the request profiling hook in common/profiling.py"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def _app(self):
+        app = FastAPI()
+
+        @observe_mongo("test_profiled_operation")
+        def query():
+            time.sleep(0.01)
+
+        @app.get("/slow/{ticker}")
+        async def slow(ticker: str):
+            with stage("work"):
+                time.sleep(0.03)
+            query()
+            return {"ticker": ticker}
+
+        return app
+
+    def _env(self, **values):
+        return patch.dict(os.environ, {"PROFILING_DIR": self.directory, "PROFILING_INTERVAL_MS": "1", **values})
+
+    def test_not_installed_when_off(self):
+        """Test if no middleware is added when profiling is not configured"""
+        app = FastAPI()
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertFalse(instrument_profiling(app, "test"))
+        self.assertEqual(app.user_middleware, [])
+
+    def test_stage_outside_profiled_request(self):
+        """Test if stage is a no-op outside a profiled request"""
+        with stage("work"):
+            pass
+
+    def test_profiles_request_with_token(self):
+        """Test if a request with the token gets a Server-Timing header and a folded profile"""
+        app = self._app()
+        with self._env(PROFILING_TOKEN="secret"):
+            self.assertTrue(instrument_profiling(app, "test"))
+        client = TestClient(app)
+
+        response = client.get("/slow/AAPL", headers={PROFILE_HEADER: "secret"})
+
+        timing = response.headers["Server-Timing"]
+        self.assertIn("work;dur=", timing)
+        self.assertIn("mongo;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith("test-") and files[0].endswith("-GET-slow_AAPL.folded"))
+        with open(os.path.join(self.directory, files[0])) as f:
+            stack, count = f.readline().rsplit(" ", 1)
+        self.assertGreater(int(count), 0)
+
+    def test_ignores_wrong_token(self):
+        """Test if requests without the right token are not profiled"""
+        app = self._app()
+        with self._env(PROFILING_TOKEN="secret"):
+            instrument_profiling(app, "test")
+        client = TestClient(app)
+
+        response = client.get("/slow/AAPL", headers={PROFILE_HEADER: "guess"})
+
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_samples_one_in_n(self):
+        """Test if one in every N requests is profiled"""
+        app = self._app()
+        with self._env(PROFILING_SAMPLE_EVERY="3"):
+            instrument_profiling(app, "test")
+        client = TestClient(app)
+
+        profiled = ["Server-Timing" in client.get("/slow/AAPL").headers for _ in range(6)]
+
+        self.assertEqual(profiled, [False, False, True, False, False, True])
+
+    def test_sampler_collects_collapsed_stacks(self):
+        """Test if the sampler records other threads as root-to-leaf stacks"""
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        time.sleep(0.02)
+        sampler.stop()
+
+        main_stacks = [stack for stack in sampler.counts if stack.startswith("MainThread;")]
+        self.assertTrue(main_stacks)
+        self.assertTrue(any("test_sampler_collects_collapsed_stacks" in stack for stack in main_stacks))
+
+    def test_format_server_timing(self):
+        """Test if stage durations are formatted in milliseconds"""
+        self.assertEqual(format_server_timing({"agent": 1.5, "total": 1.50049}), "agent;dur=1500.0, total;dur=1500.5")
+
+
+if __name__ == '__main__':
+    unittest.main()
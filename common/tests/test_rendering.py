@@ -0,0 +1,78 @@
+import unittest
+
+from common.rendering import keywords, plain_text, render_analysis
+
+
+class TestRendering(unittest.TestCase):
+    """Test for the analysis markdown renderer in common/rendering.py"""
+
+    def test_renders_table(self):
+        """Test if a markdown table becomes an HTML table"""
+        html = render_analysis("| Title | Sentiment |\n|:---|---|\n| Earnings beat | **Bullish** |")
+
+        self.assertIn("<table>", html)
+        self.assertIn('<th style="text-align:left">Title</th>', html)
+        self.assertIn("<td><strong>Bullish</strong></td>", html)
+
+    def test_sanitizes_html(self):
+        """Test if scripts, event handlers and javascript: links are removed"""
+        html = render_analysis(
+            "<script>alert(1)</script>\n\n<img src=x onerror=alert(1)>\n\n[a](javascript:alert(1)) [b](https://example.com)"
+        )
+
+        self.assertNotIn("script", html)
+        self.assertNotIn("onerror", html)
+        self.assertNotIn("javascript:", html)
+        self.assertIn('href="https://example.com"', html)
+
+    def test_empty(self):
+        """Test if missing analysis renders to an empty string"""
+        self.assertEqual(render_analysis(None), "")
+
+    def test_plain_text(self):
+        """Test if plain_text keeps the visible words, with table cells and entities separated and decoded"""
+        html = render_analysis("## FDA approval\n\n| Title | Sentiment |\n|---|---|\n| R&D beat | **Bullish** |")
+
+        self.assertEqual(plain_text(html), "FDA approval Title Sentiment R&D beat Bullish")
+        self.assertEqual(plain_text(""), "")
+
+    def test_keywords(self):
+        """Test if keywords keeps each word once, skips stop words and stops within the limit"""
+        html = render_analysis("| Headline | Sentiment |\n|---|---|\n| FDA approval for Apple's R&D | Bullish |\n"
+                               "| FDA delays approval | Bearish |")
+
+        self.assertEqual(keywords(html), "fda approval apple's r&d delays")
+        self.assertEqual(keywords(html, max_chars=12), "fda approval")
+        self.assertEqual(keywords(""), "")
+
+    def test_keywords_skip_times_numbers_and_sources(self):
+        """Test if a full-size table keeps names from its last row once times, numbers and sources are skipped"""
+        headlines = [
+            "Nvidia shares climb after record data center revenue",
+            "Microsoft expands Azure capacity in Europe",
+            "Apple supplier warns of weaker iPhone demand in China",
+            "Alphabet faces new antitrust complaint over ad tech",
+            "Amazon raises forecast as cloud growth accelerates",
+            "Meta cuts spending plans for metaverse unit",
+            "Tesla recalls 120,000 vehicles over seat belt alert",
+            "AMD unveils accelerator chips to rival H100",
+            "Intel delays Ohio factory to 2027 amid subsidy wait",
+            "OpenAI signs $10 billion compute deal with Oracle",
+        ]
+        rows = ["| Time | Headline | Sentiment | Reason | Source |", "|---|---|---|---|---|"]
+        for minute, headline in enumerate(headlines):
+            rows.append(f"| 2024-05-01 14:{minute:02d} | {headline} | Bullish | Demand for AI hardware grows 12.5% "
+                        f"| https://www.example{minute}.com/markets/2024/05/01/story-{minute} |")
+        rows.append("| 2024-05-01T15:00 | Markets close higher | Neutral | Broad gains | reuters.com |")
+
+        words = keywords(render_analysis("\n".join(rows))).split()
+
+        self.assertIn("openai", words)
+        self.assertIn("oracle", words)
+        self.assertLessEqual(len(" ".join(words)), 512)
+        for word in ("2024-05-01", "2024-05-01t15", "14", "12.5", "120,000", "reuters.com", "https", "www.example0.com"):
+            self.assertNotIn(word, words)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import threading
+from datetime import datetime, timedelta
+
+import bson
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from common.retention import RetentionPolicy, RetentionWorker, ensure_archive_indexes, run_retention
+
+
+def _articles(count, ticker="AAPL"):
+    return [{"_id": ObjectId(), "ticker": ticker, "analysis": "| row |" * 50} for _ in range(count)]
+
+
+class TestRetention(unittest.TestCase):
+    """Test for the article retention pass in common/retention.py"""
+
+    def _collection(self, candidates, newer=0):
+        collection = MagicMock()
+        collection.distinct.return_value = ["AAPL"]
+        cursor = collection.find.return_value.sort.return_value.batch_size.return_value
+        cursor.skip.return_value = iter(candidates)
+        cursor.__iter__.return_value = iter(candidates)
+        collection.count_documents.return_value = newer
+        return collection, cursor
+
+    @patch.dict(os.environ, {"RETENTION_KEEP_PER_TICKER": "20", "RETENTION_KEEP_DAYS": "30",
+                             "RETENTION_BATCH_SIZE": "50"}, clear=True)
+    def test_policy_from_env(self):
+        """Test if the policy is read from the environment"""
+        policy = RetentionPolicy.from_env()
+
+        self.assertEqual(policy.keep_per_ticker, 20)
+        self.assertEqual(policy.keep_days, 30.0)
+        self.assertIsNone(policy.archive_ttl_days)
+        self.assertEqual(policy.batch_size, 50)
+        self.assertTrue(policy.enabled)
+
+    def test_disabled_without_keep_rules(self):
+        """Test if a pass does nothing when no keep rule is set"""
+        collection = MagicMock()
+
+        report = run_retention(collection, RetentionPolicy())
+
+        self.assertEqual(report.compacted, 0)
+        collection.distinct.assert_not_called()
+
+    @patch('common.retention.datetime')
+    def test_keeps_newest_per_ticker_and_recent_days(self, mock_datetime):
+        """Test if the newest K are skipped, allowing for those already kept by the age rule"""
+        now = datetime(2024, 3, 1)
+        mock_datetime.utcnow.return_value = now
+        collection, cursor = self._collection(_articles(3), newer=7)
+
+        report = run_retention(collection, RetentionPolicy(keep_per_ticker=10, keep_days=30, pause_seconds=0))
+
+        query = collection.find.call_args[0][0]
+        self.assertEqual(query["ticker"], "AAPL")
+        self.assertEqual(query["compacted"], {"$ne": True})
+        self.assertEqual(query["created_at"], {"$lt": now - timedelta(days=30)})
+        # 7 newer articles are kept by age, so only 3 more are kept by count
+        cursor.skip.assert_called_once_with(3)
+        self.assertEqual(report.compacted, 3)
+
+    def test_compacts_in_batches_and_reports_reclaimed_bytes(self):
+        """Test if candidates are compacted in bounded batches and the removed bodies are measured"""
+        candidates = _articles(5)
+        collection, cursor = self._collection(candidates)
+        stop = threading.Event()
+
+        with patch.object(stop, 'wait', return_value=False) as mock_wait:
+            report = run_retention(collection, RetentionPolicy(keep_per_ticker=2, batch_size=2, pause_seconds=0.1), stop=stop)
+
+        self.assertEqual(collection.bulk_write.call_count, 3)
+        self.assertEqual(mock_wait.call_count, 2)
+        mock_wait.assert_called_with(0.1)
+        update = collection.bulk_write.call_args_list[0][0][0][0]._doc
+        self.assertEqual(update["$unset"], {"analysis": "", "analysis_encoding": "", "analysis_html": "",
+                                           "analysis_html_encoding": "", "analysis_renderer": "", "analysis_keywords": ""})
+        self.assertTrue(update["$set"]["compacted"])
+        self.assertEqual(report.compacted, 5)
+        self.assertEqual(report.reclaimed_bytes, 5 * len(bson.encode({"analysis": candidates[0]["analysis"]})))
+
+    def test_archives_bodies_with_ttl(self):
+        """Test if bodies are copied to the archive, which gets a TTL index"""
+        collection, cursor = self._collection(_articles(2))
+        archive = MagicMock()
+        archive.index_information.return_value = {"_id_": {"key": [("_id", 1)]}}
+        archive.insert_many.side_effect = BulkWriteError({"nInserted": 1, "writeErrors": [{"code": 11000}]})
+
+        report = run_retention(collection, RetentionPolicy(keep_per_ticker=1, archive_ttl_days=7), archive=archive)
+
+        archive.create_index.assert_called_once_with([("archived_at", 1)], expireAfterSeconds=7 * 86400,
+                                                     name="archived_at_ttl")
+        self.assertEqual(len(archive.insert_many.call_args[0][0]), 2)
+        self.assertEqual(report.archived, 1)
+        self.assertEqual(report.compacted, 2)
+
+    def test_archive_ttl_changes_with_coll_mod(self):
+        """Test if a changed archive TTL is applied to the existing index, and an unchanged one is left alone"""
+        archive = MagicMock()
+        archive.name = "article_archive"
+        archive.index_information.return_value = {
+            "_id_": {"key": [("_id", 1)]},
+            "archived_at_1": {"key": [("archived_at", 1)], "expireAfterSeconds": 7 * 86400},
+        }
+
+        ensure_archive_indexes(archive, 7)
+        archive.database.command.assert_not_called()
+
+        ensure_archive_indexes(archive, 30)
+        archive.database.command.assert_called_once_with(
+            "collMod", "article_archive", index={"name": "archived_at_1", "expireAfterSeconds": 30 * 86400})
+        archive.create_index.assert_not_called()
+
+    def test_ticker_errors_are_reported(self):
+        """Test if a database error on one ticker is reported without stopping the pass"""
+        collection, cursor = self._collection(_articles(1))
+        collection.distinct.return_value = ["AAPL", "MSFT"]
+        collection.bulk_write.side_effect = [PyMongoError("boom"), None]
+        cursor.skip.side_effect = lambda n: iter(_articles(1))
+
+        report = run_retention(collection, RetentionPolicy(keep_per_ticker=1))
+
+        self.assertEqual(report.tickers, 2)
+        self.assertEqual(report.compacted, 1)
+        self.assertEqual(report.errors, ["AAPL: boom"])
+
+    def test_worker_runs_and_stops(self):
+        """Test if the background worker runs a pass and stops promptly"""
+        collection, cursor = self._collection(_articles(1))
+        worker = RetentionWorker(collection, RetentionPolicy(keep_per_ticker=1), interval_seconds=60)
+
+        worker.start()
+        for _ in range(100):
+            if worker.last_report is not None:
+                break
+            threading.Event().wait(0.01)
+        worker.stop()
+
+        self.assertEqual(worker.last_report.compacted, 1)
+        self.assertFalse(worker._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
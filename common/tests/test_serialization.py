@@ -0,0 +1,55 @@
+import unittest
+from unittest.mock import patch
+import importlib
+import json
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+
+from common import serialization
+from common.models import ArticleModel
+
+
+class TestSerialization(unittest.TestCase):
+    """Test for the fast JSON encoder in common/serialization.py"""
+
+    def _article(self):
+        return {
+            "_id": ObjectId(),
+            "ticker": "AAPL",
+            "summary": "Ünïcode summary",
+            "overall_sentiment": "Bullish",
+            "created_at": datetime(2024, 5, 1, 14, 30, 0, 123456),
+        }
+
+    def test_matches_format_article(self):
+        """Test if dumps of a view equals the JSON of the formatted article"""
+        article = self._article()
+
+        fast = json.loads(serialization.dumps(ArticleModel.view(article)))
+
+        self.assertEqual(fast, ArticleModel.format_article(article))
+        self.assertEqual(fast["created_at"], "2024-05-01T14:30:00.123456+00:00")
+        self.assertEqual(fast["id"], str(article["_id"]))
+
+    def test_stdlib_fallback(self):
+        """Test if the fallback without orjson produces the same JSON"""
+        article = ArticleModel.view(self._article())
+        expected = json.loads(serialization.dumps(article))
+        try:
+            with patch.dict(sys.modules, {"orjson": None}):
+                fallback = importlib.reload(serialization)
+                self.assertIsNone(fallback.orjson)
+                self.assertEqual(json.loads(fallback.dumps(article)), expected)
+        finally:
+            importlib.reload(serialization)
+
+    def test_unsupported_type(self):
+        """Test if unknown types are rejected instead of silently stringified"""
+        with self.assertRaises(TypeError):
+            serialization.dumps({"value": object()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+from unittest.mock import MagicMock
+import random
+
+from common.sketches import CountMinSketch, DemandTracker, HyperLogLog, RESCALE_HALF_LIVES, save_snapshot
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestCountMinSketch(unittest.TestCase):
+    """Test for the count-min sketch in common/sketches.py"""
+
+    def test_estimates_never_undercount(self):
+        """Test if estimates are at least the true counts and close for heavy keys"""
+        sketch = CountMinSketch(width=256, depth=4)
+        rng = random.Random(1)
+        counts = {}
+        for _ in range(5000):
+            key = f"T{int(rng.paretovariate(1.2)) % 500}"
+            counts[key] = counts.get(key, 0) + 1
+            sketch.add(key)
+
+        for key, count in counts.items():
+            self.assertGreaterEqual(sketch.estimate(key), count)
+        heaviest = max(counts, key=counts.get)
+        self.assertLess(sketch.estimate(heaviest), counts[heaviest] * 1.05)
+
+    def test_merge(self):
+        """Test if merged sketches add their scaled counts"""
+        a, b = CountMinSketch(64, 3), CountMinSketch(64, 3)
+        a.add("AAPL", 2)
+        b.add("AAPL", 3)
+
+        a.merge(b, factor=0.5)
+
+        self.assertEqual(a.estimate("AAPL"), 3.5)
+        with self.assertRaises(ValueError):
+            a.merge(CountMinSketch(32, 3))
+
+
+class TestHyperLogLog(unittest.TestCase):
+    """Test for the HyperLogLog in common/sketches.py"""
+
+    def test_counts_within_error(self):
+        """Test if the estimate is within a few standard errors, small and large"""
+        hll = HyperLogLog(precision=12)
+        for i in range(20):
+            hll.add(f"user-{i}")
+        self.assertAlmostEqual(hll.count(), 20, delta=1)
+
+        for i in range(50000):
+            hll.add(f"user-{i}")
+        self.assertAlmostEqual(hll.count(), 50000, delta=50000 * 0.05)
+
+    def test_merge_is_union(self):
+        """Test if merging counts the union of both sets"""
+        a, b = HyperLogLog(10), HyperLogLog(10)
+        for i in range(300):
+            a.add(f"user-{i}")
+            b.add(f"user-{i + 150}")
+
+        a.merge(b)
+
+        self.assertAlmostEqual(a.count(), 450, delta=450 * 0.1)
+
+
+class TestDemandTracker(unittest.TestCase):
+    """Test for the demand ranking in common/sketches.py"""
+
+    def _tracker(self, clock, replica="a", **kwargs):
+        options = {"width": 512, "depth": 4, "half_life_seconds": 60, "candidates": 4, **kwargs}
+        return DemandTracker(replica=replica, clock=clock, **options)
+
+    def test_ranks_by_decayed_demand(self):
+        """Test if recent requests outrank older ones once they have decayed"""
+        clock = FakeClock()
+        tracker = self._tracker(clock)
+        for i in range(8):
+            tracker.record("AAPL", f"user-{i}")
+        clock.now += 120
+        for i in range(3):
+            tracker.record("MSFT", "user-1")
+
+        hot = tracker.hot()
+
+        self.assertEqual([entry["ticker"] for entry in hot], ["MSFT", "AAPL"])
+        self.assertAlmostEqual(hot[0]["score"], 3.0, places=2)
+        self.assertAlmostEqual(hot[1]["score"], 2.0, places=2)
+        self.assertEqual(hot[0]["unique_requesters"], 1)
+        self.assertEqual(hot[1]["unique_requesters"], 8)
+
+    def test_candidates_bounded(self):
+        """Test if only the heaviest tickers stay candidates"""
+        tracker = self._tracker(FakeClock(), candidates=3)
+        for ticker, count in [("A", 5), ("B", 4), ("C", 3)]:
+            for _ in range(count):
+                tracker.record(ticker)
+        tracker.record("D")
+        for _ in range(6):
+            tracker.record("E")
+
+        self.assertEqual(set(tracker.candidates), {"A", "B", "E"})
+        self.assertEqual(len(tracker.hot(limit=10)), 3)
+
+    def test_landmark_rescale_keeps_scores(self):
+        """Test if moving the landmark does not change the decayed scores"""
+        clock = FakeClock(0.0)
+        tracker = self._tracker(clock)
+        clock.now = 60 * RESCALE_HALF_LIVES - 30
+        tracker.record("AAPL")
+        landmark = tracker.landmark
+
+        clock.now += 60
+        self.assertAlmostEqual(tracker.hot()[0]["score"], 0.5, places=6)
+        self.assertNotEqual(tracker.landmark, landmark)
+
+    def test_merges_replica_snapshots(self):
+        """Test if snapshots from other replicas add to the local counts"""
+        clock = FakeClock()
+        local, remote = self._tracker(clock, "a"), self._tracker(clock, "b")
+        local.record("AAPL", "user-1")
+        remote.record("AAPL", "user-2")
+        remote.record("TSLA", "user-3")
+        collection = MagicMock()
+
+        save_snapshot(collection, remote)
+        snapshot = collection.replace_one.call_args[0][1]
+        self.assertEqual(collection.replace_one.call_args[0][0], {"_id": "b"})
+
+        hot = {entry["ticker"]: entry for entry in local.hot([snapshot, local.snapshot()])}
+        self.assertAlmostEqual(hot["AAPL"]["score"], 2.0, places=6)
+        self.assertEqual(hot["AAPL"]["unique_requesters"], 2)
+        self.assertAlmostEqual(hot["TSLA"]["score"], 1.0, places=6)
+
+    def test_skips_incompatible_snapshots(self):
+        """Test if snapshots with other sketch settings are ignored"""
+        clock = FakeClock()
+        local, remote = self._tracker(clock, "a"), self._tracker(clock, "b", width=256)
+        remote.record("AAPL")
+
+        self.assertEqual(local.hot([remote.snapshot()]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
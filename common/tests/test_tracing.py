@@ -0,0 +1,95 @@
+import unittest
+from unittest.mock import patch
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+from common.metrics import observe_mongo
+from common.tracing import inject_headers, instrument_tracing, setup_tracing
+
+
+class TestTracing(unittest.TestCase):
+    """Test for the shared OpenTelemetry helpers in common/tracing.py"""
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = provider.get_tracer("test")
+        # Swap the module tracers instead of the global provider, which can only be set once
+        self.patchers = [
+            patch('common.tracing.tracer', self.tracer),
+            patch('common.metrics.tracer', self.tracer),
+        ]
+        for patcher in self.patchers:
+            patcher.start()
+
+    def tearDown(self):
+        for patcher in self.patchers:
+            patcher.stop()
+
+    def _spans(self):
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_setup_tracing_disabled_by_default(self):
+        """Test if tracing stays off without TRACING_EXPORTER"""
+        self.assertFalse(setup_tracing("test"))
+
+    @patch.dict(os.environ, {"TRACING_EXPORTER": "carrier-pigeon"})
+    def test_setup_tracing_invalid_exporter(self):
+        """Test if an unknown exporter is rejected"""
+        with self.assertRaises(ValueError):
+            setup_tracing("test")
+
+    def test_inject_headers(self):
+        """Test if the current trace context is injected as a traceparent header"""
+        self.assertEqual(inject_headers({"Accept": "json"}), {"Accept": "json"})
+
+        with self.tracer.start_as_current_span("parent") as span:
+            headers = inject_headers()
+
+        trace_id = format(span.get_span_context().trace_id, "032x")
+        self.assertIn(trace_id, headers["traceparent"])
+
+    def test_observe_mongo_opens_child_span(self):
+        """Test if Mongo operations are traced as children of the active span"""
+        @observe_mongo("test_traced_operation")
+        def operation():
+            return "ok"
+
+        with self.tracer.start_as_current_span("parent"):
+            operation()
+
+        spans = self._spans()
+        self.assertEqual(spans["mongo.test_traced_operation"].parent.span_id,
+                         spans["parent"].context.span_id)
+        self.assertEqual(spans["mongo.test_traced_operation"].attributes["db.system"], "mongodb")
+
+    def test_middleware_continues_caller_trace(self):
+        """Test if the server span joins the trace from the incoming traceparent"""
+        app = FastAPI()
+        instrument_tracing(app, "test")
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str):
+            return {"headers": inject_headers()}
+
+        with self.tracer.start_as_current_span("caller") as caller:
+            headers = inject_headers()
+        response = TestClient(app).get("/items/42", headers=headers)
+
+        server = self._spans()["GET /items/{item_id}"]
+        self.assertEqual(server.context.trace_id, caller.get_span_context().trace_id)
+        self.assertEqual(server.parent.span_id, caller.get_span_context().span_id)
+        self.assertEqual(server.attributes["http.status_code"], 200)
+        # Outgoing calls from the handler carry the server span onward
+        self.assertIn(format(server.context.span_id, "016x"), response.json()["headers"]["traceparent"])
+
+
+if __name__ == '__main__':
+    unittest.main()
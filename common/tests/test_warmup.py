@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.warmup import WarmUp, warm_mongo_connections
+
+
+class TestWarmUp(unittest.TestCase):
+    """Test for the startup warm-up and readiness helpers in common/warmup.py"""
+
+    def test_runs_steps_in_order(self):
+        """Test if steps run in order and the service becomes ready afterwards"""
+        calls = []
+        warmup = WarmUp("test")
+        warmup.add("first", lambda: calls.append("first"))
+        warmup.add("second", lambda: calls.append("second"))
+
+        self.assertFalse(warmup.ready)
+        asyncio.run(warmup.run())
+
+        self.assertEqual(calls, ["first", "second"])
+        self.assertTrue(warmup.ready)
+        self.assertTrue(warmup.results["second"]["ok"])
+
+    def test_optional_step_failure_is_skipped(self):
+        """Test if a failing optional step does not block readiness"""
+        warmup = WarmUp("test")
+        warmup.add("llm", MagicMock(side_effect=RuntimeError("provider down")))
+
+        asyncio.run(warmup.run())
+
+        self.assertTrue(warmup.ready)
+        self.assertEqual(warmup.results["llm"], {"ok": False, "error": "provider down"})
+
+    def test_required_step_is_retried(self):
+        """Test if a required step is retried until it succeeds"""
+        step = MagicMock(side_effect=[RuntimeError("mongo down"), RuntimeError("mongo down"), None])
+        warmup = WarmUp("test", retry_seconds=0)
+        warmup.add("mongo", step, required=True)
+
+        asyncio.run(warmup.run())
+
+        self.assertEqual(step.call_count, 3)
+        self.assertTrue(warmup.results["mongo"]["ok"])
+
+    def test_readyz_reports_warm_up(self):
+        """Test if /readyz answers 503 while warming up and 200 once ready"""
+        warmup = WarmUp("test")
+        warmup.add("slow", lambda: time.sleep(0.2))
+
+        @asynccontextmanager
+        async def lifespan(app):
+            warmup.start()
+            yield
+
+        app = FastAPI(lifespan=lifespan)
+        warmup.install(app)
+
+        with TestClient(app) as client:
+            response = client.get("/readyz")
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()["status"], "warming_up")
+            for _ in range(50):
+                if warmup.ready:
+                    break
+                time.sleep(0.02)
+            response = client.get("/readyz")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+        self.assertIn("slow", response.json()["steps"])
+
+    def test_warm_mongo_connections(self):
+        """Test if warm_mongo_connections runs one concurrent ping per connection"""
+        connection = MagicMock()
+
+        warm_mongo_connections(connection, count=6)
+
+        self.assertEqual(connection.client.admin.command.call_count, 6)
+        connection.client.admin.command.assert_called_with("ping")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+OpenTelemetry tracing shared by the web app and the llm service.
+
+Tracing is off unless TRACING_EXPORTER is set, in which case spans are exported
+in batches from a background thread:
+
+    TRACING_EXPORTER       none (default), file, console or otlp
+    TRACING_FILE           JSON lines output of the file exporter (default traces.jsonl)
+    TRACING_SAMPLE_RATIO   share of new traces that are recorded (default 1.0);
+                           downstream spans follow the caller's decision
+    OTEL_EXPORTER_OTLP_ENDPOINT   collector URL used by the otlp exporter
+"""
+
+import logging
+import os
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+# Proxy tracer: a no-op until setup_tracing installs a real provider
+tracer = trace.get_tracer("stock-sentiment")
+
+
+def _build_exporter(name: str):
+    if name == "file":
+        path = os.getenv("TRACING_FILE", "traces.jsonl")
+        return ConsoleSpanExporter(
+            out=open(path, "a", buffering=1),
+            formatter=lambda span: span.to_json(indent=None) + os.linesep,
+        )
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        return OTLPSpanExporter()
+    raise ValueError(f"Invalid TRACING_EXPORTER {name}")
+
+
+def setup_tracing(service_name: str) -> bool:
+    """
+    Install a tracer provider for this process according to the environment.
+    Returns True when tracing is enabled.
+    """
+    exporter_name = os.getenv("TRACING_EXPORTER", "none").lower()
+    if exporter_name == "none":
+        return False
+
+    ratio = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": service_name}),
+        sampler=ParentBased(TraceIdRatioBased(ratio)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(_build_exporter(exporter_name)))
+    trace.set_tracer_provider(provider)
+    logging.info(f"Tracing enabled for {service_name}: exporter={exporter_name}, sample_ratio={ratio}")
+    return True
+
+
+def inject_headers(headers: dict = None) -> dict:
+    """
+    Return request headers carrying the current trace context (W3C traceparent).
+    """
+    headers = dict(headers or {})
+    propagate.inject(headers)
+    return headers
+
+
+def instrument_tracing(app, service: str) -> None:
+    """
+    Add middleware to a FastAPI app that continues the caller's trace (if any)
+    and wraps every request in a server span.
+    """
+    @app.middleware("http")
+    async def trace_request(request, call_next):
+        parent = propagate.extract(dict(request.headers))
+        with tracer.start_as_current_span(
+            f"{request.method} {request.url.path}", context=parent, kind=SpanKind.SERVER,
+            attributes={"http.method": request.method, "service": service},
+        ) as span:
+            response = await call_next(request)
+            route = request.scope.get("route")
+            if route is not None:
+                span.update_name(f"{request.method} {route.path}")
+                span.set_attribute("http.route", route.path)
+            span.set_attribute("http.status_code", response.status_code)
+            if response.status_code >= 500:
+                span.set_status(Status(StatusCode.ERROR))
+            return response
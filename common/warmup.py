@@ -0,0 +1,91 @@
+"""
+Startup warm-up and readiness shared by the web app and the llm service.
+
+Each service registers warm-up steps and starts them from its FastAPI lifespan.
+Steps run in order on a worker thread while the server already answers
+/healthz (liveness); /readyz answers 503 until every step has finished, so a
+load balancer or compose healthcheck only routes traffic to a warm instance.
+Required steps are retried until they succeed, optional ones are logged and
+skipped when they fail.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+
+
+class WarmUp:
+    """
+    Ordered warm-up steps with readiness tracking for one service.
+    """
+
+    def __init__(self, service: str, retry_seconds: float = 2.0):
+        self.service = service
+        self.retry_seconds = retry_seconds
+        self.steps = []
+        self.results = {}
+        self.ready = False
+
+    def add(self, name: str, func, required: bool = False) -> None:
+        self.steps.append((name, func, required))
+
+    async def run(self) -> None:
+        for name, func, required in self.steps:
+            while True:
+                start = time.perf_counter()
+                try:
+                    await run_in_threadpool(func)
+                    self.results[name] = {"ok": True, "seconds": round(time.perf_counter() - start, 3)}
+                    logging.info(f"{self.service} warm-up step {name} done in {self.results[name]['seconds']}s")
+                    break
+                except Exception as e:
+                    self.results[name] = {"ok": False, "error": str(e)}
+                    if not required:
+                        logging.error(f"{self.service} warm-up step {name} failed, skipping: {e}")
+                        break
+                    logging.error(f"{self.service} warm-up step {name} failed, retrying: {e}")
+                    await asyncio.sleep(self.retry_seconds)
+        self.ready = True
+        logging.info(f"{self.service} is ready")
+
+    def start(self) -> asyncio.Task:
+        return asyncio.create_task(self.run())
+
+    def install(self, app) -> None:
+        """
+        Add the /readyz endpoint to a FastAPI app.
+        """
+        @app.get("/readyz", include_in_schema=False)
+        async def readyz():
+            status = "ready" if self.ready else "warming_up"
+            return JSONResponse(
+                status_code=200 if self.ready else 503,
+                content={"status": status, "steps": self.results},
+            )
+
+
+def warm_mongo_connections(connection, count: int = None) -> None:
+    """
+    Open pooled connections ahead of traffic by running concurrent pings, so the
+    first requests do not pay for TCP and authentication handshakes.
+    """
+    count = count if count is not None else int(os.getenv("WARMUP_MONGO_CONNECTIONS", "4"))
+    client = connection.client
+    if count <= 1:
+        client.admin.command("ping")
+        return
+    # All pings start together, so each one needs its own connection from the pool
+    barrier = threading.Barrier(count)
+
+    def ping(_):
+        barrier.wait()
+        client.admin.command("ping")
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        list(executor.map(ping, range(count)))
@@ -1,4 +1,6 @@
 import os
+import threading
+import time
 from pydantic import BaseModel, Field
 import logging
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -7,6 +9,10 @@ from langchain_xai import ChatXAI
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.prebuilt import create_react_agent
 from tool import ticker_news_tool
+from fake_llm import FakeChatModel
+from callbacks import PipelineCallbackHandler, RunStats, current_run_stats
+from common.metrics import AGENT_STEPS, ANALYZE_LATENCY
+from common.tracing import tracer
 from dotenv import load_dotenv
 import logging
 
@@ -24,31 +30,46 @@ API_PROVIDER = os.getenv("LLM_API_PROVIDER")
 if not API_PROVIDER:
     raise ValueError("API_PROVIDER is not set")
 API_KEY = os.getenv(f"{API_PROVIDER}_API_KEY")
-if not API_KEY:
+# The FAKE provider runs offline and needs no key
+if not API_KEY and API_PROVIDER != "FAKE":
     raise ValueError(f"{API_PROVIDER}_API_KEY is not set")
 
 logging.info(f"API_PROVIDER: {API_PROVIDER}")
 
-if API_PROVIDER == "GEMINI":
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash-preview-04-17",
-        api_key=API_KEY,
-        temperature=0.0
-    )
-elif API_PROVIDER == "OPENAI":
-    llm = ChatOpenAI(
-        model="gpt-4.1",
-        api_key=API_KEY,
-        temperature=0.0
-    )
-elif API_PROVIDER == "XAI":
-    llm = ChatXAI(
-        model="grok-3-fast-beta",
-        api_key=API_KEY,
-        temperature=0.0
-    )
-else:
+MODELS = {
+    "GEMINI": "gemini-2.5-flash-preview-04-17",
+    "OPENAI": "gpt-4.1",
+    "XAI": "grok-3-fast-beta",
+    "FAKE": FakeChatModel.model_fields["model_name"].default,
+}
+if API_PROVIDER not in MODELS:
     raise ValueError(f"Invalid API provider {API_PROVIDER}")
+MODEL_NAME = MODELS[API_PROVIDER]
+
+
+def build_llm():
+    """
+    Create the chat model client for the configured provider.
+    """
+    if API_PROVIDER == "GEMINI":
+        return ChatGoogleGenerativeAI(
+            model=MODEL_NAME,
+            api_key=API_KEY,
+            temperature=0.0
+        )
+    elif API_PROVIDER == "OPENAI":
+        return ChatOpenAI(
+            model=MODEL_NAME,
+            api_key=API_KEY,
+            temperature=0.0
+        )
+    elif API_PROVIDER == "XAI":
+        return ChatXAI(
+            model=MODEL_NAME,
+            api_key=API_KEY,
+            temperature=0.0
+        )
+    return FakeChatModel.from_env()
 
 
 system_prompt = """
@@ -111,20 +132,59 @@ prompt = ChatPromptTemplate.from_messages([
 
 
 
-agent = create_react_agent(
-    llm,
-    tools=ticker_news_tool,
-    response_format=NewsAnalysis,
-)
+# Built on first use or during warm-up, not at import
+llm = None
+agent = None
+_agent_lock = threading.Lock()
 
-def analyze_news(ticker: str):
-    try:
-        messages = prompt.invoke({"system_prompt": system_prompt, "ticker": ticker})
-        analysis = agent.invoke(messages)
-        logging.info(f"Successfully analyzed ticker: {ticker}") 
-        return analysis
-    except Exception as e:
-        logging.error(f"Error analyzing ticker {ticker}: {e}", exc_info=True) 
-        raise 
+
+def get_agent():
+    """
+    Return the ReAct agent, creating the LLM client and agent graph on first call.
+    """
+    global llm, agent
+    if agent is None:
+        with _agent_lock:
+            if agent is None:
+                llm = build_llm()
+                agent = create_react_agent(
+                    llm,
+                    tools=ticker_news_tool,
+                    response_format=NewsAnalysis,
+                ).with_config(callbacks=[PipelineCallbackHandler(API_PROVIDER, MODEL_NAME)])
+    return agent
 
 
+def warm_up_llm() -> None:
+    """
+    Build the agent and, with WARMUP_LLM_REQUEST=true, send one tiny request so
+    the provider's connection and TLS handshake happen before real traffic.
+    """
+    get_agent()
+    if os.getenv("WARMUP_LLM_REQUEST", "false").lower() == "true":
+        llm.invoke("Reply with OK.")
+
+def analyze_news(ticker: str):
+    stats = RunStats()
+    stats_token = current_run_stats.set(stats)
+    start = time.perf_counter()
+    # Model and tool spans opened by the callback handler become children of this span
+    with tracer.start_as_current_span("analyze_news", attributes={"ticker": ticker, "llm.provider": API_PROVIDER}) as span:
+        try:
+            messages = prompt.invoke({"system_prompt": system_prompt, "ticker": ticker})
+            analysis = get_agent().invoke(messages)
+            stats.add_stage("agent", time.perf_counter() - start)
+            ANALYZE_LATENCY.labels(API_PROVIDER, "success").observe(time.perf_counter() - start)
+            AGENT_STEPS.labels(API_PROVIDER).observe(stats.agent_steps)
+            span.set_attribute("agent.steps", stats.agent_steps)
+            span.set_attribute("agent.tool_calls", stats.tool_calls)
+            logging.info(f"Successfully analyzed ticker: {ticker}") 
+            # Returned with the result so the caller can store it with the article
+            analysis["run_stats"] = stats
+            return analysis
+        except Exception as e:
+            ANALYZE_LATENCY.labels(API_PROVIDER, "error").observe(time.perf_counter() - start)
+            logging.error(f"Error analyzing ticker {ticker}: {e}", exc_info=True) 
+            raise 
+        finally:
+            current_run_stats.reset(stats_token)
@@ -0,0 +1,132 @@
+# llm/callbacks.py
+"""
+LangChain callback handler that instruments the agent pipeline.
+
+The handler is attached once to the compiled agent. Per-analysis counters go to
+the RunStats object that analyze_news places in `current_run_stats`, so
+concurrent analyses never share counts. Every model call and tool call is also
+traced as a child span of the active analyze_news span.
+"""
+
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from opentelemetry.trace import Status, StatusCode
+from common.metrics import LLM_TOKENS, TOOL_LATENCY
+from common.tracing import tracer
+
+
+@dataclass
+class RunStats:
+    agent_steps: int = 0
+    tool_calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    # Wall time per pipeline stage in seconds (agent, llm, tools, insert, total)
+    stage_seconds: dict = field(default_factory=dict)
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+
+current_run_stats: ContextVar[Optional[RunStats]] = ContextVar("current_run_stats", default=None)
+
+
+class PipelineCallbackHandler(BaseCallbackHandler):
+    """
+    Records model calls, token usage and tool latency for every agent run.
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self._tool_runs = {}
+        self._model_runs = {}
+        self._spans = {}
+        self._input_tokens = LLM_TOKENS.labels(provider, model, "input")
+        self._output_tokens = LLM_TOKENS.labels(provider, model, "output")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        stats = current_run_stats.get()
+        if stats is not None:
+            stats.agent_steps += 1
+        self._model_runs[run_id] = time.perf_counter()
+        self._spans[run_id] = tracer.start_span(
+            "agent.step", attributes={"llm.provider": self.provider, "llm.model": self.model}
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish_model(run_id)
+        self._end_span(run_id, error)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        input_tokens = output_tokens = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                input_tokens += usage.get("input_tokens", 0)
+                output_tokens += usage.get("output_tokens", 0)
+        self._input_tokens.inc(input_tokens)
+        self._output_tokens.inc(output_tokens)
+        stats = current_run_stats.get()
+        if stats is not None:
+            stats.input_tokens += input_tokens
+            stats.output_tokens += output_tokens
+        self._finish_model(run_id)
+        span = self._spans.get(run_id)
+        if span is not None:
+            span.set_attribute("llm.input_tokens", input_tokens)
+            span.set_attribute("llm.output_tokens", output_tokens)
+        self._end_span(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._tool_runs[run_id] = (name, time.perf_counter())
+        self._spans[run_id] = tracer.start_span(f"tool.{name}", attributes={"tool.input": str(input_str)[:200]})
+        stats = current_run_stats.get()
+        if stats is not None:
+            stats.tool_calls += 1
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        # Tools report Tickertick failures as {"error": ...} instead of raising
+        content = getattr(output, "content", output)
+        failed = isinstance(content, dict) and "error" in content or \
+            isinstance(content, str) and content.startswith('{"error"')
+        self._finish_tool(run_id, "api_error" if failed else "success")
+        self._end_span(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, "error")
+        self._end_span(run_id, error)
+
+    def _finish_model(self, run_id) -> None:
+        start = self._model_runs.pop(run_id, None)
+        stats = current_run_stats.get()
+        if start is not None and stats is not None:
+            stats.add_stage("llm", time.perf_counter() - start)
+
+    def _finish_tool(self, run_id, outcome: str) -> None:
+        name, start = self._tool_runs.pop(run_id, ("unknown", None))
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            TOOL_LATENCY.labels(name, outcome).observe(elapsed)
+            stats = current_run_stats.get()
+            if stats is not None:
+                stats.add_stage("tools", elapsed)
+        span = self._spans.get(run_id)
+        if span is not None:
+            span.set_attribute("tool.outcome", outcome)
+            if outcome != "success":
+                span.set_status(Status(StatusCode.ERROR, outcome))
+
+    def _end_span(self, run_id, error: Exception = None) -> None:
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)))
+        span.end()
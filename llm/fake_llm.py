@@ -0,0 +1,214 @@
+# llm/fake_llm.py
+"""
+Deterministic offline chat model for capacity testing.
+
+FakeChatModel plays one ReAct round without any network access to a provider:
+it asks for the real news tool, waits for the tool result, then returns a
+NewsAnalysis built from the stories the tool returned. Latency and failures
+are scripted from environment variables:
+
+    FAKE_LLM_SEED                seed for latency and failure draws (default 0)
+    FAKE_LLM_TTFT                time to first token, e.g. "fixed:300",
+                                 "uniform:100,500", "normal:300,50" or
+                                 "lognormal:300,0.5" (median ms, sigma)
+    FAKE_LLM_TOKENS_PER_SECOND   generation speed; 0 means instant (default 0)
+    FAKE_LLM_RATE_LIMIT_RATE     share of calls failing with a 429 (default 0)
+    FAKE_LLM_TIMEOUT_RATE        share of calls that hang and time out (default 0)
+    FAKE_LLM_TIMEOUT_SECONDS     how long a timed out call hangs (default 30)
+    FAKE_LLM_NEWS_LIMIT          news items requested from the tool (default 10)
+"""
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+SENTIMENT_SCALE = ["Strongly Bearish", "Bearish", "Slightly Bearish", "Neutral",
+                   "Slightly Bullish", "Bullish", "Strongly Bullish"]
+
+
+class FakeRateLimitError(Exception):
+    """Raised when the fake provider simulates an HTTP 429."""
+    status_code = 429
+
+
+def parse_latency(spec: str):
+    """
+    Parse a latency distribution spec into a function rng -> milliseconds.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        # median in ms and sigma of the underlying normal
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+    raise ValueError(f"Invalid latency spec {spec!r}")
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly four characters per token, like most BPE vocabularies on English."""
+    return max(1, len(text) // 4)
+
+
+def _stable_index(text: str, size: int) -> int:
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16) % size
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Offline stand-in for a provider chat model with a scriptable latency and token model.
+    """
+    model_name: str = "fake-analyst"
+    seed: int = 0
+    ttft: str = "fixed:0"
+    tokens_per_second: float = 0.0
+    rate_limit_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 30.0
+    news_limit: int = 10
+
+    _rng: random.Random = PrivateAttr()
+    _lock: Any = PrivateAttr()
+    _ttft_sampler: Any = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+        self._ttft_sampler = parse_latency(self.ttft)
+
+    @classmethod
+    def from_env(cls) -> "FakeChatModel":
+        return cls(
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+            ttft=os.getenv("FAKE_LLM_TTFT", "fixed:0"),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "0")),
+            rate_limit_rate=float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", "0")),
+            timeout_rate=float(os.getenv("FAKE_LLM_TIMEOUT_RATE", "0")),
+            timeout_seconds=float(os.getenv("FAKE_LLM_TIMEOUT_SECONDS", "30")),
+            news_limit=int(os.getenv("FAKE_LLM_NEWS_LIMIT", "10")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    def with_structured_output(self, schema, **kwargs):
+        # Answered by _generate like any other call, so callbacks see its latency and token usage
+        return self.bind(structured_output=schema) | RunnableLambda(
+            lambda message: schema.model_validate_json(message.content))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        ticker = _ticker_from_messages(messages)
+        tool_names = [t["function"]["name"] for t in kwargs.get("tools", [])]
+        schema = kwargs.get("structured_output")
+
+        if schema is not None:
+            content = schema(**build_analysis(ticker, messages)).model_dump_json()
+            tool_calls = []
+            output_text = content
+        elif tool_names and not any(isinstance(m, ToolMessage) for m in messages):
+            tool_name = "get_curated_news_tool" if ticker.upper() == "MARKET" else "get_ticker_news_tool"
+            args = {"limit": self.news_limit} if tool_name == "get_curated_news_tool" \
+                else {"ticker": ticker, "limit": self.news_limit}
+            content = ""
+            tool_calls = [{"name": tool_name, "args": args,
+                           "id": f"call_{_stable_index(ticker + tool_name, 10**8)}", "type": "tool_call"}]
+            output_text = json.dumps({"name": tool_name, "args": args})
+        else:
+            content = f"Collected the latest news for {ticker}."
+            tool_calls = []
+            output_text = content
+
+        message = AIMessage(content=content, tool_calls=tool_calls)
+        self._simulate_call(messages, output_text, message)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _simulate_call(self, messages: List[BaseMessage], output_text: str, message: AIMessage) -> None:
+        """
+        Sleep for the scripted latency, raise scripted failures and attach token usage.
+        """
+        with self._lock:
+            draw = self._rng.random()
+            ttft_ms = self._ttft_sampler(self._rng)
+
+        if draw < self.rate_limit_rate:
+            raise FakeRateLimitError("Rate limit exceeded (429) from fake provider")
+        if draw < self.rate_limit_rate + self.timeout_rate:
+            time.sleep(self.timeout_seconds)
+            raise TimeoutError(f"Fake provider timed out after {self.timeout_seconds}s")
+
+        input_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = estimate_tokens(output_text)
+        delay = ttft_ms / 1000
+        if self.tokens_per_second > 0:
+            delay += output_tokens / self.tokens_per_second
+        if delay > 0:
+            time.sleep(delay)
+
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        message.response_metadata = {"model_name": self.model_name}
+
+
+def _ticker_from_messages(messages: List[BaseMessage]) -> str:
+    for message in messages:
+        if isinstance(message, HumanMessage) and "analyze is" in str(message.content):
+            return str(message.content).rsplit("analyze is", 1)[-1].strip() or "MARKET"
+    return "MARKET"
+
+
+def build_analysis(ticker: str, messages: List[BaseMessage]) -> dict:
+    """
+    Build NewsAnalysis fields from the tool results in the conversation.
+    Each story gets a sentiment derived from a hash of its headline.
+    """
+    stories = []
+    for message in messages:
+        if isinstance(message, ToolMessage):
+            try:
+                stories.extend(json.loads(message.content).get("stories", []))
+            except (TypeError, ValueError, AttributeError):
+                continue
+
+    rows = ["| Time | Headline | Sentiment | Reason | Source |",
+            "|------|----------|-----------|--------|--------|"]
+    score = 0
+    for story in stories:
+        headline = str(story.get("title") or story.get("headline") or "Untitled")
+        index = _stable_index(headline, len(SENTIMENT_SCALE))
+        score += index - 3
+        story_time = str(story.get("time", ""))[:16].replace("T", " ")
+        rows.append(f"| {story_time} | {headline} | {SENTIMENT_SCALE[index]} "
+                    f"| Simulated assessment of the headline | {story.get('site') or 'Unknown'} |")
+
+    overall = "Bullish" if score > 0 else "Bearish" if score < 0 else "Neutral"
+    return {
+        "ticker": ticker.upper(),
+        "overall_sentiment": overall,
+        "summary": f"Simulated analysis of {len(stories)} news items for {ticker.upper()}. "
+                   f"The overall tone is {overall.lower()}.",
+        "analysis": "\n".join(rows),
+    }
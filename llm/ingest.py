@@ -0,0 +1,190 @@
+# llm/ingest.py
+"""
+Background ingestion of Tickertick news into the local stories collection.
+
+The news tools used to fetch every feed live while the user waited.
+StoryIngestWorker polls the feeds the agent asks for most often (curated news,
+and the ticker and broad ticker feeds of tracked tickers) and upserts their
+stories into `stories`. StoryStore then answers those tool calls from MongoDB
+and falls back to Tickertick only on a miss: a query that is not ingested, or
+one whose last poll is older than INGEST_MAX_AGE_SECONDS.
+
+Each feed query keeps a cursor in `story_feeds`, the id and time of the newest
+story stored for it. A poll walks the feed from the newest story back to the
+cursor, so it only pays for stories that are actually new:
+
+    INGEST_INTERVAL_SECONDS     time between polls (default 0: off)
+    INGEST_TICKERS              comma separated tickers that are always ingested
+    INGEST_TOP_N                plus this many of the most requested tickers (default 5)
+    INGEST_CURATED              also ingest curated news (default true)
+    INGEST_BACKFILL_STORIES     stories read on the first poll of a query (default 100)
+    INGEST_MAX_AGE_SECONDS      serve a query locally while its last poll is this recent
+                                (default 3 x INGEST_INTERVAL_SECONDS)
+    INGEST_RETENTION_DAYS       stories are dropped this long after they were published (default 30)
+"""
+
+import logging
+import os
+import threading
+from contextlib import closing
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import requests
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from common.metrics import STORIES_INGESTED, STORY_STORE_READS
+from common.models import StoryModel
+from tool import (CURATED_QUERY, RATE_LIMIT, FeedError, broad_ticker_news_query, feed_key, iter_feed_pages,
+                  ticker_news_query)
+
+
+class StoryStore:
+    """
+    Reads feed queries from the stories collection while their last poll is
+    younger than `max_age_seconds`.
+    """
+
+    def __init__(self, stories: Collection, feeds: Collection, max_age_seconds: float):
+        self.stories = stories
+        self.feeds = feeds
+        self.max_age_seconds = max_age_seconds
+
+    def read(self, query: str, limit: int = 30) -> Optional[dict]:
+        """
+        The newest stored stories for `query` in get_feed's shape, or None on a miss
+        """
+        try:
+            state = StoryModel.get_feed_state(self.feeds, query)
+            if state is None or datetime.utcnow() - state["polled_at"] > timedelta(seconds=self.max_age_seconds):
+                STORY_STORE_READS.labels("miss").inc()
+                return None
+            stories = StoryModel.get_stories(self.stories, query, limit)
+        except PyMongoError as e:
+            logging.error(f"Failed to read {query} from the story store: {e}")
+            STORY_STORE_READS.labels("miss").inc()
+            return None
+        STORY_STORE_READS.labels("hit").inc()
+        return {"stories": stories}
+
+
+class StoryIngestWorker:
+    """
+    Background thread polling the feed queries of `tracked()` tickers, and
+    curated news, every `interval_seconds`. Queries are polled one after
+    another, `min_interval_seconds` apart, to stay within the Tickertick rate limit.
+    """
+
+    def __init__(self, stories: Collection, feeds: Collection, tracked: Callable[[], list],
+                 interval_seconds: float = 300.0, curated: bool = True, backfill_stories: int = 100,
+                 max_stories_per_poll: int = 200, page_size: int = 50,
+                 min_interval_seconds: float = 60 / RATE_LIMIT):
+        self.stories = stories
+        self.feeds = feeds
+        self.tracked = tracked
+        self.interval_seconds = interval_seconds
+        self.curated = curated
+        self.backfill_stories = backfill_stories
+        self.max_stories_per_poll = max_stories_per_poll
+        self.page_size = page_size
+        self.min_interval_seconds = min_interval_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="story-ingest", daemon=True)
+
+    @classmethod
+    def from_env(cls, stories: Collection, feeds: Collection,
+                 popular: Callable[[int], list]) -> Optional["StoryIngestWorker"]:
+        """
+        Build a worker from the INGEST_* settings, or None when ingestion is off.
+        `popular(n)` returns the n most requested tickers.
+        """
+        interval_seconds = float(os.getenv("INGEST_INTERVAL_SECONDS", "0"))
+        if interval_seconds <= 0:
+            return None
+        pinned = [t.strip().upper() for t in os.getenv("INGEST_TICKERS", "").split(",") if t.strip()]
+        top_n = int(os.getenv("INGEST_TOP_N", "5"))
+
+        def tracked():
+            tickers = list(pinned)
+            for ticker in popular(top_n) if top_n > 0 else []:
+                if ticker not in tickers:
+                    tickers.append(ticker)
+            return tickers
+
+        return cls(
+            stories, feeds, tracked, interval_seconds,
+            curated=os.getenv("INGEST_CURATED", "true").lower() == "true",
+            backfill_stories=int(os.getenv("INGEST_BACKFILL_STORIES", "100")),
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Story ingestion pass failed: {e}")
+            if self._stop.wait(self.interval_seconds):
+                break
+
+    def queries(self) -> list:
+        queries = [CURATED_QUERY] if self.curated else []
+        for ticker in self.tracked():
+            queries += [ticker_news_query(ticker), broad_ticker_news_query(ticker)]
+        return queries
+
+    def run_once(self) -> int:
+        """
+        Poll every ingested query once and return how many new stories were stored
+        """
+        ingested = 0
+        for i, query in enumerate(self.queries()):
+            if i and self._stop.wait(self.min_interval_seconds):
+                break
+            try:
+                ingested += self.ingest(query)
+            except (FeedError, requests.RequestException, PyMongoError) as e:
+                logging.error(f"Failed to ingest {query}: {e}")
+        return ingested
+
+    def ingest(self, query: str) -> int:
+        """
+        Store the stories of `query` newer than its cursor and move the cursor.
+        The first poll of a query reads back `backfill_stories` stories.
+        """
+        key = feed_key(query)
+        state = StoryModel.get_feed_state(self.feeds, key) or {}
+        cursor = state.get("cursor")
+        max_stories = self.max_stories_per_poll if cursor is not None else self.backfill_stories
+        newest = None
+        ingested = 0
+        pages = iter_feed_pages(query, self.page_size, since=state.get("cursor_time"), max_stories=max_stories,
+                                min_interval_seconds=self.min_interval_seconds)
+        with closing(pages):
+            for page in pages:
+                newest = newest or page[0]
+                ids = [story.id for story in page]
+                reached_cursor = cursor in ids
+                if reached_cursor:
+                    page = page[:ids.index(cursor)]
+                ingested += StoryModel.upsert_stories(self.stories, key, [story.to_dict() for story in page])
+                if reached_cursor:
+                    break
+                if self._stop.is_set():
+                    # An unfinished poll keeps the old cursor so the gap is read again next time
+                    STORIES_INGESTED.inc(ingested)
+                    return ingested
+        StoryModel.set_feed_state(self.feeds, key, newest.id if newest else None,
+                                  newest.published_at if newest else None)
+        STORIES_INGESTED.inc(ingested)
+        if ingested:
+            logging.info(f"Ingested {ingested} new stories for {query}")
+        return ingested
@@ -1,17 +1,112 @@
 # llm/llm_app.py
 import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from common.models import MongoDBConnection, ArticleModel
+from common.models import MongoDBConnection, ArticleModel, AnalysisRunModel, StoryModel
+from common.metrics import ANALYSIS_CACHE, instrument_app
+from common.tracing import instrument_tracing, setup_tracing
+from common.profiling import instrument_profiling, record_stage, stage
+from common.warmup import WarmUp, warm_mongo_connections
+from common.retention import RetentionPolicy, RetentionWorker
 from pymongo.errors import PyMongoError
 from typing import Dict
 from fastapi.responses import JSONResponse
-from agent import analyze_news
-from datetime import datetime
+from agent import analyze_news, warm_up_llm, API_PROVIDER, MODEL_NAME
+from prewarm import InteractiveActivity, PrewarmScheduler, TickerPopularity
+from ingest import StoryIngestWorker, StoryStore
+from tool import set_local_feed
+from datetime import datetime, timedelta
 
-app = FastAPI()
+warmup = WarmUp("llm")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start warm-up in the background; /readyz reports ready once it finishes.
+    """
+    task = warmup.start()
+    if retention_worker is not None:
+        retention_worker.start()
+    if prewarm_scheduler is not None:
+        prewarm_scheduler.start()
+    if story_ingest is not None:
+        story_ingest.start()
+    yield
+    task.cancel()
+    if retention_worker is not None:
+        retention_worker.stop()
+    if prewarm_scheduler is not None:
+        prewarm_scheduler.stop()
+    if story_ingest is not None:
+        story_ingest.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+setup_tracing("llm")
+instrument_app(app, "llm")
+instrument_tracing(app, "llm")
+instrument_profiling(app, "llm")
 conn = MongoDBConnection()
 # Use the articles collection instead of sentiments
 articles_collection = conn.get_collection("articles")
+runs_collection = conn.get_collection("analysis_runs")
+stories_collection = conn.get_collection("stories")
+story_feeds_collection = conn.get_collection("story_feeds")
+
+
+def ensure_indexes():
+    ArticleModel.ensure_indexes(articles_collection)
+    AnalysisRunModel.ensure_indexes(runs_collection)
+    StoryModel.ensure_indexes(stories_collection, story_feeds_collection,
+                              float(os.getenv("INGEST_RETENTION_DAYS", "30")))
+
+
+# Background compaction of old articles, off unless a RETENTION_* keep rule is set
+retention_policy = RetentionPolicy.from_env()
+retention_worker = RetentionWorker(
+    articles_collection,
+    retention_policy,
+    archive=conn.get_collection("article_archive"),
+    interval_seconds=float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600")),
+) if retention_policy.enabled else None
+
+# /analyze answers from a stored analysis younger than this (0: always run the agent)
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "0"))
+
+
+def latest_created_at(ticker: str):
+    article = ArticleModel.get_latest_article(articles_collection, ticker, projection={"created_at": 1})
+    return article["created_at"] if article else None
+
+
+def refresh_analysis(ticker: str):
+    return run_analysis(ticker)[1]
+
+
+# Demand per ticker, and background refreshes of the hottest ones (off unless PREWARM_TOP_N is set)
+ticker_popularity = TickerPopularity(half_life_seconds=float(os.getenv("PREWARM_HALF_LIFE_SECONDS", "3600")))
+interactive_activity = InteractiveActivity()
+prewarm_scheduler = PrewarmScheduler.from_env(
+    ticker_popularity, interactive_activity, refresh_analysis, latest_created_at, ANALYSIS_CACHE_TTL_SECONDS,
+)
+
+# Background news ingestion, and tool reads from the local stories (off unless INGEST_INTERVAL_SECONDS is set)
+story_ingest = StoryIngestWorker.from_env(
+    stories_collection, story_feeds_collection, lambda n: [ticker for ticker, _ in ticker_popularity.top(n)],
+)
+if story_ingest is not None:
+    set_local_feed(StoryStore(
+        stories_collection, story_feeds_collection,
+        float(os.getenv("INGEST_MAX_AGE_SECONDS", str(3 * story_ingest.interval_seconds))),
+    ).read)
+
+warmup.add("mongo_connections", lambda: warm_mongo_connections(conn), required=True)
+warmup.add("indexes", ensure_indexes)
+warmup.add("llm", warm_up_llm)
+warmup.install(app)
 
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -21,20 +116,23 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 async def analyze(ticker: str) -> Dict:
     """
     Process an analysis request for a stock ticker.
-    Saves the result to the database and returns a 202 status.
+    Saves the result to the database and returns a 202 status. Within
+    ANALYSIS_CACHE_TTL_SECONDS of the last analysis the stored one is kept instead.
     """
+    ticker_popularity.record(ticker.upper())
     try:
-        raw_result = analyze_news(ticker)
-        result = raw_result['structured_response'].model_dump()
-        logging.info(f"result from analyze_news: {result}")
-
+        if ANALYSIS_CACHE_TTL_SECONDS > 0:
+            created_at = latest_created_at(ticker)
+            if created_at is not None and datetime.utcnow() - created_at < timedelta(seconds=ANALYSIS_CACHE_TTL_SECONDS):
+                ANALYSIS_CACHE.labels("hit").inc()
+                return JSONResponse(
+                    status_code=202,
+                    content={"status": "cached", "message": f"Analysis for {ticker} is up to date.", "ticker": ticker},
+                )
+            ANALYSIS_CACHE.labels("miss").inc()
 
-        article_data = ArticleModel.create_article(ticker, result['overall_sentiment'], result['summary'], result['analysis'])
-        
-        # Insert the article into the database
-        insert_result = articles_collection.insert_one(article_data)
-        if not insert_result.inserted_id:
-             raise HTTPException(status_code=500, detail="Failed to insert article into database.")
+        with interactive_activity.running():
+            run_analysis(ticker)
 
         # Return a 202 Accepted response indicating the task is queued/processing
         return JSONResponse(
@@ -46,7 +144,7 @@ async def analyze(ticker: str) -> Dict:
                 # Removed summary and analysis from the response
             }
         )
-        
+
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     except Exception as e:
@@ -55,6 +153,50 @@ async def analyze(ticker: str) -> Dict:
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+def run_analysis(ticker: str):
+    """
+    Run the agent for a ticker and store the article and its run record.
+    Returns the article id and the RunStats (None when the agent did not report them).
+    """
+    start = time.perf_counter()
+    with stage("agent"):
+        raw_result = analyze_news(ticker)
+    result = raw_result['structured_response'].model_dump()
+    logging.info(f"result from analyze_news: {result}")
+
+    article_data = ArticleModel.create_article(ticker, result['overall_sentiment'], result['summary'], result['analysis'])
+
+    # Insert the article into the database
+    insert_start = time.perf_counter()
+    insert_result = ArticleModel.insert_article(articles_collection, article_data)
+    if not insert_result.inserted_id:
+        raise HTTPException(status_code=500, detail="Failed to insert article into database.")
+
+    run_stats = raw_result.get("run_stats")
+    if run_stats is not None:
+        for name in ("llm", "tools"):
+            record_stage(name, run_stats.stage_seconds.get(name, 0.0))
+        run_stats.add_stage("insert", time.perf_counter() - insert_start)
+        run_stats.add_stage("total", time.perf_counter() - start)
+        record_run(insert_result.inserted_id, ticker, run_stats)
+    return insert_result.inserted_id, run_stats
+
+
+def record_run(article_id, ticker: str, run_stats) -> None:
+    """
+    Store the performance record of an analysis. The article is already saved,
+    so a failure here is logged rather than failing the request.
+    """
+    run = AnalysisRunModel.create_run(
+        article_id, ticker, API_PROVIDER, MODEL_NAME, run_stats.stage_seconds,
+        run_stats.agent_steps, run_stats.tool_calls, run_stats.input_tokens, run_stats.output_tokens,
+    )
+    try:
+        AnalysisRunModel.insert_run(runs_collection, run)
+    except PyMongoError as e:
+        logging.error(f"Failed to record analysis run for {ticker}: {e}")
+
+
 @app.get("/healthz")
 async def healthcheck():
     """
@@ -62,7 +204,7 @@ async def healthcheck():
     """
     try:
         # This will raise if Mongo isn't reachable
-        conn._client.admin.command("ping")
+        conn.client.admin.command("ping")
         return {"status": "ok", "mongo": "reachable"}
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=f"MongoDB ping failed: {e}")
@@ -0,0 +1,234 @@
+# llm/prewarm.py
+"""
+Popularity-driven pre-warming of analyses for hot tickers.
+
+/analyze answers from the latest stored analysis while it is younger than
+ANALYSIS_CACHE_TTL_SECONDS. PrewarmScheduler keeps those answers warm for the
+most requested tickers: every PREWARM_INTERVAL_SECONDS it takes the
+PREWARM_TOP_N tickers by time-decayed request count and re-runs the analysis
+of any whose latest article goes stale within PREWARM_LEAD_SECONDS.
+
+Warming yields to users. It runs one analysis at a time on its own thread,
+starts one only when no interactive analysis has been running for
+PREWARM_IDLE_SECONDS, and spends from two budgets that refill continuously:
+
+    PREWARM_TOP_N                       tickers kept warm (default 0: off)
+    PREWARM_INTERVAL_SECONDS            time between passes (default 60)
+    PREWARM_LEAD_SECONDS                refresh this long before an answer goes stale (default 300)
+    PREWARM_HALF_LIFE_SECONDS           half-life of the request counts (default 3600)
+    PREWARM_IDLE_SECONDS                quiet time needed after a user analysis (default 5)
+    PREWARM_LLM_CALLS_PER_HOUR          model calls warming may make per hour (default 60)
+    PREWARM_TICKERTICK_CALLS_PER_HOUR   Tickertick calls warming may make per hour (default 60)
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from common.metrics import PREWARM_REFRESHES
+
+
+class TickerPopularity:
+    """
+    Request counts per ticker that halve every `half_life_seconds`.
+    At most `max_tickers` are tracked; the least requested are dropped first.
+    """
+
+    def __init__(self, half_life_seconds: float = 3600.0, max_tickers: int = 1000, clock=time.monotonic):
+        self._decay = math.log(2) / half_life_seconds
+        self.max_tickers = max_tickers
+        self._clock = clock
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _score(self, ticker: str, now: float) -> float:
+        count, updated_at = self._counts.get(ticker, (0.0, now))
+        return count * math.exp(-self._decay * (now - updated_at))
+
+    def record(self, ticker: str) -> None:
+        with self._lock:
+            now = self._clock()
+            self._counts[ticker] = (self._score(ticker, now) + 1, now)
+            if len(self._counts) > self.max_tickers:
+                ranked = sorted(self._counts, key=lambda t: self._score(t, now))
+                for dropped in ranked[:len(ranked) - self.max_tickers * 9 // 10]:
+                    del self._counts[dropped]
+
+    def top(self, n: int) -> list:
+        """
+        The `n` most requested tickers as (ticker, score) pairs, highest first.
+        """
+        with self._lock:
+            now = self._clock()
+            scores = [(ticker, self._score(ticker, now)) for ticker in self._counts]
+        return sorted(scores, key=lambda item: item[1], reverse=True)[:n]
+
+
+class Budget:
+    """
+    Token bucket holding up to one hour of `per_hour` units, refilled continuously.
+    Spending may overdraw it, which is repaid before the next spend is allowed.
+    """
+
+    def __init__(self, per_hour: float, clock=time.monotonic):
+        self.capacity = per_hour
+        self.tokens = per_hour
+        self._rate = per_hour / 3600
+        self._clock = clock
+        self._updated_at = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def available(self, amount: float) -> bool:
+        self._refill()
+        return self.tokens >= amount
+
+    def spend(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+
+class InteractiveActivity:
+    """
+    Tracks user-triggered analyses so background work can stay out of their way.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._active = 0
+        self._last_finished = float("-inf")
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def running(self):
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_finished = self._clock()
+
+    def idle_for(self, seconds: float) -> bool:
+        with self._lock:
+            return self._active == 0 and self._clock() - self._last_finished >= seconds
+
+
+class PrewarmScheduler:
+    """
+    Background thread refreshing the analyses of the most requested tickers
+    before they go stale.
+
+    `refresh(ticker)` runs and stores an analysis and returns its RunStats (or None);
+    `last_refreshed(ticker)` returns the creation time of the latest stored analysis.
+    """
+
+    def __init__(self, popularity: TickerPopularity, activity: InteractiveActivity,
+                 refresh: Callable, last_refreshed: Callable, top_n: int, ttl_seconds: float,
+                 interval_seconds: float = 60.0, lead_seconds: float = 300.0, idle_seconds: float = 5.0,
+                 llm_calls_per_hour: float = 60.0, tickertick_calls_per_hour: float = 60.0):
+        self.popularity = popularity
+        self.activity = activity
+        self.refresh = refresh
+        self.last_refreshed = last_refreshed
+        self.top_n = top_n
+        self.ttl_seconds = ttl_seconds
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.idle_seconds = idle_seconds
+        self.llm_budget = Budget(llm_calls_per_hour)
+        self.tickertick_budget = Budget(tickertick_calls_per_hour)
+        # Expected calls per analysis, updated from each refresh's run stats
+        self.expected_llm_calls = 3.0
+        self.expected_tickertick_calls = 2.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="analysis-prewarm", daemon=True)
+
+    @classmethod
+    def from_env(cls, popularity: TickerPopularity, activity: InteractiveActivity, refresh: Callable,
+                 last_refreshed: Callable, ttl_seconds: float) -> Optional["PrewarmScheduler"]:
+        """
+        Build a scheduler from the PREWARM_* settings, or None when warming is off.
+        """
+        top_n = int(os.getenv("PREWARM_TOP_N", "0"))
+        if top_n <= 0:
+            return None
+        if ttl_seconds <= 0:
+            logging.error("PREWARM_TOP_N is set but ANALYSIS_CACHE_TTL_SECONDS is not, so pre-warming is off")
+            return None
+        return cls(
+            popularity, activity, refresh, last_refreshed, top_n, ttl_seconds,
+            interval_seconds=float(os.getenv("PREWARM_INTERVAL_SECONDS", "60")),
+            lead_seconds=float(os.getenv("PREWARM_LEAD_SECONDS", "300")),
+            idle_seconds=float(os.getenv("PREWARM_IDLE_SECONDS", "5")),
+            llm_calls_per_hour=float(os.getenv("PREWARM_LLM_CALLS_PER_HOUR", "60")),
+            tickertick_calls_per_hour=float(os.getenv("PREWARM_TICKERTICK_CALLS_PER_HOUR", "60")),
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Pre-warming pass failed: {e}")
+
+    def _is_stale_soon(self, ticker: str) -> bool:
+        created_at = self.last_refreshed(ticker)
+        if created_at is None:
+            return True
+        return datetime.utcnow() - created_at >= timedelta(seconds=self.ttl_seconds - self.lead_seconds)
+
+    def run_once(self) -> int:
+        """
+        One pass over the hottest tickers; returns how many were refreshed.
+        The pass ends early when a user analysis is running or a budget runs out.
+        """
+        refreshed = 0
+        for ticker, _ in self.popularity.top(self.top_n):
+            if self._stop.is_set():
+                break
+            if not self._is_stale_soon(ticker):
+                continue
+            if not self.activity.idle_for(self.idle_seconds):
+                PREWARM_REFRESHES.labels("deferred_busy").inc()
+                break
+            if not (self.llm_budget.available(self.expected_llm_calls)
+                    and self.tickertick_budget.available(self.expected_tickertick_calls)):
+                PREWARM_REFRESHES.labels("deferred_budget").inc()
+                break
+            try:
+                run_stats = self.refresh(ticker)
+            except Exception as e:
+                logging.error(f"Pre-warming {ticker} failed: {e}")
+                PREWARM_REFRESHES.labels("failed").inc()
+                # A failed run still used calls; charge the estimate
+                self.llm_budget.spend(self.expected_llm_calls)
+                self.tickertick_budget.spend(self.expected_tickertick_calls)
+                continue
+            llm_calls = run_stats.agent_steps if run_stats is not None else self.expected_llm_calls
+            tickertick_calls = run_stats.tool_calls if run_stats is not None else self.expected_tickertick_calls
+            self.llm_budget.spend(llm_calls)
+            self.tickertick_budget.spend(tickertick_calls)
+            self.expected_llm_calls = 0.8 * self.expected_llm_calls + 0.2 * llm_calls
+            self.expected_tickertick_calls = 0.8 * self.expected_tickertick_calls + 0.2 * tickertick_calls
+            PREWARM_REFRESHES.labels("refreshed").inc()
+            refreshed += 1
+            logging.info(f"Pre-warmed the analysis for {ticker}")
+        return refreshed
@@ -7,6 +7,7 @@ import json
 # Mock environment variables before imports
 with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fake_key"}):
     # Use absolute imports instead
+    from llm import agent as agent_module
     from llm.agent import analyze_news, NewsAnalysis, system_prompt
 
 
@@ -75,5 +76,44 @@ class TestAgent(unittest.TestCase):
         self.assertTrue(kwargs.get("exc_info", False))
 
 
+class TestAgentLifecycle(unittest.TestCase):
+    """Test for the lazy agent construction in agent.py"""
+
+    @patch.object(agent_module, 'agent', None)
+    @patch.object(agent_module, 'llm', None)
+    @patch('llm.agent.create_react_agent')
+    @patch('llm.agent.build_llm')
+    def test_get_agent_builds_once(self, mock_build_llm, mock_create_react_agent):
+        """Test if the LLM client and agent are built on first use and then reused"""
+        first = agent_module.get_agent()
+        second = agent_module.get_agent()
+
+        self.assertIs(first, second)
+        mock_build_llm.assert_called_once()
+        mock_create_react_agent.assert_called_once()
+
+    @patch.dict(os.environ, {"WARMUP_LLM_REQUEST": "true"})
+    @patch.object(agent_module, 'agent', None)
+    @patch.object(agent_module, 'llm', None)
+    @patch('llm.agent.create_react_agent')
+    @patch('llm.agent.build_llm')
+    def test_warm_up_llm_request(self, mock_build_llm, mock_create_react_agent):
+        """Test if warm-up sends one provider request when enabled"""
+        agent_module.warm_up_llm()
+
+        mock_build_llm.return_value.invoke.assert_called_once()
+
+    @patch.object(agent_module, 'agent', None)
+    @patch.object(agent_module, 'llm', None)
+    @patch('llm.agent.create_react_agent')
+    @patch('llm.agent.build_llm')
+    def test_warm_up_llm_without_request(self, mock_build_llm, mock_create_react_agent):
+        """Test if warm-up only builds the client by default"""
+        agent_module.warm_up_llm()
+
+        mock_build_llm.assert_called_once()
+        mock_build_llm.return_value.invoke.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
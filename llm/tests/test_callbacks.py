@@ -0,0 +1,137 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import uuid
+
+from prometheus_client import REGISTRY
+
+from langgraph.prebuilt import create_react_agent
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fake_key"}):
+    from llm.callbacks import PipelineCallbackHandler, RunStats, current_run_stats
+    from llm.fake_llm import FakeChatModel
+    from llm.tool import ticker_news_tool
+
+
+class TestPipelineCallbackHandler(unittest.TestCase):
+    """Test for the agent instrumentation callback handler"""
+
+    def setUp(self):
+        self.handler = PipelineCallbackHandler("TEST", "test-model")
+        self.stats = RunStats()
+        self.token = current_run_stats.set(self.stats)
+
+    def tearDown(self):
+        current_run_stats.reset(self.token)
+
+    def _sample(self, name, labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    def _llm_result(self, input_tokens, output_tokens):
+        generation = MagicMock()
+        generation.message.usage_metadata = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        response = MagicMock()
+        response.generations = [[generation]]
+        return response
+
+    def test_counts_agent_steps(self):
+        """Test if every chat model call counts as one agent step"""
+        self.handler.on_chat_model_start({}, [], run_id=uuid.uuid4())
+        run_id = uuid.uuid4()
+        self.handler.on_chat_model_start({}, [], run_id=run_id)
+        self.handler.on_llm_end(self._llm_result(0, 0), run_id=run_id)
+        self.assertEqual(self.stats.agent_steps, 2)
+        self.assertIn("llm", self.stats.stage_seconds)
+
+    def test_records_tokens(self):
+        """Test if token usage is added to the run stats and the provider counter"""
+        labels = {"provider": "TEST", "model": "test-model", "direction": "input"}
+        before = self._sample("llm_tokens_total", labels)
+
+        self.handler.on_llm_end(self._llm_result(100, 20), run_id=uuid.uuid4())
+
+        self.assertEqual(self.stats.input_tokens, 100)
+        self.assertEqual(self.stats.output_tokens, 20)
+        self.assertEqual(self._sample("llm_tokens_total", labels), before + 100)
+
+    def test_records_tool_latency_and_outcome(self):
+        """Test if tool calls are timed and labelled by outcome"""
+        success = {"tool": "get_ticker_news_tool", "outcome": "success"}
+        api_error = {"tool": "get_ticker_news_tool", "outcome": "api_error"}
+        failed = {"tool": "get_ticker_news_tool", "outcome": "error"}
+        counts = [self._sample("agent_tool_call_duration_seconds_count", l) for l in (success, api_error, failed)]
+
+        for output in ['{"stories": []}', '{"error": "API request failed with status code 500"}']:
+            run_id = uuid.uuid4()
+            self.handler.on_tool_start({"name": "get_ticker_news_tool"}, "AAPL", run_id=run_id)
+            self.handler.on_tool_end(MagicMock(content=output), run_id=run_id)
+        run_id = uuid.uuid4()
+        self.handler.on_tool_start({"name": "get_ticker_news_tool"}, "AAPL", run_id=run_id)
+        self.handler.on_tool_error(RuntimeError("boom"), run_id=run_id)
+
+        self.assertEqual(self._sample("agent_tool_call_duration_seconds_count", success), counts[0] + 1)
+        self.assertEqual(self._sample("agent_tool_call_duration_seconds_count", api_error), counts[1] + 1)
+        self.assertEqual(self._sample("agent_tool_call_duration_seconds_count", failed), counts[2] + 1)
+        self.assertEqual(self.stats.tool_calls, 3)
+        self.assertGreater(self.stats.stage_seconds["tools"], 0)
+
+    def test_without_active_run(self):
+        """Test if callbacks outside analyze_news only update global metrics"""
+        current_run_stats.set(None)
+        self.handler.on_chat_model_start({}, [], run_id=uuid.uuid4())
+        self.handler.on_llm_end(self._llm_result(5, 5), run_id=uuid.uuid4())
+        self.assertEqual(self.stats.agent_steps, 0)
+
+
+class TestPipelineTracing(unittest.TestCase):
+    """Test for the spans opened by the callback handler"""
+
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+        self.tracer = provider.get_tracer("test")
+        patcher = patch('llm.callbacks.tracer', self.tracer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('llm.tool.requests.get')
+    def test_agent_spans_share_the_caller_trace(self, mock_get):
+        """Test if model and tool spans, including tools run on worker threads, nest under the caller"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = b'{"stories": []}'
+        mock_get.return_value = mock_response
+        agent = create_react_agent(FakeChatModel(), tools=ticker_news_tool).with_config(
+            callbacks=[PipelineCallbackHandler("FAKE", "fake-analyst")]
+        )
+
+        with self.tracer.start_as_current_span("analyze_news") as parent:
+            agent.invoke({"messages": [("user", "The ticker you need to analyze is AAPL")]})
+
+        spans = [span for span in self.exporter.get_finished_spans() if span.name != "analyze_news"]
+        names = [span.name for span in spans]
+        self.assertEqual(names.count("agent.step"), 2)
+        self.assertIn("tool.get_ticker_news_tool", names)
+        for span in spans:
+            self.assertEqual(span.context.trace_id, parent.get_span_context().trace_id)
+            self.assertEqual(span.parent.span_id, parent.get_span_context().span_id)
+
+    def test_failed_tool_span(self):
+        """Test if a failing tool call ends its span with an error status"""
+        handler = PipelineCallbackHandler("TEST", "test-model")
+        run_id = uuid.uuid4()
+        handler.on_tool_start({"name": "get_ticker_news_tool"}, "AAPL", run_id=run_id)
+        handler.on_tool_error(RuntimeError("boom"), run_id=run_id)
+
+        span = self.exporter.get_finished_spans()[0]
+        self.assertEqual(span.name, "tool.get_ticker_news_tool")
+        self.assertFalse(span.status.is_ok)
+        self.assertEqual(span.events[0].name, "exception")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import random
+import json
+import os
+
+# Mock environment variables before imports
+with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fake_key"}):
+    from llm.fake_llm import FakeChatModel, FakeRateLimitError, parse_latency, build_analysis
+    from llm.agent import NewsAnalysis, prompt, system_prompt
+    from llm.tool import ticker_news_tool
+
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from langchain_core.messages import HumanMessage, ToolMessage
+from langgraph.prebuilt import create_react_agent
+
+
+class TestParseLatency(unittest.TestCase):
+    """Test for latency distribution specs"""
+
+    def test_fixed(self):
+        """Test a fixed latency always returns the same value"""
+        sampler = parse_latency("fixed:250")
+        self.assertEqual(sampler(random.Random(0)), 250.0)
+
+    def test_uniform_within_bounds(self):
+        """Test uniform samples stay within their bounds"""
+        sampler = parse_latency("uniform:100,200")
+        rng = random.Random(1)
+        samples = [sampler(rng) for _ in range(100)]
+        self.assertTrue(all(100 <= s <= 200 for s in samples))
+
+    def test_same_seed_same_samples(self):
+        """Test the same seed yields the same latency sequence"""
+        sampler = parse_latency("lognormal:300,0.5")
+        first = [sampler(random.Random(7)) for _ in range(3)]
+        second = [sampler(random.Random(7)) for _ in range(3)]
+        self.assertEqual(first, second)
+
+    def test_invalid_spec(self):
+        """Test an unknown distribution is rejected"""
+        with self.assertRaises(ValueError):
+            parse_latency("pareto:1")
+
+
+class TestFakeChatModel(unittest.TestCase):
+    """Test for the FAKE provider chat model"""
+
+    def _conversation(self, ticker="AAPL"):
+        return [HumanMessage(content=f"The ticker you need to analyze is {ticker}")]
+
+    def test_requests_ticker_news_tool_first(self):
+        """Test the first turn asks for the ticker news tool"""
+        model = FakeChatModel(news_limit=5).bind_tools(ticker_news_tool)
+
+        message = model.invoke(self._conversation())
+
+        self.assertEqual(len(message.tool_calls), 1)
+        self.assertEqual(message.tool_calls[0]["name"], "get_ticker_news_tool")
+        self.assertEqual(message.tool_calls[0]["args"], {"ticker": "AAPL", "limit": 5})
+        self.assertGreater(message.usage_metadata["input_tokens"], 0)
+
+    def test_market_uses_curated_news(self):
+        """Test the Market pseudo ticker asks for curated news"""
+        model = FakeChatModel().bind_tools(ticker_news_tool)
+
+        message = model.invoke(self._conversation("Market"))
+
+        self.assertEqual(message.tool_calls[0]["name"], "get_curated_news_tool")
+
+    def test_answers_after_tool_result(self):
+        """Test the model stops calling tools once a tool result is present"""
+        model = FakeChatModel().bind_tools(ticker_news_tool)
+        messages = self._conversation() + [ToolMessage(content='{"stories": []}', tool_call_id="call_1")]
+
+        message = model.invoke(messages)
+
+        self.assertEqual(message.tool_calls, [])
+
+    def test_rate_limit_injection(self):
+        """Test a 100% rate limit share always raises a 429"""
+        model = FakeChatModel(rate_limit_rate=1.0)
+
+        with self.assertRaises(FakeRateLimitError):
+            model.invoke(self._conversation())
+
+    @patch('llm.fake_llm.time.sleep')
+    def test_timeout_injection(self, mock_sleep):
+        """Test a 100% timeout share hangs for the timeout and raises"""
+        model = FakeChatModel(timeout_rate=1.0, timeout_seconds=12)
+
+        with self.assertRaises(TimeoutError):
+            model.invoke(self._conversation())
+
+        mock_sleep.assert_called_once_with(12)
+
+    @patch('llm.fake_llm.time.sleep')
+    def test_latency_model(self, mock_sleep):
+        """Test latency is time to first token plus output tokens over tokens per second"""
+        model = FakeChatModel(ttft="fixed:200", tokens_per_second=10)
+
+        message = model.invoke(self._conversation() + [ToolMessage(content="{}", tool_call_id="call_1")])
+
+        expected = 0.2 + message.usage_metadata["output_tokens"] / 10
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], expected)
+
+    @patch.dict(os.environ, {"FAKE_LLM_SEED": "3", "FAKE_LLM_TTFT": "uniform:1,2", "FAKE_LLM_RATE_LIMIT_RATE": "0.25"})
+    def test_from_env(self):
+        """Test the model is configured from environment variables"""
+        model = FakeChatModel.from_env()
+
+        self.assertEqual(model.seed, 3)
+        self.assertEqual(model.ttft, "uniform:1,2")
+        self.assertEqual(model.rate_limit_rate, 0.25)
+
+    def test_build_analysis_from_stories(self):
+        """Test the structured result is built from the tool's stories"""
+        stories = '{"stories": [{"title": "Apple beats estimates", "site": "cnbc.com", "time": "2024-05-01T14:30:00"}]}'
+        messages = self._conversation() + [ToolMessage(content=stories, tool_call_id="call_1")]
+
+        result = build_analysis("aapl", messages)
+
+        self.assertEqual(result["ticker"], "AAPL")
+        self.assertIn(result["overall_sentiment"], ["Bearish", "Neutral", "Bullish"])
+        self.assertIn("| 2024-05-01 14:30 | Apple beats estimates |", result["analysis"])
+        self.assertIn("cnbc.com", result["analysis"])
+
+    def test_structured_output_reports_usage_to_callbacks(self):
+        """Test the structured answer is a model call that callbacks see, with its token usage"""
+        handler = UsageMetadataCallbackHandler()
+        stories = '{"stories": [{"title": "Apple beats estimates", "site": "cnbc.com"}]}'
+        messages = self._conversation() + [ToolMessage(content=stories, tool_call_id="call_1")]
+
+        result = FakeChatModel().with_structured_output(NewsAnalysis).invoke(messages, config={"callbacks": [handler]})
+
+        self.assertIsInstance(result, NewsAnalysis)
+        self.assertEqual(result.ticker, "AAPL")
+        usage = handler.usage_metadata["fake-analyst"]
+        self.assertGreater(usage["input_tokens"], 0)
+        self.assertGreater(usage["output_tokens"], 0)
+
+    @patch('llm.tool.requests.get')
+    def test_full_agent_round(self, mock_get):
+        """Test the fake model drives the real tools and yields a valid NewsAnalysis"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.content = json.dumps({
+            "stories": [{"id": "1", "time": 1633046400000, "title": "Tesla recalls vehicles", "site": "reuters.com"}]
+        }).encode()
+        mock_get.return_value = mock_response
+        agent = create_react_agent(FakeChatModel(), tools=ticker_news_tool, response_format=NewsAnalysis)
+
+        result = agent.invoke(prompt.invoke({"system_prompt": system_prompt, "ticker": "TSLA"}))
+
+        analysis = result["structured_response"]
+        self.assertIsInstance(analysis, NewsAnalysis)
+        self.assertEqual(analysis.ticker, "TSLA")
+        self.assertIn("Tesla recalls vehicles", analysis.analysis)
+        self.assertIn("2021-10-01 00:00", analysis.analysis)
+        mock_get.assert_called_once()
+        self.assertIn("q=z:TSLA", mock_get.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from llm.ingest import StoryIngestWorker, StoryStore
+from tool import FeedError, Story
+
+
+def pages(*items):
+    yield from items
+
+
+def story(story_id, minute=0):
+    return Story(id=str(story_id), title=f"Story {story_id}", time=1735689600000 + minute * 60000)
+
+
+class TestStoryStore(unittest.TestCase):
+    """Test for the local feed reads in llm/ingest.py"""
+
+    def setUp(self):
+        self.store = StoryStore(MagicMock(), MagicMock(), max_age_seconds=600)
+
+    @patch('llm.ingest.StoryModel')
+    def test_fresh_query_is_a_hit(self, mock_model):
+        """Test if a recently polled query is answered from the stories collection"""
+        mock_model.get_feed_state.return_value = {"polled_at": datetime.utcnow() - timedelta(seconds=60)}
+        mock_model.get_stories.return_value = [story(1).to_dict()]
+
+        self.assertEqual(self.store.read("z:AAPL", 10), {"stories": [story(1).to_dict()]})
+        mock_model.get_stories.assert_called_once_with(self.store.stories, "z:AAPL", 10)
+
+    @patch('llm.ingest.StoryModel')
+    def test_unknown_stale_or_failing_query_is_a_miss(self, mock_model):
+        """Test if queries that were never or not recently polled, or a database error, fall back to live"""
+        mock_model.get_feed_state.return_value = None
+        self.assertIsNone(self.store.read("z:MSFT"))
+
+        mock_model.get_feed_state.return_value = {"polled_at": datetime.utcnow() - timedelta(hours=1)}
+        self.assertIsNone(self.store.read("z:AAPL"))
+
+        mock_model.get_feed_state.side_effect = PyMongoError("down")
+        self.assertIsNone(self.store.read("z:AAPL"))
+        mock_model.get_stories.assert_not_called()
+
+
+class TestStoryIngestWorker(unittest.TestCase):
+    """Test for the background news ingestion in llm/ingest.py"""
+
+    def _worker(self, tracked=("AAPL",), **kwargs):
+        return StoryIngestWorker(MagicMock(), MagicMock(), lambda: list(tracked), min_interval_seconds=0, **kwargs)
+
+    def test_queries(self):
+        """Test if curated news and both feeds of each tracked ticker are polled"""
+        self.assertEqual(self._worker(tracked=["AAPL", "msft"]).queries(),
+                         ["T:curated", "z:AAPL", "tt:AAPL", "z:msft", "tt:msft"])
+        self.assertEqual(self._worker(curated=False).queries(), ["z:AAPL", "tt:AAPL"])
+
+    @patch('llm.ingest.iter_feed_pages')
+    @patch('llm.ingest.StoryModel')
+    def test_ingest_stops_at_cursor(self, mock_model, mock_pages):
+        """Test if a poll stores only the stories newer than the cursor and moves it"""
+        mock_model.get_feed_state.return_value = {"cursor": "7", "cursor_time": datetime(2025, 1, 1, 0, 7)}
+        mock_model.upsert_stories.side_effect = lambda collection, query, page: len(page)
+        mock_pages.return_value = pages([story(10, 10), story(9, 9)], [story(8, 8), story(7, 7), story(6, 6)])
+        worker = self._worker()
+
+        self.assertEqual(worker.ingest("z:aapl"), 3)
+
+        self.assertEqual(mock_pages.call_args[0][0], "z:aapl")
+        mock_model.get_feed_state.assert_called_once_with(worker.feeds, "z:AAPL")
+        self.assertEqual(mock_pages.call_args[1]["since"], datetime(2025, 1, 1, 0, 7))
+        self.assertEqual(mock_pages.call_args[1]["max_stories"], worker.max_stories_per_poll)
+        self.assertEqual([c.args[2] for c in mock_model.upsert_stories.call_args_list],
+                         [[story(10, 10).to_dict(), story(9, 9).to_dict()], [story(8, 8).to_dict()]])
+        mock_model.set_feed_state.assert_called_once_with(worker.feeds, "z:AAPL", "10", datetime(2025, 1, 1, 0, 10))
+
+    @patch('llm.ingest.iter_feed_pages')
+    @patch('llm.ingest.StoryModel')
+    def test_first_poll_backfills(self, mock_model, mock_pages):
+        """Test if a query without a cursor reads back backfill_stories stories"""
+        mock_model.get_feed_state.return_value = None
+        mock_model.upsert_stories.return_value = 0
+        mock_pages.return_value = pages()
+        worker = self._worker(backfill_stories=40)
+
+        self.assertEqual(worker.ingest("T:curated"), 0)
+
+        self.assertIsNone(mock_pages.call_args[1]["since"])
+        self.assertEqual(mock_pages.call_args[1]["max_stories"], 40)
+        # An empty feed still counts as polled
+        mock_model.set_feed_state.assert_called_once_with(worker.feeds, "T:curated", None, None)
+
+    def test_run_once_continues_after_failures(self):
+        """Test if one failing query does not stop the others"""
+        worker = self._worker()
+        worker.ingest = MagicMock(side_effect=[FeedError("429"), PyMongoError("down"), 4])
+
+        self.assertEqual(worker.run_once(), 4)
+        self.assertEqual([c.args[0] for c in worker.ingest.call_args_list], ["T:curated", "z:AAPL", "tt:AAPL"])
+
+    def test_from_env(self):
+        """Test if ingestion is off by default and tracks pinned then popular tickers"""
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertIsNone(StoryIngestWorker.from_env(MagicMock(), MagicMock(), lambda n: []))
+
+        env = {"INGEST_INTERVAL_SECONDS": "120", "INGEST_TICKERS": "tsla, aapl", "INGEST_TOP_N": "2"}
+        popular = MagicMock(return_value=["AAPL", "NVDA"])
+        with patch.dict(os.environ, env, clear=True):
+            worker = StoryIngestWorker.from_env(MagicMock(), MagicMock(), popular)
+
+        self.assertEqual(worker.interval_seconds, 120)
+        self.assertEqual(worker.tracked(), ["TSLA", "AAPL", "NVDA"])
+        popular.assert_called_once_with(2)
+
+
+if __name__ == '__main__':
+    unittest.main()
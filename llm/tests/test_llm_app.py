@@ -5,6 +5,7 @@ import os
 import json
 from fastapi.testclient import TestClient
 from bson import ObjectId
+from datetime import datetime, timedelta
 
 
 # Mock environment variables before imports
@@ -12,6 +13,7 @@ with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fa
     # Import the FastAPI app using absolute imports
     from llm import llm_app
     from llm.llm_app import app
+    from llm.callbacks import RunStats
 
 
 class TestLLMApp(unittest.TestCase):
@@ -64,6 +66,51 @@ class TestLLMApp(unittest.TestCase):
         self.assertEqual(article_data['summary'], 'Positive news about Apple.')
         self.assertEqual(article_data['analysis'], '| Time | Headline | Sentiment | Reason | Source |\n|------|---------|-----------|-------|--------|\n| 2023-05-01 14:30 | Apple reports record earnings | Strongly Bullish | Exceeds expectations | Bloomberg |')
     
+    @patch('llm.llm_app.runs_collection.insert_one')
+    @patch('llm.llm_app.analyze_news')
+    @patch('llm.llm_app.articles_collection.insert_one')
+    def test_analyze_endpoint_records_run(self, mock_insert_one, mock_analyze_news, mock_insert_run):
+        """Test the /analyze/{ticker} endpoint stores the run stats linked to the article"""
+        mock_structured_response = MagicMock()
+        mock_structured_response.model_dump.return_value = {
+            'ticker': 'AAPL', 'overall_sentiment': 'Bullish', 'summary': 'Summary', 'analysis': 'Analysis'
+        }
+        run_stats = RunStats(agent_steps=3, tool_calls=1, input_tokens=900, output_tokens=100)
+        run_stats.add_stage("agent", 2.0)
+        mock_analyze_news.return_value = {'structured_response': mock_structured_response, 'run_stats': run_stats}
+        article_id = ObjectId()
+        mock_insert_one.return_value = MagicMock(inserted_id=article_id)
+
+        response = self.client.post("/analyze/AAPL")
+
+        self.assertEqual(response.status_code, 202)
+        run = mock_insert_run.call_args[0][0]
+        self.assertEqual(run['article_id'], article_id)
+        self.assertEqual(run['provider'], 'GEMINI')
+        self.assertEqual(run['agent_steps'], 3)
+        self.assertEqual(run['total_tokens'], 1000)
+        self.assertEqual(set(run['stage_seconds']), {"agent", "insert", "total"})
+        self.assertGreaterEqual(run['stage_seconds']['total'], run['stage_seconds']['insert'])
+
+    @patch('llm.llm_app.runs_collection.insert_one')
+    @patch('llm.llm_app.analyze_news')
+    @patch('llm.llm_app.articles_collection.insert_one')
+    def test_analyze_endpoint_run_record_failure(self, mock_insert_one, mock_analyze_news, mock_insert_run):
+        """Test the /analyze/{ticker} endpoint still succeeds when the run cannot be recorded"""
+        from pymongo.errors import PyMongoError
+        mock_structured_response = MagicMock()
+        mock_structured_response.model_dump.return_value = {
+            'ticker': 'AAPL', 'overall_sentiment': 'Bullish', 'summary': 'Summary', 'analysis': 'Analysis'
+        }
+        mock_analyze_news.return_value = {'structured_response': mock_structured_response, 'run_stats': RunStats()}
+        mock_insert_one.return_value = MagicMock(inserted_id=ObjectId())
+        mock_insert_run.side_effect = PyMongoError("Test DB error")
+
+        response = self.client.post("/analyze/AAPL")
+
+        self.assertEqual(response.status_code, 202)
+        mock_insert_run.assert_called_once()
+
     @patch('llm.llm_app.analyze_news')
     def test_analyze_endpoint_analyze_news_exception(self, mock_analyze_news):
         """Test the /analyze/{ticker} endpoint when analyze_news raises an exception"""
@@ -151,6 +198,33 @@ class TestLLMApp(unittest.TestCase):
         # Assert insert_one was called
         mock_insert_one.assert_called_once()
     
+    @patch('llm.llm_app.ANALYSIS_CACHE_TTL_SECONDS', 600)
+    @patch('llm.llm_app.ArticleModel.get_latest_article')
+    @patch('llm.llm_app.analyze_news')
+    def test_analyze_endpoint_cache_hit(self, mock_analyze_news, mock_latest):
+        """Test the /analyze/{ticker} endpoint keeps a stored analysis younger than the cache TTL"""
+        mock_latest.return_value = {"_id": ObjectId(), "created_at": datetime.utcnow() - timedelta(seconds=30)}
+
+        response = self.client.post("/analyze/AAPL")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "cached")
+        mock_analyze_news.assert_not_called()
+        self.assertGreater(dict(llm_app.ticker_popularity.top(100)).get("AAPL", 0), 0)
+
+    @patch('llm.llm_app.ANALYSIS_CACHE_TTL_SECONDS', 600)
+    @patch('llm.llm_app.run_analysis', return_value=(ObjectId(), None))
+    @patch('llm.llm_app.ArticleModel.get_latest_article')
+    def test_analyze_endpoint_cache_miss(self, mock_latest, mock_run_analysis):
+        """Test the /analyze/{ticker} endpoint runs the agent when the stored analysis is stale"""
+        mock_latest.return_value = {"_id": ObjectId(), "created_at": datetime.utcnow() - timedelta(seconds=601)}
+
+        response = self.client.post("/analyze/AAPL")
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["status"], "queued")
+        mock_run_analysis.assert_called_once_with("AAPL")
+
     @patch('llm.llm_app.conn')
     def test_healthcheck_success(self, mock_conn):
         """Test the /healthz endpoint when MongoDB is reachable"""
@@ -159,7 +233,7 @@ class TestLLMApp(unittest.TestCase):
         mock_admin = MagicMock()
         mock_admin.command.return_value = True
         mock_client.admin = mock_admin
-        mock_conn._client = mock_client
+        mock_conn.client = mock_client
         
         # Make the request
         response = self.client.get("/healthz")
@@ -181,7 +255,7 @@ class TestLLMApp(unittest.TestCase):
         mock_admin = MagicMock()
         mock_admin.command.side_effect = PyMongoError("Test MongoDB error")
         mock_client.admin = mock_admin
-        mock_conn._client = mock_client
+        mock_conn.client = mock_client
         
         # Make the request
         response = self.client.get("/healthz")
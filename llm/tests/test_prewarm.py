@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+from datetime import datetime, timedelta
+
+from llm.prewarm import Budget, InteractiveActivity, PrewarmScheduler, TickerPopularity
+from llm.callbacks import RunStats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTickerPopularity(unittest.TestCase):
+    """Test for the decayed request counts in llm/prewarm.py"""
+
+    def test_counts_decay_with_half_life(self):
+        """Test if older requests count half as much after one half-life"""
+        clock = FakeClock()
+        popularity = TickerPopularity(half_life_seconds=60, clock=clock)
+        for _ in range(4):
+            popularity.record("AAPL")
+        clock.now += 60
+        popularity.record("MSFT")
+        popularity.record("MSFT")
+
+        top = dict(popularity.top(2))
+        self.assertAlmostEqual(top["AAPL"], 2.0)
+        self.assertAlmostEqual(top["MSFT"], 2.0)
+
+        clock.now += 60
+        self.assertAlmostEqual(dict(popularity.top(2))["AAPL"], 1.0)
+
+    def test_bounded_number_of_tickers(self):
+        """Test if the least requested tickers are dropped past max_tickers"""
+        popularity = TickerPopularity(max_tickers=10, clock=FakeClock())
+        popularity.record("HOT")
+        popularity.record("HOT")
+        for i in range(20):
+            popularity.record(f"T{i}")
+
+        self.assertLessEqual(len(popularity.top(100)), 10)
+        self.assertEqual(popularity.top(1)[0][0], "HOT")
+
+
+class TestBudget(unittest.TestCase):
+    """Test for the hourly token bucket in llm/prewarm.py"""
+
+    def test_refills_per_hour_and_allows_overdraw(self):
+        """Test if spending beyond the balance must be repaid by refill first"""
+        clock = FakeClock()
+        budget = Budget(per_hour=36, clock=clock)
+
+        self.assertTrue(budget.available(36))
+        budget.spend(40)
+        self.assertFalse(budget.available(1))
+
+        # 36 per hour is one every 100 seconds
+        clock.now += 500
+        self.assertTrue(budget.available(1))
+        self.assertFalse(budget.available(2))
+
+        clock.now += 10 ** 6
+        self.assertFalse(budget.available(37))
+
+
+class TestInteractiveActivity(unittest.TestCase):
+    """Test for the user activity tracking in llm/prewarm.py"""
+
+    def test_idle_only_after_quiet_period(self):
+        """Test if activity is idle only when nothing runs and the last run ended long enough ago"""
+        clock = FakeClock()
+        activity = InteractiveActivity(clock=clock)
+        self.assertTrue(activity.idle_for(5))
+
+        with activity.running():
+            self.assertFalse(activity.idle_for(0))
+        clock.now += 2
+        self.assertFalse(activity.idle_for(5))
+        clock.now += 3
+        self.assertTrue(activity.idle_for(5))
+
+
+class TestPrewarmScheduler(unittest.TestCase):
+    """Test for the pre-warming passes in llm/prewarm.py"""
+
+    def _scheduler(self, ages, **kwargs):
+        popularity = TickerPopularity()
+        for ticker in ages:
+            popularity.record(ticker)
+        # Earlier tickers are more popular
+        for i, ticker in enumerate(ages):
+            for _ in range(len(ages) - i):
+                popularity.record(ticker)
+        now = datetime.utcnow()
+        last_refreshed = lambda t: None if ages[t] is None else now - timedelta(seconds=ages[t])
+        refresh = MagicMock(return_value=RunStats(agent_steps=2, tool_calls=1))
+        options = {"top_n": 3, "ttl_seconds": 600, "lead_seconds": 60, "idle_seconds": 0, **kwargs}
+        return PrewarmScheduler(popularity, InteractiveActivity(), refresh, last_refreshed, **options), refresh
+
+    def test_refreshes_hot_tickers_about_to_go_stale(self):
+        """Test if only top-N tickers that are missing or near their TTL are refreshed"""
+        scheduler, refresh = self._scheduler({"AAPL": 590, "MSFT": 10, "TSLA": None, "AMZN": 1000})
+
+        self.assertEqual(scheduler.run_once(), 2)
+
+        self.assertEqual([c[0][0] for c in refresh.call_args_list], ["AAPL", "TSLA"])
+        self.assertAlmostEqual(scheduler.llm_budget.tokens, 56, places=2)
+        self.assertAlmostEqual(scheduler.tickertick_budget.tokens, 58, places=2)
+
+    def test_yields_to_interactive_requests(self):
+        """Test if a pass stops while a user analysis is running"""
+        scheduler, refresh = self._scheduler({"AAPL": None})
+
+        with scheduler.activity.running():
+            self.assertEqual(scheduler.run_once(), 0)
+        refresh.assert_not_called()
+
+    def test_stops_when_budget_is_spent(self):
+        """Test if a pass stops once the hourly budget cannot cover another analysis"""
+        scheduler, refresh = self._scheduler({"AAPL": None, "MSFT": None, "TSLA": None}, llm_calls_per_hour=4)
+
+        self.assertEqual(scheduler.run_once(), 1)
+        refresh.assert_called_once_with("AAPL")
+
+    def test_failure_continues_with_next_ticker(self):
+        """Test if a failed refresh is charged and the pass moves on"""
+        scheduler, refresh = self._scheduler({"AAPL": None, "MSFT": None})
+        refresh.side_effect = [RuntimeError("provider down"), RunStats(agent_steps=2, tool_calls=1)]
+
+        self.assertEqual(scheduler.run_once(), 1)
+        self.assertEqual(refresh.call_count, 2)
+
+    @patch.dict(os.environ, {"PREWARM_TOP_N": "5"}, clear=True)
+    def test_from_env_requires_cache_ttl(self):
+        """Test if pre-warming stays off without a cache TTL or a top-N"""
+        args = (TickerPopularity(), InteractiveActivity(), MagicMock(), MagicMock())
+        self.assertIsNone(PrewarmScheduler.from_env(*args, ttl_seconds=0))
+        self.assertEqual(PrewarmScheduler.from_env(*args, ttl_seconds=600).top_n, 5)
+        with patch.dict(os.environ, {"PREWARM_TOP_N": "0"}):
+            self.assertIsNone(PrewarmScheduler.from_env(*args, ttl_seconds=600))
+
+
+if __name__ == '__main__':
+    unittest.main()
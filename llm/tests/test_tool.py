@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import json
+import time
 from datetime import datetime
 import sys
 import os
@@ -9,7 +10,8 @@ import os
 with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fake_key"}):
     from llm.tool import (
         get_feed, 
-        convert_timestamp_ms_to_iso, 
+        fetch_page,
+        Story,
         get_ticker_news, 
         get_broad_ticker_news,
         get_news_from_source,
@@ -23,40 +25,29 @@ with patch.dict(os.environ, {"LLM_API_PROVIDER": "GEMINI", "GEMINI_API_KEY": "fa
         get_news_for_multiple_tickers_tool,
         get_curated_news_tool,
         get_entity_news_tool,
-        search_tickers_tool
+        search_tickers_tool,
+        iter_feed,
+        iter_feed_pages,
+        FeedError,
+        set_local_feed,
+        feed_key,
     )
 
 class TestToolFunctions(unittest.TestCase):
     """Test for the non-tool functions in tool.py"""
     
-    def test_convert_timestamp_ms_to_iso(self):
-        """Test conversion of timestamp in milliseconds to ISO format"""
-        # Create a sample response with a timestamp in milliseconds
-        test_response = {
-            "stories": [
-                {"time": 1633046400000},  # 2021-10-01 00:00:00 UTC
-                {"time": 1633132800000}   # 2021-10-02 00:00:00 UTC
-            ]
-        }
-        
-        # Convert timestamps in the response
-        result = convert_timestamp_ms_to_iso(test_response)
-        
-        # Check if conversion was done correctly
-        self.assertEqual(result["stories"][0]["time"], "2021-10-01T00:00:00")
-        self.assertEqual(result["stories"][1]["time"], "2021-10-02T00:00:00")
-    
     @patch('llm.tool.requests.get')
     def test_get_feed_success(self, mock_get):
         """Test get_feed function with a successful API response"""
         # Mock response object
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        mock_response.content = json.dumps({
             "stories": [
-                {"time": 1633046400000, "headline": "Test headline"}
+                {"id": "s1", "time": 1633046400000, "title": "Test headline", "site": "example.com",
+                 "url": "https://example.com/s1", "tags": ["aapl"], "similar_stories": ["s2"]}
             ]
-        }
+        }).encode()
         mock_get.return_value = mock_response
         
         # Call the function with a test query
@@ -65,9 +56,30 @@ class TestToolFunctions(unittest.TestCase):
         # Assert that get was called with the correct URL
         mock_get.assert_called_once_with("https://api.tickertick.com/feed?q=test_query&n=10")
         
-        # Check if the result has the timestamp converted
-        self.assertEqual(result["stories"][0]["time"], "2021-10-01T00:00:00")
-        self.assertEqual(result["stories"][0]["headline"], "Test headline")
+        # Check if the result has the timestamp converted and only the fields the analysis uses
+        self.assertEqual(result["stories"], [
+            {"id": "s1", "title": "Test headline", "site": "example.com", "url": "https://example.com/s1",
+             "time": "2021-10-01T00:00:00"}
+        ])
+
+    @patch('llm.tool.requests.get')
+    def test_fetch_page_decodes_stories(self, mock_get):
+        """Test fetch_page returns Story records that convert time on demand"""
+        mock_get.return_value = MagicMock(status_code=200, content=b'{"stories": [{"id": "s1", "time": 1633132800000}]}')
+
+        stories = fetch_page("test_query")
+
+        self.assertEqual(stories, [Story(id="s1", time=1633132800000)])
+        self.assertEqual(stories[0].published_at, datetime(2021, 10, 2))
+
+    @patch('llm.tool.requests.get')
+    def test_fetch_page_invalid_response(self, mock_get):
+        """Test fetch_page raises FeedError for a body that is not a feed"""
+        mock_get.return_value = MagicMock(status_code=200, content=b'{"stories": [{"title": "no id"}]}')
+
+        with self.assertRaises(FeedError):
+            fetch_page("test_query")
+        self.assertIn("error", get_feed("test_query"))
     
     @patch('llm.tool.requests.get')
     def test_get_feed_with_last_id(self, mock_get):
@@ -75,7 +87,7 @@ class TestToolFunctions(unittest.TestCase):
         # Mock response object
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {"stories": []}
+        mock_response.content = b'{"stories": []}'
         mock_get.return_value = mock_response
         
         # Call the function with a test query and last_id
@@ -225,6 +237,116 @@ class TestToolFunctions(unittest.TestCase):
         self.assertEqual(result, {"error": "API request failed with status code 500"})
 
 
+class TestFeedPaginator(unittest.TestCase):
+    """Test for the prefetching feed paginator in tool.py"""
+
+    def _pages(self, *sizes, start=100):
+        """Pages of stories with descending ids and times, one minute apart"""
+        pages, story_id = [], start
+        for size in sizes:
+            page = []
+            for _ in range(size):
+                page.append(Story(id=str(story_id), time=1735689600000 + (story_id % 60) * 60000))
+                story_id -= 1
+            pages.append(page)
+        return pages
+
+    @patch('llm.tool.fetch_page')
+    def test_follows_last_id_to_the_end(self, mock_fetch_page):
+        """Test if pages are requested with the last id until a short page"""
+        mock_fetch_page.side_effect = self._pages(3, 3, 1)
+
+        stories = list(iter_feed("z:aapl", page_size=3, min_interval_seconds=0))
+
+        self.assertEqual([s.id for s in stories], [str(i) for i in range(100, 93, -1)])
+        self.assertEqual([c.args for c in mock_fetch_page.call_args_list],
+                         [("z:aapl", 3, None), ("z:aapl", 3, "98"), ("z:aapl", 3, "95")])
+
+    @patch('llm.tool.fetch_page')
+    def test_prefetches_next_page(self, mock_fetch_page):
+        """Test if the next page is requested before the caller asks for it"""
+        mock_fetch_page.side_effect = self._pages(2, 2, 0)
+        pages = iter_feed_pages("z:aapl", page_size=2, min_interval_seconds=0)
+
+        first = next(pages)
+        deadline = time.monotonic() + 2
+        while mock_fetch_page.call_count < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(mock_fetch_page.call_count, 2)
+        pages.close()
+
+    @patch('llm.tool.fetch_page')
+    def test_stops_at_since(self, mock_fetch_page):
+        """Test if stories older than since end the iteration without another request"""
+        mock_fetch_page.side_effect = self._pages(3, 3, start=10)
+
+        stories = list(iter_feed("z:aapl", page_size=3, since=datetime(2025, 1, 1, 0, 6),
+                                 min_interval_seconds=0))
+
+        self.assertEqual([s.id for s in stories], ["10", "9", "8", "7", "6"])
+        self.assertEqual(mock_fetch_page.call_count, 2)
+
+    @patch('llm.tool.fetch_page')
+    def test_stops_at_max_stories(self, mock_fetch_page):
+        """Test if max_stories truncates the last page and stops fetching"""
+        mock_fetch_page.side_effect = self._pages(3, 3, 3)
+
+        stories = list(iter_feed("z:aapl", page_size=3, max_stories=4, min_interval_seconds=0))
+
+        self.assertEqual(len(stories), 4)
+        self.assertEqual(mock_fetch_page.call_count, 2)
+
+    @patch('llm.tool.fetch_page')
+    def test_raises_on_error_page(self, mock_fetch_page):
+        """Test if an error response raises FeedError after the pages before it"""
+        mock_fetch_page.side_effect = self._pages(2) + [FeedError("API request failed with status code 429")]
+        pages = iter_feed_pages("z:aapl", page_size=2, min_interval_seconds=0)
+
+        self.assertEqual(len(next(pages)), 2)
+        with self.assertRaises(FeedError):
+            next(pages)
+
+
+class TestLocalFeed(unittest.TestCase):
+    """Test for the local story store hook in tool.py"""
+
+    def tearDown(self):
+        set_local_feed(None)
+
+    @patch('llm.tool.get_feed')
+    def test_local_hit_skips_tickertick(self, mock_get_feed):
+        """Test if a local answer is returned without a live request"""
+        reader = MagicMock(return_value={"stories": [{"id": "1"}]})
+        set_local_feed(reader)
+
+        self.assertEqual(get_ticker_news("aapl", 5), {"stories": [{"id": "1"}]})
+        reader.assert_called_once_with("z:AAPL", 5)
+        mock_get_feed.assert_not_called()
+
+    @patch('llm.tool.get_feed')
+    def test_local_miss_fetches_live(self, mock_get_feed):
+        """Test if a local miss falls back to Tickertick"""
+        mock_get_feed.return_value = {"stories": []}
+        set_local_feed(MagicMock(return_value=None))
+
+        self.assertEqual(get_curated_news(5), {"stories": []})
+        mock_get_feed.assert_called_once_with("T:curated", 5)
+
+    @patch('llm.tool.get_feed')
+    def test_live_query_keeps_ticker_case(self, mock_get_feed):
+        """Test if only the local key is upper-cased, not the query sent to Tickertick"""
+        reader = MagicMock(return_value=None)
+        set_local_feed(reader)
+
+        get_broad_ticker_news("aapl", 5)
+
+        reader.assert_called_once_with("tt:AAPL", 5)
+        mock_get_feed.assert_called_once_with("tt:aapl", 5)
+        self.assertEqual(feed_key("T:curated"), "T:curated")
+
+
 class TestToolWrappers(unittest.TestCase):
     """Test for the tool wrapper functions in tool.py"""
     
@@ -1,18 +1,66 @@
 from langchain_core.tools import tool
-from typing import List
+from typing import Iterator, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import os
+import time
+import msgspec
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from common.metrics import TICKERTICK_RESPONSES
 
 
-# Setup API endpoints
-FEED_URL = 'https://api.tickertick.com/feed'
-TICKERS_URL = 'https://api.tickertick.com/tickers'
+# Setup API endpoints (the base URL can point at a stub server for benchmarks)
+TICKERTICK_API_URL = os.getenv("TICKERTICK_API_URL", "https://api.tickertick.com").rstrip("/")
+FEED_URL = f'{TICKERTICK_API_URL}/feed'
+TICKERS_URL = f'{TICKERTICK_API_URL}/tickers'
 RATE_LIMIT = 10  # 10 requests per minute limit
+EPOCH = datetime(1970, 1, 1)
 
 
+class Story(msgspec.Struct, omit_defaults=True):
+    """
+    The fields of a Tickertick story that the analysis and its sources use.
+    Decoding skips the rest (tags, similar_stories, ...) without building them,
+    and `time` stays in epoch milliseconds until the story is shown to the model.
+    """
+    id: str
+    time: Optional[int] = None
+    title: str = ""
+    site: str = ""
+    url: str = ""
+    description: str = ""
 
-def get_feed(query, limit=30, last_id=None):
-    """Get feed data from Tickertick API"""
+    @property
+    def published_at(self) -> Optional[datetime]:
+        """Publication time as a naive UTC datetime"""
+        return EPOCH + timedelta(milliseconds=self.time) if self.time is not None else None
+
+    def to_dict(self) -> dict:
+        """The story as the tools return it, with `time` in ISO format"""
+        story = {"id": self.id, "title": self.title, "site": self.site}
+        if self.url:
+            story["url"] = self.url
+        if self.description:
+            story["description"] = self.description
+        if self.time is not None:
+            story["time"] = self.published_at.isoformat()
+        return story
+
+
+class _FeedPage(msgspec.Struct):
+    stories: List[Story] = []
+
+
+_decode_feed_page = msgspec.json.Decoder(_FeedPage).decode
+
+
+class FeedError(Exception):
+    """Raised when a feed page cannot be fetched or decoded"""
+
+
+def fetch_page(query, limit=30, last_id=None) -> List[Story]:
+    """Get one page of a feed query from Tickertick API as Story records, newest first"""
     url = f"{FEED_URL}?q={query}"
     
     if limit:
@@ -22,29 +70,122 @@ def get_feed(query, limit=30, last_id=None):
         url += f"&last={last_id}"
         
     response = requests.get(url)
-    if response.status_code == 200:
-        data = response.json()
-        return convert_timestamp_ms_to_iso(data)
-    else:
-        return {"error": f"API request failed with status code {response.status_code}"}
-    
-def convert_timestamp_ms_to_iso(response):
-    """Convert timestamp in milliseconds to ISO format"""
-    for story in response['stories']:
-        if 'time' in story:
-            timestamp_sec = story['time'] / 1000
-            story['time'] = datetime.utcfromtimestamp(timestamp_sec).isoformat()
-    return response
+    TICKERTICK_RESPONSES.labels("feed", str(response.status_code)).inc()
+    if response.status_code != 200:
+        raise FeedError(f"API request failed with status code {response.status_code}")
+    try:
+        return _decode_feed_page(response.content).stories
+    except msgspec.DecodeError as e:
+        raise FeedError(f"Invalid feed response: {e}")
+
+def get_feed(query, limit=30, last_id=None):
+    """Get feed data from Tickertick API"""
+    try:
+        stories = fetch_page(query, limit, last_id)
+    except FeedError as e:
+        return {"error": str(e)}
+    return {"stories": [story.to_dict() for story in stories]}
+
+
+def iter_feed_pages(query, page_size=50, since: Optional[datetime] = None, max_stories: Optional[int] = None,
+                    min_interval_seconds: float = 60 / RATE_LIMIT) -> Iterator[List[Story]]:
+    """
+    Yield the stories of a feed query page by page, newest first, following `last`.
+
+    The next page is fetched on a background thread while the caller works on
+    the current one, so at most two pages are held at a time. Requests are at
+    least `min_interval_seconds` apart to stay within the Tickertick rate limit.
+    Stops at the end of the feed, at the first story older than `since` (a UTC
+    datetime) or after `max_stories` stories.
+    """
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)
+    since_ms = (since - EPOCH) // timedelta(milliseconds=1) if since is not None else None
+    remaining = max_stories
+    last_request = [float("-inf")]
+
+    def fetch(last_id):
+        time.sleep(max(0.0, last_request[0] + min_interval_seconds - time.monotonic()))
+        last_request[0] = time.monotonic()
+        return fetch_page(query, page_size, last_id)
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="feed-prefetch")
+    try:
+        pending = executor.submit(contextvars.copy_context().run, fetch, None)
+        while pending is not None:
+            page = stories = pending.result()
+            if since_ms is not None:
+                fresh = [s for s in page if s.time is None or s.time >= since_ms]
+                past_since = len(fresh) < len(page)
+                stories = fresh
+            else:
+                past_since = False
+            if remaining is not None:
+                stories = stories[:remaining]
+                remaining -= len(stories)
+            # A short page is the end of the feed
+            if len(page) < page_size or past_since or remaining == 0:
+                pending = None
+            else:
+                pending = executor.submit(contextvars.copy_context().run, fetch, page[-1].id)
+            if stories:
+                yield stories
+    finally:
+        # Stopping early leaves at most one request in flight; its page is dropped
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_feed(query, page_size=50, since: Optional[datetime] = None, max_stories: Optional[int] = None,
+              min_interval_seconds: float = 60 / RATE_LIMIT) -> Iterator[Story]:
+    """Yield the stories of a feed query one at a time; see iter_feed_pages"""
+    for page in iter_feed_pages(query, page_size, since, max_stories, min_interval_seconds):
+        yield from page
+
+
+# Local source of feed data, set by the LLM service when story ingestion is on (see ingest.py).
+# Called as local_feed(query, limit) and returns get_feed's shape, or None to fetch live.
+_local_feed = None
+
+
+def set_local_feed(reader):
+    """Answer feed queries from `reader` first; None fetches everything live"""
+    global _local_feed
+    _local_feed = reader
+
+
+def fetch_feed(query, limit=30):
+    """Get feed data from the local story store, or from Tickertick on a miss"""
+    if _local_feed is not None:
+        data = _local_feed(feed_key(query), limit)
+        if data is not None:
+            return data
+    return get_feed(query, limit)
+
+def feed_key(query):
+    """
+    Key a feed query is stored under locally. Ticker operands are upper-cased
+    so z:aapl and z:AAPL share one stored feed; the live query is sent as given.
+    """
+    prefix, sep, operand = query.partition(":")
+    if sep and prefix in ("z", "tt"):
+        return f"{prefix}:{operand.upper()}"
+    return query
+
+def ticker_news_query(ticker):
+    return f"z:{ticker}"
+
+def broad_ticker_news_query(ticker):
+    return f"tt:{ticker}"
+
+CURATED_QUERY = "T:curated"
 
 def get_ticker_news(ticker, limit=30):
     """Get news for a specific ticker"""
-    query = f"z:{ticker}"
-    return get_feed(query, limit)
+    return fetch_feed(ticker_news_query(ticker), limit)
 
 def get_broad_ticker_news(ticker, limit=30):
     """Get broader news for a specific ticker"""
-    query = f"tt:{ticker}"
-    return get_feed(query, limit)
+    return fetch_feed(broad_ticker_news_query(ticker), limit)
 
 def get_news_from_source(source, limit=30):
     """Get news from a specific source"""
@@ -59,8 +200,7 @@ def get_news_for_multiple_tickers(tickers, limit=30):
 
 def get_curated_news(limit=30):
     """Get curated news from top financial/technology sources"""
-    query = "T:curated"
-    return get_feed(query, limit)
+    return fetch_feed(CURATED_QUERY, limit)
 
 def get_entity_news(entity, limit=30):
     """Get news about a specific entity"""
@@ -73,6 +213,7 @@ def search_tickers(query, limit=5):
     """Search for tickers matching the query"""
     url = f"{TICKERS_URL}?p={query}&n={limit}"
     response = requests.get(url)
+    TICKERTICK_RESPONSES.labels("tickers", str(response.status_code)).inc()
     if response.status_code == 200:
         return response.json()
     else:
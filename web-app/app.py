@@ -1,23 +1,173 @@
 # web-app/app.py
 from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-import os, requests
-from common.models import MongoDBConnection, ArticleModel
+import asyncio
+from contextlib import asynccontextmanager
+import logging, os, requests
+from datetime import datetime, timedelta, timezone
+from bson import ObjectId
+from bson.errors import InvalidId
+from common.models import MongoDBConnection, ArticleModel, AnalysisRunModel
+from common.metrics import instrument_app
+from common.tracing import inject_headers, instrument_tracing, setup_tracing, tracer
+from common.profiling import instrument_profiling, stage
+from common.warmup import WarmUp, warm_mongo_connections
+from common.serialization import dumps
+from common.sketches import DemandTracker, SnapshotWorker, ensure_snapshot_indexes, load_snapshots
+from opentelemetry.trace import SpanKind
 from pymongo.errors import PyMongoError
 from typing import Optional
+from live import TrendingHub
+from static_assets import AssetManifest, ImmutableStaticFiles, TAILWIND_CDN
+from sentiment_series import BUCKET_SECONDS, SentimentSeries
+from tickers import PSEUDO_SYMBOLS, SYMBOL, TickerRefresher, normalize_symbol
 
-app = FastAPI()
+warmup = WarmUp("web")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start warm-up in the background; /readyz reports ready once it finishes.
+    Saves demand snapshots and refreshes the ticker index while running, and
+    stops the live trending hub on shutdown.
+    """
+    task = warmup.start()
+    demand_snapshots.start()
+    ticker_refresher.start()
+    yield
+    task.cancel()
+    trending_hub.stop()
+    demand_snapshots.stop()
+    ticker_refresher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+setup_tracing("web")
+instrument_app(app, "web")
+instrument_tracing(app, "web")
+instrument_profiling(app, "web")
+# Compress JSON and HTML responses above the threshold for clients that accept gzip
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")))
 
 # Tell FastAPI where templates are
-templates = Jinja2Templates(directory="templates")
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+templates = Jinja2Templates(directory=os.path.join(APP_DIR, "templates"))
+
+# Content-hashed CSS, JS and fonts built by static_assets.py; pinned CDN copies without a build
+STATIC_DIR = os.getenv("STATIC_DIR", os.path.join(APP_DIR, "static"))
+assets = AssetManifest.load(STATIC_DIR)
+if assets.built:
+    app.mount("/static", ImmutableStaticFiles(directory=STATIC_DIR, manifest=assets), name="static")
+templates.env.globals.update(asset_url=assets.url, assets_built=assets.built, tailwind_cdn=TAILWIND_CDN)
 
 LLM_URL = os.getenv("LLM_SERVICE_URL", "http://llm:5002")
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://mongodb:27017/mydb")
+# Seconds between keep-alive comments on idle live streams
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# /detail renders a latest analysis younger than this into the page instead of polling for it
+DETAIL_FRESH_SECONDS = float(os.getenv("DETAIL_FRESH_SECONDS", "3600"))
 
 # Initialize MongoDB connection
 conn = MongoDBConnection()
 articles_collection = conn.get_collection("articles")
+runs_collection = conn.get_collection("analysis_runs")
+
+# Shared change-stream hub for live trending updates
+trending_hub = TrendingHub(
+    articles_collection,
+    queue_size=int(os.getenv("STREAM_CLIENT_QUEUE_SIZE", "16")),
+)
+
+
+# Requests per ticker across replicas, in fixed memory (see common/sketches.py)
+demand_collection = conn.get_collection("demand_sketches")
+demand = DemandTracker.from_env()
+demand_snapshots = SnapshotWorker(demand_collection, demand, float(os.getenv("SKETCH_SNAPSHOT_SECONDS", "30")))
+# Snapshots of replicas silent for longer than this are left out of the ranking
+SKETCH_SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SKETCH_SNAPSHOT_MAX_AGE_SECONDS", str(4 * demand.half_life_seconds)))
+
+
+# Most tickers a single /api/snapshot request may ask for
+SNAPSHOT_MAX_TICKERS = 100
+# Search results past this rank are not served; the text score sort holds every match up to it in memory
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "500"))
+
+
+# Per-ticker sentiment histories and the series computed from them (see sentiment_series.py)
+sentiment_series = SentimentSeries.from_env(articles_collection)
+# Longest series served, in buckets
+SERIES_MAX_BUCKETS = int(os.getenv("SERIES_MAX_BUCKETS", "5000"))
+
+
+# Symbols and company names for suggestions and validation (see tickers.py)
+ticker_refresher = TickerRefresher.from_env()
+
+
+def resolve_ticker(ticker: str) -> str:
+    """
+    Normalize what the user typed, a symbol or a company name, to a symbol.
+    A symbol typed in capitals is taken as a symbol, and anything symbol-shaped
+    the index does not know (ETFs, indices, foreign listings, new listings) is
+    let through and looked up in the background. Only input that can be
+    neither a symbol nor a known company is rejected.
+    """
+    typed = ticker.strip().lstrip("$")
+    candidate = normalize_symbol(ticker)
+    if candidate in PSEUDO_SYMBOLS:
+        return candidate
+    index = ticker_refresher.index
+    symbol = index.resolve(ticker, names=typed != candidate)
+    if symbol is not None:
+        return symbol
+    ticker_refresher.request(ticker)
+    if SYMBOL.match(candidate):
+        return candidate
+    suggestions = ", ".join(entry["ticker"] for entry in index.suggest(ticker, 5))
+    hint = f". Did you mean {suggestions}?" if suggestions else ""
+    raise HTTPException(status_code=404, detail=f"Unknown ticker: {ticker}{hint}")
+
+
+def requester_id(request: Request) -> str:
+    """
+    Approximate identity of the person behind a request, for unique requester counts
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    host = forwarded.split(",")[0].strip() if forwarded else (request.client.host if request.client else "")
+    return f"{host}|{request.headers.get('user-agent', '')}"
+
+
+def ensure_indexes():
+    ArticleModel.ensure_indexes(articles_collection)
+    AnalysisRunModel.ensure_indexes(runs_collection)
+    ensure_snapshot_indexes(demand_collection)
+
+
+def prime_caches():
+    """
+    Compile the page templates and pull the trending query's working set into
+    MongoDB's cache before the first visitor does.
+    """
+    for name in ("index.html", "detail.html", "trending.html"):
+        templates.get_template(name)
+    ArticleModel.get_trending_articles(articles_collection)
+
+
+warmup.add("mongo_connections", lambda: warm_mongo_connections(conn), required=True)
+warmup.add("indexes", ensure_indexes)
+warmup.add("caches", prime_caches)
+warmup.install(app)
+
+class ArticleJSONResponse(JSONResponse):
+    """
+    JSON response encoded by common.serialization.dumps, which writes ObjectId and
+    datetime values directly instead of going through jsonable_encoder.
+    """
+    def render(self, content) -> bytes:
+        return dumps(content)
+
 
 @app.get("/", response_class=HTMLResponse)
 async def get_dashboard(request: Request):
@@ -36,24 +186,41 @@ async def get_trending_page(request: Request):
 @app.get("/detail", response_class=HTMLResponse)
 async def get_detail_page(request: Request, ticker: str = None):
     """
-    Render the detail.html template on GET /detail
+    Render the detail.html template on GET /detail.
+    A fresh latest analysis is rendered into the page; otherwise the page polls for one.
     """
     if not ticker:
         # Redirect to home if no ticker provided
         return RedirectResponse(url="/")
-    
-    return templates.TemplateResponse("detail.html", {"request": request})
+    demand.record(ticker.upper(), requester_id(request))
+
+    latest = None
+    try:
+        article = ArticleModel.get_latest_article(articles_collection, ticker)
+    except PyMongoError as e:
+        logging.error(f"Failed to load the latest article for {ticker}: {e}")
+        article = None
+    if article is not None and datetime.utcnow() - article["created_at"] <= timedelta(seconds=DETAIL_FRESH_SECONDS):
+        latest = ArticleModel.format_article(article)
+
+    return templates.TemplateResponse("detail.html", {"request": request, "latest": latest})
 
 @app.post("/analyze/{ticker}")
-async def trigger_analysis(ticker: str):
+async def trigger_analysis(ticker: str, request: Request):
     """
     Trigger ML service to analyze the ticker.
     This doesn't return results directly, just triggers the process 
     and returns an appropriate response to guide the user to the detail page.
+    Company names are resolved to their symbol here, and input that cannot be
+    a symbol is rejected before it reaches the LLM service.
     """
+    ticker = resolve_ticker(ticker)
+    demand.record(ticker, requester_id(request))
     try:
-        # Send the analysis request to the ML service
-        resp = requests.post(f"{LLM_URL}/analyze/{ticker}")
+        # Send the analysis request to the ML service, carrying the trace context
+        with stage("llm_service"), \
+                tracer.start_as_current_span("llm.analyze", kind=SpanKind.CLIENT, attributes={"ticker": ticker}):
+            resp = requests.post(f"{LLM_URL}/analyze/{ticker}", headers=inject_headers())
         if resp.status_code != 202:
             raise HTTPException(status_code=502, detail="LLM service error")
         
@@ -67,25 +234,82 @@ async def trigger_analysis(ticker: str):
     except requests.RequestException as e:
         raise HTTPException(status_code=502, detail=f"LLM service request failed: {str(e)}")
 
+def parse_since(ticker: str, since: str) -> datetime:
+    """
+    Turn a `since` parameter, an article id or an ISO 8601 timestamp, into a naive UTC datetime
+    """
+    try:
+        article_id = ObjectId(since)
+    except (InvalidId, TypeError):
+        article_id = None
+    if article_id is not None:
+        created_at = ArticleModel.get_article_created_at(articles_collection, ticker, article_id)
+        if created_at is None:
+            raise HTTPException(status_code=400, detail=f"Unknown article {since} for {ticker}")
+        return created_at
+    try:
+        value = datetime.fromisoformat(since.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid since. Must be an article id or an ISO 8601 timestamp")
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo else value
+
+@app.get("/api/tickers/suggest")
+async def suggest_tickers(
+    q: str = Query(..., min_length=1, max_length=64, description="Start of a symbol or company name"),
+    limit: int = Query(8, ge=1, le=20, description="Number of suggestions to return"),
+):
+    """
+    Autocomplete for the ticker input, answered from the in-memory ticker index
+    """
+    return JSONResponse(
+        {"query": q, "suggestions": ticker_refresher.index.suggest(q, limit)},
+        headers={"Cache-Control": "public, max-age=300"},
+    )
+
 @app.get("/articles/{ticker}")
-async def get_articles(ticker: str):
+async def get_articles(
+    ticker: str,
+    include_analysis: bool = Query(True, description="Include the full analysis body"),
+    since: Optional[str] = Query(None, description="Only articles newer than this article id or ISO 8601 timestamp"),
+):
     """
     Get articles for a specific ticker from the database.
-    This is what the frontend will poll to check for results.
+    With `since`, only the articles created after it are returned.
     """
     try:
+        since_time = parse_since(ticker, since) if since else None
         # Get articles from MongoDB
-        articles = ArticleModel.get_articles_by_ticker(articles_collection, ticker)
+        articles = ArticleModel.get_articles_by_ticker(articles_collection, ticker, include_analysis=include_analysis,
+                                                       since=since_time)
         
         # Format articles for the response
-        formatted_articles = [ArticleModel.format_article(article) for article in articles]
+        formatted_articles = [ArticleModel.view(article, include_analysis) for article in articles]
         
-        return {"ticker": ticker, "articles": formatted_articles}
+        return ArticleJSONResponse({"ticker": ticker, "articles": formatted_articles})
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/articles/{ticker}/latest")
+async def get_latest_article(ticker: str):
+    """
+    Get just the id and creation time of the newest article for a ticker, for cheap change detection.
+    Both are null when the ticker has no articles yet.
+    """
+    try:
+        article = ArticleModel.get_latest_article(articles_collection, ticker, projection={"created_at": 1})
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return ArticleJSONResponse({
+        "ticker": ticker,
+        "id": article["_id"] if article else None,
+        "created_at": article["created_at"] if article else None,
+    })
 
 @app.get("/api/trending")
-async def get_trending_articles(time_range: Optional[str] = Query(None, description="Time range: 24h, 7d, 30d")):
+async def get_trending_articles(
+    time_range: Optional[str] = Query(None, description="Time range: 24h, 7d, 30d"),
+    include_analysis: bool = Query(True, description="Include the full analysis body"),
+):
     """
     Get trending articles from the database based on time range.
     Default returns the newest 10 articles.
@@ -100,15 +324,168 @@ async def get_trending_articles(time_range: Optional[str] = Query(None, descript
         articles = ArticleModel.get_trending_articles(
             collection=articles_collection,
             time_range=time_range,
-            limit=10
+            limit=10,
+            include_analysis=include_analysis
         )
         
         # Format articles for the response
-        formatted_articles = [ArticleModel.format_article(article) for article in articles]
+        formatted_articles = [ArticleModel.view(article, include_analysis) for article in articles]
         
-        return {"time_range": time_range, "articles": formatted_articles}
+        return ArticleJSONResponse({"time_range": time_range, "articles": formatted_articles})
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/api/trending/hot")
+async def get_hot_tickers(limit: int = Query(10, ge=1, le=100, description="Number of tickers to return")):
+    """
+    Rank tickers by recent demand (detail views and analysis requests) across all
+    web replicas, with an estimate of their unique requesters.
+    """
+    try:
+        snapshots = load_snapshots(demand_collection, SKETCH_SNAPSHOT_MAX_AGE_SECONDS)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return {"half_life_seconds": demand.half_life_seconds, "tickers": demand.hot(snapshots, limit)}
+
+@app.get("/api/snapshot")
+async def get_snapshot(tickers: str = Query(..., description="Comma separated tickers, for example AAPL,MSFT")):
+    """
+    The latest sentiment and summary of each ticker in a watchlist, in the order
+    asked for, from a single aggregation. Tickers without articles are listed
+    under `missing`.
+    """
+    symbols = list(dict.fromkeys(normalize_symbol(t) for t in tickers.split(",") if t.strip()))
+    if not symbols:
+        raise HTTPException(status_code=400, detail="Invalid tickers. Must be a comma separated list of symbols")
+    if len(symbols) > SNAPSHOT_MAX_TICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {SNAPSHOT_MAX_TICKERS} tickers per request")
+    try:
+        latest = ArticleModel.get_latest_articles(articles_collection, symbols)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return ArticleJSONResponse({
+        "tickers": [latest[symbol] for symbol in symbols if symbol in latest],
+        "missing": [symbol for symbol in symbols if symbol not in latest],
+    })
+
+@app.get("/api/tickers/{ticker}/sentiment-series")
+async def get_sentiment_series(
+    ticker: str,
+    bucket: str = Query("1d", description="Bucket size: 1h, 1d, 1w"),
+    window: int = Query(7, ge=1, le=90, description="Buckets per rolling window"),
+    days: int = Query(90, ge=1, le=3650, description="Only include the last N days"),
+):
+    """
+    Sentiment of the ticker's analyses over time: the mean score per bucket,
+    its rolling average, momentum and volatility (see sentiment_series.py).
+    """
+    if bucket not in BUCKET_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Invalid bucket. Must be one of: {', '.join(BUCKET_SECONDS)}")
+    if days * 86400 // BUCKET_SECONDS[bucket] > SERIES_MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"At most {SERIES_MAX_BUCKETS} buckets; use a larger bucket or fewer days")
+    try:
+        series = sentiment_series.series(normalize_symbol(ticker), bucket=bucket, window=window, days=days)
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if series is None:
+        raise HTTPException(status_code=404, detail=f"No articles for {normalize_symbol(ticker)}")
+    return ArticleJSONResponse(series)
+
+@app.get("/api/search")
+async def search_articles(
+    q: str = Query(..., min_length=1, max_length=200, description="Words or \"phrases\" to find in summaries and analyses"),
+    ticker: Optional[str] = Query(None, description="Only articles for this ticker"),
+    sentiment: Optional[str] = Query(None, description="Overall sentiment: Bearish, Neutral, Bullish"),
+    time_range: Optional[str] = Query(None, description="Time range: 24h, 7d, 30d"),
+    page: int = Query(1, ge=1, description="Page number, from 1"),
+    page_size: int = Query(20, ge=1, le=50, description="Articles per page"),
+):
+    """
+    Full-text search over article summaries and analyses, best match first,
+    then newest first. Matches in the summary weigh more than in the analysis.
+    """
+    if sentiment is not None:
+        matches = [label for label in ArticleModel.SENTIMENTS if label.lower() == sentiment.strip().lower()]
+        if not matches:
+            raise HTTPException(status_code=400, detail=f"Invalid sentiment. Must be one of: {', '.join(ArticleModel.SENTIMENTS)}")
+        sentiment = matches[0]
+    if time_range is not None and time_range not in ArticleModel.TIME_RANGES:
+        raise HTTPException(status_code=400, detail=f"Invalid time_range. Must be one of: {', '.join(ArticleModel.TIME_RANGES)}")
+    skip = (page - 1) * page_size
+    if skip + page_size > SEARCH_MAX_RESULTS:
+        raise HTTPException(status_code=400, detail=f"Only the first {SEARCH_MAX_RESULTS} results can be paged through; narrow the search")
+    try:
+        # One extra result tells whether there is a next page, unless this is the last one served
+        articles = ArticleModel.search_articles(
+            articles_collection, q, ticker=normalize_symbol(ticker) if ticker else None, sentiment=sentiment,
+            time_range=time_range, skip=skip, limit=min(page_size + 1, SEARCH_MAX_RESULTS - skip),
+        )
     except PyMongoError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    return ArticleJSONResponse({
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "has_more": len(articles) > page_size,
+        "articles": [ArticleModel.view(article, include_analysis=False) for article in articles[:page_size]],
+    })
+
+@app.get("/api/analysis-runs/stats")
+async def get_analysis_run_stats(
+    group_by: str = Query("provider,ticker,day", description="Comma separated: provider, model, ticker, day"),
+    days: int = Query(7, ge=1, le=365, description="Only include analyses from the last N days"),
+):
+    """
+    Get p50/p95/p99 analysis latency, agent steps and token usage per group.
+    Used to compare providers and models and to spot regressions.
+    """
+    try:
+        # Validate group_by parameter
+        fields = [field.strip() for field in group_by.split(",") if field.strip()]
+        invalid = [field for field in fields if field not in AnalysisRunModel.GROUP_FIELDS]
+        if not fields or invalid:
+            raise HTTPException(status_code=400, detail=f"Invalid group_by. Must be a combination of: {', '.join(AnalysisRunModel.GROUP_FIELDS)}")
+
+        stats = AnalysisRunModel.get_run_stats(runs_collection, group_by=fields, days=days)
+
+        return {"group_by": fields, "days": days, "stats": stats}
+    except PyMongoError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/api/trending/stream")
+async def stream_trending_articles(request: Request):
+    """
+    Server-sent events stream of newly inserted articles.
+    All clients share a single change stream on the articles collection.
+    Answers 503 when MongoDB does not support change streams, so the page polls instead.
+    """
+    if not trending_hub.supported:
+        raise HTTPException(status_code=503, detail="Live updates need MongoDB change streams (a replica set)")
+    queue = trending_hub.subscribe()
+
+    async def event_stream():
+        try:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload is None:
+                    # The hub turned off; the page reconnects, gets a 503 and falls back to polling
+                    break
+                yield f"event: article\ndata: {payload}\n\n"
+        finally:
+            trending_hub.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/healthz")
 async def healthz():
@@ -119,7 +496,7 @@ async def healthz():
         llm_status = llm_resp.json()
         
         # Check database connectivity
-        conn._client.admin.command("ping")
+        conn.client.admin.command("ping")
         
         return {
             "status": "ok", 
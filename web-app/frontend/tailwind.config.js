@@ -0,0 +1,9 @@
+/** Tailwind only keeps the classes that appear in the templates, including
+ * the class strings built by their inline scripts. */
+module.exports = {
+  content: ["../templates/**/*.html"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -0,0 +1,155 @@
+# web-app/live.py
+"""
+Live trending updates.
+
+One background thread tails a MongoDB change stream on the articles collection
+and fans new articles out to every connected trending client, so N viewers
+cost a single cursor instead of N polling loops.
+
+Change streams need a replica set. On a standalone server the hub turns itself
+off after the first attempt, and the trending page polls instead.
+"""
+
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+from common.models import ArticleModel
+from common.serialization import dumps
+
+# Only inserts matter for the trending feed, and the heavy analysis body is
+# never shown there, so drop it before the event leaves the server.
+CHANGE_STREAM_PIPELINE = [
+    {"$match": {"operationType": "insert"}},
+    {"$project": {f"fullDocument.{field}": 0 for field in ArticleModel.WITHOUT_ANALYSIS}},
+]
+# Server error code when $changeStream runs on a standalone server
+CHANGE_STREAMS_UNSUPPORTED = 40573
+
+
+class TrendingHub:
+    """
+    Fan-out hub between one change stream and many SSE clients.
+
+    Every client gets a bounded asyncio queue. When a client falls behind, the
+    oldest pending event in its queue is dropped so a slow reader never blocks
+    the stream or grows memory for everyone else.
+    """
+
+    def __init__(self, collection: Collection, queue_size: int = 16,
+                 retry_seconds: float = 5.0, max_await_ms: int = 1000):
+        self._collection = collection
+        self._queue_size = queue_size
+        self._retry_seconds = retry_seconds
+        self._max_await_ms = max_await_ms
+        self._clients: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._resume_token = None
+        self.dropped_events = 0
+        # Cleared for good once the server turns out not to support change streams
+        self.supported = True
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Register a new client on the running event loop and return its queue.
+        Starts the change stream thread if it is not already running.
+        """
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        with self._lock:
+            self._clients[queue] = asyncio.get_running_loop()
+        self.start()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        with self._lock:
+            self._clients.pop(queue, None)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="trending-hub", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def publish(self, article: dict) -> None:
+        """
+        Serialize an inserted article once and hand it to every client queue.
+        """
+        payload = dumps(ArticleModel.view(article, include_analysis=False)).decode()
+        with self._lock:
+            clients = list(self._clients.items())
+        for queue, loop in clients:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, payload)
+            except RuntimeError:
+                # The client's event loop is closed; forget about it.
+                self.unsubscribe(queue)
+
+    def _close_clients(self) -> None:
+        """
+        End every client's stream: a None in its queue tells it to disconnect.
+        """
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for queue, loop in clients:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, None)
+            except RuntimeError:
+                pass
+
+    def _offer(self, queue: asyncio.Queue, payload: Optional[str]) -> None:
+        if queue.full():
+            queue.get_nowait()
+            self.dropped_events += 1
+        queue.put_nowait(payload)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with self._lock:
+                if not self._clients:
+                    # Nobody is listening: release the cursor until the next subscriber. The
+                    # resume token only bridges reconnects while clients stay connected, so
+                    # the next subscriber does not get everything inserted meanwhile replayed.
+                    self._thread = None
+                    self._resume_token = None
+                    return
+            try:
+                with self._collection.watch(
+                    CHANGE_STREAM_PIPELINE,
+                    max_await_time_ms=self._max_await_ms,
+                    resume_after=self._resume_token,
+                ) as stream:
+                    while not self._stop.is_set() and self._clients:
+                        change = stream.try_next()
+                        if change is not None:
+                            self._resume_token = stream.resume_token
+                            self.publish(change["fullDocument"])
+            except PyMongoError as e:
+                if isinstance(e, OperationFailure) and e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    # Standalone servers never support change streams, so retrying cannot help
+                    logging.warning(f"Live trending updates are off, MongoDB is not a replica set: {e}")
+                    self.supported = False
+                    self._close_clients()
+                    with self._lock:
+                        self._thread = None
+                    return
+                logging.warning(f"Trending change stream failed, retrying in {self._retry_seconds}s: {e}")
+                self._resume_token = None
+                self._stop.wait(self._retry_seconds)
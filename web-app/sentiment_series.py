@@ -0,0 +1,208 @@
+# web-app/sentiment_series.py
+"""
+Sentiment of a ticker's analyses over time.
+
+Each analysis' overall sentiment becomes an ordinal score (Bearish -1, Neutral
+0, Bullish 1), and the scores are bucketed by hour, day or week. For every
+bucket the series gives:
+
+    mean          average score of the analyses in the bucket (null when empty)
+    rolling_mean  average score of the analyses in the last `window` buckets
+    momentum      change in rolling_mean over the last `window` buckets
+    volatility    standard deviation of the scores in the last `window` buckets
+
+All of it is computed with NumPy over the whole history at once: scores are
+summed per bucket with bincount, and windows are differences of cumulative sums.
+
+SentimentSeries keeps each ticker's history as arrays, appends only the
+analyses stored since the newest one it has seen, and caches computed series
+until a newer analysis arrives or the current bucket ends:
+
+    SERIES_CACHE_TICKERS    tickers whose history is kept in memory (default 256)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+from pymongo.collection import Collection
+
+from common.models import ArticleModel
+
+# Ordinal score of each overall sentiment label, matched case-insensitively
+SCORES = {"bearish": -1.0, "neutral": 0.0, "bullish": 1.0}
+BUCKET_SECONDS = {"1h": 3600, "1d": 86400, "1w": 7 * 86400}
+# Buckets start at whole hours and days, and weeks on Monday (1970-01-01 was a Thursday)
+_ORIGIN = np.datetime64("1969-12-29T00:00:00", "ms")
+# Computed series kept per ticker, one per combination of parameters
+_RESULTS_PER_TICKER = 8
+
+
+def to_scores(labels) -> np.ndarray:
+    """
+    Ordinal scores for sentiment labels; labels outside SCORES become NaN
+    """
+    return np.array([SCORES.get(label.strip().lower(), np.nan) if isinstance(label, str) else np.nan
+                     for label in labels], dtype=np.float64)
+
+
+def _windowed(cumulative: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sum over the last `window` buckets at each bucket, from a cumulative sum
+    """
+    totals = cumulative.copy()
+    totals[window:] -= cumulative[:-window]
+    return totals
+
+
+def compute_series(times: np.ndarray, scores: np.ndarray, end: np.datetime64, bucket_seconds: int,
+                   count: int, window: int) -> dict:
+    """
+    The series of the `count` buckets up to the one holding `end`, from `times`
+    (datetime64[ms], ascending) and their `scores`. Scores before the first
+    bucket still count toward its window.
+    """
+    width = np.timedelta64(bucket_seconds * 1000, "ms")
+    last = (end - _ORIGIN) // width
+    first = last - count + 1
+    # A momentum needs two windows of history before the first bucket shown
+    lead = 2 * window - 1
+    scored = ~np.isnan(scores)
+    buckets = (times[scored] - _ORIGIN) // width - (first - lead)
+    values = scores[scored]
+    keep = (buckets >= 0) & (buckets <= last - first + lead)
+    buckets, values = buckets[keep], values[keep]
+
+    size = int(last - first + lead + 1)
+    counts = np.bincount(buckets, minlength=size).astype(np.float64)
+    sums = np.bincount(buckets, weights=values, minlength=size)
+    squares = np.bincount(buckets, weights=values * values, minlength=size)
+
+    window_counts = _windowed(np.cumsum(counts), window)
+    window_sums = _windowed(np.cumsum(sums), window)
+    window_squares = _windowed(np.cumsum(squares), window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        rolling = window_sums / window_counts
+        variance = window_squares / window_counts - rolling * rolling
+    volatility = np.sqrt(np.clip(variance, 0.0, None))
+    momentum = np.full(size, np.nan)
+    momentum[window:] = rolling[window:] - rolling[:-window]
+
+    shown = slice(lead, size)
+    starts = _ORIGIN + np.arange(first, last + 1) * width
+    total = counts[shown].sum()
+    return {
+        "buckets": [
+            {"start": start_at, "count": int(count), "mean": mean, "rolling_mean": rolling_mean,
+             "momentum": change, "volatility": spread}
+            for start_at, count, mean, rolling_mean, change, spread in zip(
+                starts.astype(object).tolist(), counts[shown].tolist(), _rounded(means[shown]),
+                _rounded(rolling[shown]), _rounded(momentum[shown]), _rounded(volatility[shown]))
+        ],
+        "count": int(total),
+        "mean": round(float(sums[shown].sum() / total), 4) if total else None,
+    }
+
+
+def _rounded(values: np.ndarray) -> list:
+    """
+    Values rounded to 4 places for JSON, with NaN as None
+    """
+    rounded = np.round(values, 4)
+    return [None if value != value else value for value in rounded.tolist()]
+
+
+class _History:
+    """
+    One ticker's analysis times and scores, oldest first, and its cached series
+    """
+
+    def __init__(self):
+        self.newest_id = None
+        self.times = np.empty(0, dtype="datetime64[ms]")
+        self.scores = np.empty(0, dtype=np.float64)
+        self.results = OrderedDict()
+
+
+class SentimentSeries:
+    """
+    Sentiment series per ticker over the articles collection, with each
+    ticker's history and computed series cached for the `max_tickers` most
+    recently requested tickers.
+    """
+
+    def __init__(self, collection: Collection, max_tickers: int = 256):
+        self.collection = collection
+        self.max_tickers = max_tickers
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, collection: Collection) -> "SentimentSeries":
+        return cls(collection, int(os.getenv("SERIES_CACHE_TICKERS", "256")))
+
+    def _history(self, ticker: str) -> Optional[_History]:
+        """
+        The ticker's history, brought up to its newest article, or None when it has none
+        """
+        latest = ArticleModel.get_latest_article(self.collection, ticker, projection={"_id": 1})
+        if latest is None:
+            return None
+        with self._lock:
+            history = self._histories.get(ticker) or _History()
+            self._histories[ticker] = history
+            self._histories.move_to_end(ticker)
+            while len(self._histories) > self.max_tickers:
+                self._histories.popitem(last=False)
+            if history.newest_id == latest["_id"]:
+                return history
+            loaded = len(history.times)
+            # Articles are only ever added, so only those from the last time loaded on are read.
+            # Others stored in that same millisecond may have been missed, so the rows at that
+            # time are read again and replace the ones loaded.
+            since = history.times[-1].astype(object) if loaded else None
+            kept = int(np.searchsorted(history.times, history.times[-1])) if loaded else 0
+
+        rows = ArticleModel.get_sentiment_history(self.collection, ticker, since=since)
+        times = np.array([created_at for created_at, _ in rows], dtype="datetime64[ms]")
+        scores = to_scores([label for _, label in rows])
+        with self._lock:
+            # Another request may have appended the same rows meanwhile
+            if len(history.times) == loaded:
+                history.times = np.concatenate([history.times[:kept], times])
+                history.scores = np.concatenate([history.scores[:kept], scores])
+                history.newest_id = latest["_id"]
+                history.results.clear()
+        return history
+
+    def series(self, ticker: str, bucket: str = "1d", window: int = 7, days: int = 90,
+               now: Optional[datetime] = None) -> Optional[dict]:
+        """
+        The sentiment series of `ticker` over the last `days` days in `bucket`
+        buckets, the current one last, or None when the ticker has no articles.
+        """
+        ticker = ticker.upper()
+        bucket_seconds = BUCKET_SECONDS[bucket]
+        end = np.datetime64(now or datetime.utcnow(), "ms")
+        history = self._history(ticker)
+        if history is None:
+            return None
+        # The result changes when a newer article arrives (which clears the cache) or the last bucket ends
+        key = (bucket, window, days, int((end - _ORIGIN) // np.timedelta64(bucket_seconds * 1000, "ms")))
+        with self._lock:
+            if key in history.results:
+                history.results.move_to_end(key)
+                return history.results[key]
+            times, scores = history.times, history.scores
+        count = max(1, days * 86400 // bucket_seconds)
+        result = dict(compute_series(times, scores, end, bucket_seconds, count, window),
+                      ticker=ticker, bucket=bucket, window=window, days=days)
+        with self._lock:
+            history.results[key] = result
+            while len(history.results) > _RESULTS_PER_TICKER:
+                history.results.popitem(last=False)
+        return result
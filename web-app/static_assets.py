@@ -0,0 +1,173 @@
+# web-app/static_assets.py
+"""
+Prebuilt, content-hashed static assets for the web app.
+
+The frontend/ directory pins Tailwind, Chart.js and Font Awesome in
+package.json. `npm run build` there compiles the purged Tailwind CSS, and
+`python static_assets.py build` then copies it with the vendored files into
+STATIC_DIR under content-hashed names. It also writes manifest.json, which maps
+each logical name (css/app.css) to its hashed file (css/app.3f2a9c1e.css).
+
+The app serves STATIC_DIR at /static with ImmutableStaticFiles, so browsers
+cache hashed files for a year and never revalidate them. Templates link assets
+through asset_url(). The image builds into /srv/static, outside the /app
+directory that the compose dev mount replaces, so the mount keeps the built
+assets. When no build is present, as when running from a fresh checkout outside
+the image, asset_url() returns the same pinned versions from their CDNs and the
+pages load Tailwind's browser build instead.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import posixpath
+import re
+import shutil
+
+from starlette.staticfiles import StaticFiles
+
+MANIFEST = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Tailwind's in-browser build, pinned to frontend/package.json, for pages without a build
+TAILWIND_CDN = "https://cdn.tailwindcss.com/3.4.17"
+# Logical name -> file produced by `npm run build` or installed by npm, relative to frontend/
+SOURCES = {
+    "css/app.css": "build/app.css",
+    "js/chart.js": "node_modules/chart.js/dist/chart.umd.js",
+    "fontawesome/css/all.css": "node_modules/@fortawesome/fontawesome-free/css/all.min.css",
+    "fontawesome/webfonts": "node_modules/@fortawesome/fontawesome-free/webfonts",
+}
+# Same versions as frontend/package.json, used when no build is present
+CDN_FALLBACK = {
+    "js/chart.js": "https://cdn.jsdelivr.net/npm/chart.js@4.4.9/dist/chart.umd.js",
+    "fontawesome/css/all.css": "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css",
+}
+
+_CSS_URL = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+
+
+def _hashed_name(name: str, data: bytes) -> str:
+    root, ext = posixpath.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _rewrite_css_urls(name: str, css: str, manifest: dict) -> str:
+    """
+    Point relative url() references in a stylesheet at their hashed files.
+    """
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        url = match.group(2)
+        path, sep, suffix = url.partition("?") if "?" in url else url.partition("#")
+        target = posixpath.normpath(posixpath.join(base, path))
+        if target not in manifest:
+            return match.group(0)
+        return f"url({posixpath.relpath(manifest[target], base)}{sep}{suffix})"
+
+    return _CSS_URL.sub(replace, css)
+
+
+def build(source_dir: str, output_dir: str, sources: dict = None) -> dict:
+    """
+    Copy the built and vendored assets from `source_dir` into `output_dir` under
+    content-hashed names and write the manifest. Stylesheets are hashed last,
+    after their url() references to fonts and images have been rewritten.
+    """
+    sources = sources if sources is not None else SOURCES
+    files = {}
+    for name, path in sources.items():
+        path = os.path.join(source_dir, path)
+        if os.path.isdir(path):
+            for entry in sorted(os.listdir(path)):
+                files[posixpath.join(name, entry)] = os.path.join(path, entry)
+        elif os.path.isfile(path):
+            files[name] = path
+        else:
+            raise FileNotFoundError(f"Missing asset {name}: {path} (run `npm install && npm run build` in frontend/)")
+
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    manifest = {}
+    # Stylesheets reference the other files, so those must be hashed first
+    for name in sorted(files, key=lambda n: n.endswith(".css")):
+        with open(files[name], "rb") as f:
+            data = f.read()
+        if name.endswith(".css"):
+            data = _rewrite_css_urls(name, data.decode("utf-8"), manifest).encode("utf-8")
+        manifest[name] = _hashed_name(name, data)
+        target = os.path.join(output_dir, manifest[name])
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, "wb") as f:
+            f.write(data)
+
+    with open(os.path.join(output_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Resolves logical asset names to hashed /static URLs, or to the pinned CDN
+    copies when STATIC_DIR has no build.
+    """
+
+    def __init__(self, files: dict, prefix: str = "/static"):
+        self.files = files
+        self.prefix = prefix
+        self.hashed = set(files.values())
+
+    @property
+    def built(self) -> bool:
+        return bool(self.files)
+
+    @classmethod
+    def load(cls, directory: str, prefix: str = "/static") -> "AssetManifest":
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                return cls(json.load(f), prefix)
+        except FileNotFoundError:
+            logging.info(f"No asset manifest in {directory}, serving pinned CDN assets")
+            return cls({}, prefix)
+
+    def url(self, name: str) -> str:
+        if name in self.files:
+            return f"{self.prefix}/{self.files[name]}"
+        if name in CDN_FALLBACK:
+            return CDN_FALLBACK[name]
+        raise KeyError(f"Unknown static asset: {name}")
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles that marks content-hashed files as immutable for a year. Other
+    files, such as the manifest itself, are revalidated on every use.
+    """
+
+    def __init__(self, *args, manifest: AssetManifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        path = os.path.relpath(os.path.realpath(full_path), os.path.realpath(self.directory)).replace(os.sep, "/")
+        response.headers["Cache-Control"] = IMMUTABLE if path in self.manifest.hashed else "no-cache"
+        return response
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Fingerprint the built frontend assets into STATIC_DIR")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--source", default=os.path.join(here, "frontend"), help="frontend directory")
+    parser.add_argument("--output", default=os.getenv("STATIC_DIR", os.path.join(here, "static")))
+    args = parser.parse_args()
+    manifest = build(args.source, args.output)
+    print(f"Wrote {len(manifest)} assets to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import unittest
-from unittest.mock import patch, MagicMock, mock_open
+from unittest.mock import patch, MagicMock, mock_open, ANY
 import json
 from fastapi.testclient import TestClient
 from datetime import datetime, timezone
@@ -13,7 +13,8 @@ from pymongo.errors import PyMongoError
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import app module
-from app import app as fastapi_app
+from app import app as fastapi_app, templates
+from tickers import TickerIndex
 
 class TestWebApp(unittest.TestCase):
     """Test for the web-app/app.py FastAPI application without template rendering"""
@@ -56,8 +57,9 @@ class TestWebApp(unittest.TestCase):
         args, kwargs = mock_template_response.call_args
         self.assertEqual(args[0], "trending.html")
     
+    @patch('app.ArticleModel.get_latest_article', return_value=None)
     @patch('fastapi.templating.Jinja2Templates.TemplateResponse')
-    def test_get_detail_page_with_ticker(self, mock_template_response):
+    def test_get_detail_page_with_ticker(self, mock_template_response, mock_latest):
         """Test the /detail endpoint with a ticker parameter"""
         # Set mock return value
         mock_template_response.return_value = HTMLResponse(content="<html>Detail</html>")
@@ -72,6 +74,61 @@ class TestWebApp(unittest.TestCase):
         mock_template_response.assert_called_once()
         args, kwargs = mock_template_response.call_args
         self.assertEqual(args[0], "detail.html")
+        self.assertIsNone(args[1]["latest"])
+
+    @patch('app.ArticleModel.get_latest_article')
+    @patch('fastapi.templating.Jinja2Templates.TemplateResponse')
+    def test_get_detail_page_renders_fresh_article(self, mock_template_response, mock_latest):
+        """Test if /detail renders a fresh latest analysis into the page"""
+        mock_template_response.return_value = HTMLResponse(content="<html>Detail</html>")
+        mock_latest.return_value = {
+            "_id": ObjectId(),
+            "ticker": "AAPL",
+            "summary": "Strong quarter <b>ahead</b>",
+            "overall_sentiment": "Bullish",
+            "analysis": "| Title | Sentiment |\n|---|---|\n| Earnings beat | Bullish |",
+            "created_at": datetime.utcnow(),
+        }
+
+        response = self.client.get("/detail?ticker=AAPL")
+
+        self.assertEqual(response.status_code, 200)
+        mock_latest.assert_called_once_with(ANY, "AAPL")
+        args, kwargs = mock_template_response.call_args
+        latest = args[1]["latest"]
+        self.assertEqual(latest["id"], str(mock_latest.return_value["_id"]))
+        self.assertIn("<td>Earnings beat</td>", latest["analysis_html"])
+
+        html = templates.get_template("detail.html").render(request=None, latest=latest)
+        self.assertIn("<td>Earnings beat</td>", html)
+        # The summary is escaped, the sanitized analysis is not
+        self.assertIn("Strong quarter &lt;b&gt;ahead&lt;/b&gt;", html)
+        self.assertIn(f'const renderedArticleId = "{latest["id"]}"', html)
+        self.assertIn('id="loading-state" class="py-12 hidden"', html)
+
+    @patch('app.ArticleModel.get_latest_article')
+    @patch('fastapi.templating.Jinja2Templates.TemplateResponse')
+    def test_get_detail_page_stale_article(self, mock_template_response, mock_latest):
+        """Test if /detail falls back to polling when the latest analysis is stale"""
+        mock_template_response.return_value = HTMLResponse(content="<html>Detail</html>")
+        mock_latest.return_value = {"_id": ObjectId(), "analysis": "text", "created_at": datetime(2020, 1, 1)}
+
+        self.client.get("/detail?ticker=AAPL")
+
+        args, kwargs = mock_template_response.call_args
+        self.assertIsNone(args[1]["latest"])
+
+    @patch('app.ArticleModel.get_latest_article', side_effect=PyMongoError("down"))
+    @patch('fastapi.templating.Jinja2Templates.TemplateResponse')
+    def test_get_detail_page_database_error(self, mock_template_response, mock_latest):
+        """Test if /detail still renders the polling page when the database fails"""
+        mock_template_response.return_value = HTMLResponse(content="<html>Detail</html>")
+
+        response = self.client.get("/detail?ticker=AAPL")
+
+        self.assertEqual(response.status_code, 200)
+        args, kwargs = mock_template_response.call_args
+        self.assertIsNone(args[1]["latest"])
     
     def test_get_detail_page_without_ticker(self):
         """Test the /detail endpoint without a ticker parameter (should redirect to root)"""
@@ -102,7 +159,7 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(response_json["redirect_to"], "/detail?ticker=AAPL")
         
         # Assert that requests.post was called with the correct URL
-        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL")
+        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL", headers=ANY)
     
     @patch('app.requests.post')
     def test_trigger_analysis_llm_error(self, mock_post):
@@ -120,7 +177,7 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(response.json()["detail"], "LLM service error")
         
         # Assert that requests.post was called
-        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL")
+        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL", headers=ANY)
     
     @patch('app.requests.post')
     def test_trigger_analysis_request_exception(self, mock_post):
@@ -136,7 +193,51 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(response.json()["detail"], "LLM service request failed: Connection error")
         
         # Assert that requests.post was called
-        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL")
+        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL", headers=ANY)
+
+    @patch('app.requests.post')
+    def test_trigger_analysis_resolves_company_name(self, mock_post):
+        """Test the /analyze/{ticker} endpoint sends the symbol for a company name"""
+        mock_post.return_value = MagicMock(status_code=202)
+
+        response = self.client.post("/analyze/apple")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["ticker"], "AAPL")
+        mock_post.assert_called_once_with("http://llm:5002/analyze/AAPL", headers=ANY)
+
+    @patch('app.requests.post')
+    @patch('app.ticker_refresher')
+    def test_trigger_analysis_passes_unlisted_symbols(self, mock_refresher, mock_post):
+        """Test the /analyze/{ticker} endpoint lets MARKET and symbols missing from the index through"""
+        mock_post.return_value = MagicMock(status_code=202)
+        mock_refresher.index = TickerIndex([("AAPL", "Apple Inc."), ("MKTX", "MarketAxess Holdings Inc."),
+                                            ("SPYR", "Spyr Inc")])
+
+        for typed, expected in (("MARKET", "MARKET"), ("market", "MARKET"), ("SPY", "SPY"), ("7203.T", "7203.T")):
+            response = self.client.post(f"/analyze/{typed}")
+            self.assertEqual(response.status_code, 200, typed)
+            self.assertEqual(response.json()["ticker"], expected)
+
+        mock_post.assert_called_with("http://llm:5002/analyze/7203.T", headers=ANY)
+        mock_refresher.request.assert_any_call("SPY")
+
+    @patch('app.requests.post')
+    def test_trigger_analysis_rejects_malformed_ticker(self, mock_post):
+        """Test the /analyze/{ticker} endpoint rejects input that cannot be a symbol"""
+        response = self.client.post("/analyze/not a ticker")
+
+        self.assertEqual(response.status_code, 404)
+        mock_post.assert_not_called()
+
+    def test_suggest_tickers(self):
+        """Test the /api/tickers/suggest endpoint"""
+        response = self.client.get("/api/tickers/suggest?q=micro&limit=3")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["suggestions"][0], {"ticker": "MSFT", "name": "Microsoft Corp"})
+        self.assertEqual(response.headers["cache-control"], "public, max-age=300")
+        self.assertEqual(self.client.get("/api/tickers/suggest").status_code, 422)
 
     @patch('app.ArticleModel.get_articles_by_ticker')
     def test_get_articles_success(self, mock_get_articles):
@@ -168,6 +269,83 @@ class TestWebApp(unittest.TestCase):
         # Assert mock was called correctly - using simplified assertion
         mock_get_articles.assert_called_once()
     
+    @patch('app.ArticleModel.get_articles_by_ticker')
+    def test_get_articles_without_analysis(self, mock_get_articles):
+        """Test the /articles/{ticker} endpoint skips analysis bodies when asked"""
+        mock_get_articles.return_value = [{"_id": ObjectId(), "ticker": "AAPL", "summary": "Test summary"}]
+
+        response = self.client.get("/articles/AAPL?include_analysis=false")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("analysis", response.json()["articles"][0])
+        self.assertEqual(mock_get_articles.call_args.kwargs, {"include_analysis": False, "since": None})
+
+    @patch('app.ArticleModel.get_articles_by_ticker', return_value=[])
+    def test_get_articles_since_timestamp(self, mock_get_articles):
+        """Test the /articles/{ticker} endpoint passes a since timestamp as naive UTC"""
+        response = self.client.get("/articles/AAPL", params={"since": "2024-05-01T10:00:00.123000+02:00"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_articles.call_args.kwargs["since"], datetime(2024, 5, 1, 8, 0, 0, 123000))
+
+    @patch('app.ArticleModel.get_article_created_at')
+    @patch('app.ArticleModel.get_articles_by_ticker', return_value=[])
+    def test_get_articles_since_article_id(self, mock_get_articles, mock_created_at):
+        """Test the /articles/{ticker} endpoint resolves a since article id to its creation time"""
+        article_id = ObjectId()
+        mock_created_at.return_value = datetime(2024, 5, 1, 8, 0, 0)
+
+        response = self.client.get(f"/articles/AAPL?since={article_id}")
+
+        self.assertEqual(response.status_code, 200)
+        mock_created_at.assert_called_once_with(ANY, "AAPL", article_id)
+        self.assertEqual(mock_get_articles.call_args.kwargs["since"], datetime(2024, 5, 1, 8, 0, 0))
+
+    @patch('app.ArticleModel.get_article_created_at', return_value=None)
+    @patch('app.ArticleModel.get_articles_by_ticker')
+    def test_get_articles_since_invalid(self, mock_get_articles, mock_created_at):
+        """Test the /articles/{ticker} endpoint rejects unknown article ids and malformed timestamps"""
+        response = self.client.get(f"/articles/AAPL?since={ObjectId()}")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get("/articles/AAPL?since=yesterday")
+        self.assertEqual(response.status_code, 400)
+        mock_get_articles.assert_not_called()
+
+    @patch('app.ArticleModel.get_latest_article')
+    def test_get_latest_article(self, mock_latest):
+        """Test the /articles/{ticker}/latest endpoint returns only the newest id and timestamp"""
+        article_id = ObjectId()
+        mock_latest.return_value = {"_id": article_id, "created_at": datetime(2024, 5, 1, 8, 0, 0)}
+
+        response = self.client.get("/articles/AAPL/latest")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ticker": "AAPL", "id": str(article_id),
+                                           "created_at": "2024-05-01T08:00:00+00:00"})
+        mock_latest.assert_called_once_with(ANY, "AAPL", projection={"created_at": 1})
+
+    @patch('app.ArticleModel.get_latest_article', return_value=None)
+    def test_get_latest_article_none(self, mock_latest):
+        """Test the /articles/{ticker}/latest endpoint when the ticker has no articles"""
+        response = self.client.get("/articles/AAPL/latest")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ticker": "AAPL", "id": None, "created_at": None})
+
+    @patch('app.ArticleModel.get_articles_by_ticker')
+    def test_get_articles_gzip(self, mock_get_articles):
+        """Test large responses are gzip compressed for clients that accept it"""
+        mock_get_articles.return_value = [
+            {"_id": ObjectId(), "ticker": "AAPL", "summary": "Test summary", "analysis": "| row |\n" * 500}
+        ]
+
+        response = self.client.get("/articles/AAPL", headers={"Accept-Encoding": "gzip"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.json()["articles"][0]["analysis"], "| row |\n" * 500)
+
     @patch('app.ArticleModel.get_articles_by_ticker')
     def test_get_articles_db_exception(self, mock_get_articles):
         """Test the /articles/{ticker} endpoint with database exception"""
@@ -224,6 +402,138 @@ class TestWebApp(unittest.TestCase):
         # Assert mock was not called
         mock_get_trending.assert_not_called()
     
+    @patch('app.ArticleModel.get_latest_articles')
+    def test_get_snapshot(self, mock_latest):
+        """Test the /api/snapshot endpoint returns the latest article per ticker in the order asked for"""
+        article_id = ObjectId()
+        mock_latest.return_value = {
+            "MSFT": {"ticker": "MSFT", "id": ObjectId(), "overall_sentiment": "Neutral", "summary": "Flat",
+                     "created_at": datetime(2024, 1, 2)},
+            "AAPL": {"ticker": "AAPL", "id": article_id, "overall_sentiment": "Bullish", "summary": "Up",
+                     "created_at": datetime(2024, 1, 1)},
+        }
+
+        response = self.client.get("/api/snapshot?tickers=aapl, MSFT,goog,AAPL,")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([t["ticker"] for t in body["tickers"]], ["AAPL", "MSFT"])
+        self.assertEqual(body["tickers"][0]["id"], str(article_id))
+        self.assertEqual(body["missing"], ["GOOG"])
+        mock_latest.assert_called_once()
+        self.assertEqual(mock_latest.call_args[0][1], ["AAPL", "MSFT", "GOOG"])
+
+    @patch('app.ArticleModel.get_latest_articles')
+    def test_get_snapshot_limits(self, mock_latest):
+        """Test the /api/snapshot endpoint serves 100 tickers and rejects empty or longer lists"""
+        mock_latest.return_value = {}
+        tickers = [f"T{i}" for i in range(101)]
+
+        self.assertEqual(self.client.get(f"/api/snapshot?tickers={','.join(tickers[:100])}").status_code, 200)
+        self.assertEqual(self.client.get(f"/api/snapshot?tickers={','.join(tickers)}").status_code, 400)
+        self.assertEqual(self.client.get("/api/snapshot?tickers=,").status_code, 400)
+        mock_latest.assert_called_once()
+
+    @patch('app.ArticleModel.get_latest_articles')
+    def test_get_snapshot_db_exception(self, mock_latest):
+        """Test the /api/snapshot endpoint with database exception"""
+        mock_latest.side_effect = PyMongoError("Database connection error")
+
+        response = self.client.get("/api/snapshot?tickers=AAPL")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Database error", response.json()["detail"])
+
+    @patch('app.sentiment_series')
+    def test_get_sentiment_series(self, mock_series):
+        """Test the /api/tickers/{ticker}/sentiment-series endpoint passes the series parameters"""
+        mock_series.series.return_value = {"ticker": "AAPL", "bucket": "1w", "count": 1, "mean": 1.0, "buckets": [
+            {"start": datetime(2024, 1, 8), "count": 1, "mean": 1.0, "rolling_mean": 1.0, "momentum": None,
+             "volatility": 0.0}]}
+
+        response = self.client.get("/api/tickers/aapl/sentiment-series?bucket=1w&window=4&days=365")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["buckets"][0]["mean"], 1.0)
+        mock_series.series.assert_called_once_with("AAPL", bucket="1w", window=4, days=365)
+
+    @patch('app.sentiment_series')
+    def test_get_sentiment_series_errors(self, mock_series):
+        """Test the /api/tickers/{ticker}/sentiment-series endpoint rejects bad buckets and reports missing tickers"""
+        self.assertEqual(self.client.get("/api/tickers/AAPL/sentiment-series?bucket=1m").status_code, 400)
+        self.assertEqual(self.client.get("/api/tickers/AAPL/sentiment-series?bucket=1h&days=3650").status_code, 400)
+        mock_series.series.assert_not_called()
+
+        mock_series.series.return_value = None
+        self.assertEqual(self.client.get("/api/tickers/ZZZZ/sentiment-series").status_code, 404)
+
+        mock_series.series.side_effect = PyMongoError("Database connection error")
+        response = self.client.get("/api/tickers/AAPL/sentiment-series")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Database error", response.json()["detail"])
+
+    @patch('app.ArticleModel.search_articles')
+    def test_search_articles(self, mock_search):
+        """Test the /api/search endpoint pages through the text matches"""
+        mock_search.return_value = [
+            {"_id": ObjectId(), "ticker": "AAPL", "summary": f"FDA approval {i}", "overall_sentiment": "Bullish",
+             "score": 2.0, "created_at": datetime.now()}
+            for i in range(3)
+        ]
+
+        response = self.client.get("/api/search?q=fda+approval&ticker=aapl&sentiment=bullish&time_range=7d&page=2&page_size=2")
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["page"], 2)
+        self.assertTrue(body["has_more"])
+        self.assertEqual([a["summary"] for a in body["articles"]], ["FDA approval 0", "FDA approval 1"])
+        self.assertEqual(body["articles"][0]["score"], 2.0)
+        mock_search.assert_called_once()
+        self.assertEqual(mock_search.call_args.args[1], "fda approval")
+        self.assertEqual(mock_search.call_args.kwargs, {"ticker": "AAPL", "sentiment": "Bullish", "time_range": "7d",
+                                                        "skip": 2, "limit": 3})
+
+    @patch('app.ArticleModel.search_articles')
+    def test_search_articles_invalid_filters(self, mock_search):
+        """Test the /api/search endpoint rejects unknown filters and pages past the result cap"""
+        for query in ("q=fda&sentiment=happy", "q=fda&time_range=1y", "q=", "q=fda&page=1000"):
+            response = self.client.get(f"/api/search?{query}")
+            self.assertIn(response.status_code, (400, 422), query)
+        mock_search.assert_not_called()
+
+    @patch('app.ArticleModel.search_articles')
+    def test_search_articles_db_exception(self, mock_search):
+        """Test the /api/search endpoint with database exception"""
+        mock_search.side_effect = PyMongoError("Database connection error")
+
+        response = self.client.get("/api/search?q=downgrade")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Database error", response.json()["detail"])
+
+    @patch('app.AnalysisRunModel.get_run_stats')
+    def test_get_analysis_run_stats(self, mock_get_run_stats):
+        """Test the /api/analysis-runs/stats endpoint groups by the requested fields"""
+        mock_get_run_stats.return_value = [{"provider": "OPENAI", "runs": 2, "p95_seconds": 12.5}]
+
+        response = self.client.get("/api/analysis-runs/stats?group_by=provider,day&days=30")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["group_by"], ["provider", "day"])
+        self.assertEqual(response.json()["stats"][0]["p95_seconds"], 12.5)
+        mock_get_run_stats.assert_called_once()
+        self.assertEqual(mock_get_run_stats.call_args.kwargs, {"group_by": ["provider", "day"], "days": 30})
+
+    @patch('app.AnalysisRunModel.get_run_stats')
+    def test_get_analysis_run_stats_invalid_group_by(self, mock_get_run_stats):
+        """Test the /api/analysis-runs/stats endpoint rejects unknown group fields"""
+        response = self.client.get("/api/analysis-runs/stats?group_by=provider,color")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid group_by", response.json()["detail"])
+        mock_get_run_stats.assert_not_called()
+
     @patch('app.ArticleModel.get_trending_articles')
     def test_get_trending_articles_db_exception(self, mock_get_trending):
         """Test the /api/trending endpoint with database exception"""
@@ -239,6 +549,56 @@ class TestWebApp(unittest.TestCase):
         
         # Assert mock was called
         mock_get_trending.assert_called_once()
+
+    @patch('app.trending_hub')
+    def test_trending_stream_unavailable_without_change_streams(self, mock_hub):
+        """Test the /api/trending/stream endpoint answers 503 once change streams turned out unsupported"""
+        mock_hub.supported = False
+
+        response = self.client.get("/api/trending/stream")
+
+        self.assertEqual(response.status_code, 503)
+        mock_hub.subscribe.assert_not_called()
+
+    @patch('app.load_snapshots')
+    @patch('app.demand')
+    def test_get_hot_tickers(self, mock_demand, mock_load_snapshots):
+        """Test the /api/trending/hot endpoint merges the replica snapshots"""
+        snapshots = [{"_id": "web-2"}]
+        mock_load_snapshots.return_value = snapshots
+        mock_demand.half_life_seconds = 3600.0
+        mock_demand.hot.return_value = [{"ticker": "AAPL", "score": 4.5, "unique_requesters": 3}]
+
+        response = self.client.get("/api/trending/hot?limit=5")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            "half_life_seconds": 3600.0,
+            "tickers": [{"ticker": "AAPL", "score": 4.5, "unique_requesters": 3}],
+        })
+        mock_demand.hot.assert_called_once_with(snapshots, 5)
+
+    @patch('app.load_snapshots')
+    def test_get_hot_tickers_db_exception(self, mock_load_snapshots):
+        """Test the /api/trending/hot endpoint with database exception"""
+        mock_load_snapshots.side_effect = PyMongoError("Database connection error")
+
+        response = self.client.get("/api/trending/hot")
+
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("Database error", response.json()["detail"])
+
+    @patch('app.requester_id', return_value="1.2.3.4|test")
+    @patch('app.demand')
+    @patch('fastapi.templating.Jinja2Templates.TemplateResponse')
+    @patch('app.ArticleModel.get_latest_article', return_value=None)
+    def test_detail_page_records_demand(self, mock_latest, mock_template_response, mock_demand, mock_requester):
+        """Test that viewing a detail page counts toward the ticker's demand"""
+        mock_template_response.return_value = HTMLResponse(content="<html>Detail</html>")
+
+        self.client.get("/detail?ticker=aapl")
+
+        mock_demand.record.assert_called_once_with("AAPL", "1.2.3.4|test")
     
     @patch('app.requests.get')
     @patch('app.MongoDBConnection._client')
@@ -262,6 +622,18 @@ class TestWebApp(unittest.TestCase):
         self.assertEqual(response_json["mongo"], "reachable")
         self.assertEqual(response_json["llm_service"]["status"], "unreachable")
 
+    def test_metrics_endpoint(self):
+        """Test the /metrics endpoint exposes route latency histograms"""
+        # Make a request so the route shows up in the histogram
+        self.client.get("/api/trending?time_range=invalid")
+        
+        response = self.client.get("/metrics")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response.headers["content-type"])
+        self.assertIn('route="/api/trending"', response.text)
+        self.assertIn('service="web"', response.text)
+
 
 from fastapi.responses import HTMLResponse
 
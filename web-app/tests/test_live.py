@@ -0,0 +1,144 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import asyncio
+import json
+import sys
+import os
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+# Add parent directory to sys.path to ensure we can import modules from web-app
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from live import TrendingHub, CHANGE_STREAM_PIPELINE
+
+
+class TestTrendingHub(unittest.TestCase):
+    """Test for the TrendingHub change-stream fan-out in web-app/live.py"""
+
+    def setUp(self):
+        self.collection = MagicMock()
+        self.hub = TrendingHub(self.collection, queue_size=2)
+
+    def _article(self, ticker="AAPL"):
+        return {
+            "_id": ObjectId(),
+            "ticker": ticker,
+            "summary": "Test summary",
+            "overall_sentiment": "Bullish",
+            "created_at": datetime(2023, 1, 1, 12, 0, 0)
+        }
+
+    @patch.object(TrendingHub, 'start')
+    def test_publish_fans_out_to_all_clients(self, mock_start):
+        """Test if one published article reaches every subscribed client"""
+        async def scenario():
+            queue1 = self.hub.subscribe()
+            queue2 = self.hub.subscribe()
+            self.hub.publish(self._article())
+            # Let the loop run the call_soon_threadsafe callbacks
+            await asyncio.sleep(0)
+            return queue1.get_nowait(), queue2.get_nowait()
+
+        payload1, payload2 = asyncio.run(scenario())
+
+        self.assertEqual(payload1, payload2)
+        event = json.loads(payload1)
+        self.assertEqual(event["ticker"], "AAPL")
+        self.assertIn("id", event)
+        self.assertEqual(event["created_at"], "2023-01-01T12:00:00+00:00")
+        self.assertEqual(mock_start.call_count, 2)
+
+    @patch.object(TrendingHub, 'start')
+    def test_slow_client_drops_oldest_event(self, mock_start):
+        """Test if a full client queue drops its oldest event instead of blocking"""
+        async def scenario():
+            queue = self.hub.subscribe()
+            for ticker in ["AAPL", "MSFT", "TSLA"]:
+                self.hub.publish(self._article(ticker))
+            await asyncio.sleep(0)
+            return [json.loads(queue.get_nowait())["ticker"] for _ in range(queue.qsize())]
+
+        tickers = asyncio.run(scenario())
+
+        self.assertEqual(tickers, ["MSFT", "TSLA"])
+        self.assertEqual(self.hub.dropped_events, 1)
+
+    @patch.object(TrendingHub, 'start')
+    def test_unsubscribe_stops_delivery(self, mock_start):
+        """Test if an unsubscribed client no longer receives events"""
+        async def scenario():
+            queue = self.hub.subscribe()
+            self.hub.unsubscribe(queue)
+            self.hub.publish(self._article())
+            await asyncio.sleep(0)
+            return queue.empty()
+
+        self.assertTrue(asyncio.run(scenario()))
+        self.assertEqual(self.hub.client_count, 0)
+
+    def test_run_exits_without_clients(self):
+        """Test if the stream thread releases the cursor and its resume token when nobody is subscribed"""
+        self.hub._resume_token = {"_data": "old"}
+
+        self.hub._run()
+
+        self.collection.watch.assert_not_called()
+        self.assertIsNone(self.hub._resume_token)
+
+    def test_run_publishes_change_events(self):
+        """Test if the stream thread opens one change stream and publishes inserts"""
+        article = self._article()
+        stream = MagicMock()
+        stream.__enter__.return_value = stream
+        self.collection.watch.return_value = stream
+        self.hub._clients[MagicMock()] = MagicMock()
+
+        def try_next():
+            # Deliver one change, then behave as if the last client left
+            self.hub._clients.clear()
+            return {"fullDocument": article}
+        stream.try_next.side_effect = try_next
+
+        with patch.object(self.hub, 'publish') as mock_publish:
+            self.hub._run()
+
+        self.collection.watch.assert_called_once()
+        args, kwargs = self.collection.watch.call_args
+        self.assertEqual(args[0], CHANGE_STREAM_PIPELINE)
+        mock_publish.assert_called_once_with(article)
+
+    def test_run_retries_after_stream_error(self):
+        """Test if a failing change stream is retried after a pause"""
+        self.hub._clients[MagicMock()] = MagicMock()
+        self.collection.watch.side_effect = PyMongoError("not a replica set")
+
+        with patch.object(self.hub._stop, 'wait', side_effect=lambda timeout: self.hub._stop.set()) as mock_wait:
+            self.hub._run()
+
+        mock_wait.assert_called_once_with(5.0)
+
+    def test_run_turns_off_without_replica_set(self):
+        """Test if a standalone server turns the hub off once and ends every client's stream"""
+        async def scenario():
+            queue = self.hub.subscribe()
+            self.collection.watch.side_effect = OperationFailure(
+                "The $changeStream stage is only supported on replica sets", code=40573)
+            with patch.object(self.hub._stop, 'wait') as mock_wait:
+                self.hub._run()
+            await asyncio.sleep(0)
+            return queue.get_nowait(), mock_wait
+
+        with patch.object(TrendingHub, 'start'):
+            payload, mock_wait = asyncio.run(scenario())
+
+        self.assertIsNone(payload)
+        self.assertFalse(self.hub.supported)
+        self.assertEqual(self.hub.client_count, 0)
+        self.collection.watch.assert_called_once()
+        mock_wait.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
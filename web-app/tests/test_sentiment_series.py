@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import patch, MagicMock
+from datetime import datetime, timedelta
+import math
+import os
+import sys
+
+import numpy as np
+from bson import ObjectId
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentiment_series import SentimentSeries, compute_series, to_scores
+
+NOW = datetime(2024, 1, 10, 12, 0, 0)
+
+
+def day(days_ago: int, hour: int = 9) -> datetime:
+    return datetime(2024, 1, 10, hour) - timedelta(days=days_ago)
+
+
+class TestComputeSeries(unittest.TestCase):
+    """Test for the vectorized series computation in web-app/sentiment_series.py"""
+
+    def _series(self, rows, days=3, window=2, bucket_seconds=86400):
+        times = np.array([created_at for created_at, _ in rows], dtype="datetime64[ms]")
+        scores = to_scores([label for _, label in rows])
+        return compute_series(times, scores, np.datetime64(NOW, "ms"), bucket_seconds,
+                              max(1, days * 86400 // bucket_seconds), window)
+
+    def test_to_scores(self):
+        """Test if labels map to ordinal scores and unknown labels to NaN"""
+        scores = to_scores(["Bearish", "neutral", " BULLISH ", "Mixed", None])
+
+        self.assertEqual(scores[:3].tolist(), [-1.0, 0.0, 1.0])
+        self.assertTrue(np.isnan(scores[3:]).all())
+
+    def test_buckets_means_and_windows(self):
+        """Test if bucket means, rolling means, momentum and volatility match a direct computation"""
+        rows = [(day(4), "Bearish"), (day(3), "Bearish"), (day(2), "Bullish"), (day(2, 15), "Neutral"),
+                (day(0), "Bullish"), (day(0, 10), "Mixed")]
+
+        series = self._series(rows)
+
+        self.assertEqual([b["start"] for b in series["buckets"]], [day(2, 0), day(1, 0), day(0, 0)])
+        self.assertEqual([b["count"] for b in series["buckets"]], [2, 0, 1])
+        self.assertEqual([b["mean"] for b in series["buckets"]], [0.5, None, 1.0])
+        # Two-day windows: {-1, 1, 0}, {1, 0}, {1}
+        self.assertEqual([b["rolling_mean"] for b in series["buckets"]], [0.0, 0.5, 1.0])
+        self.assertEqual([b["volatility"] for b in series["buckets"]], [round(math.sqrt(2 / 3), 4), 0.5, 0.0])
+        # Change from the window two days earlier: {-1}, {-1, -1}, {-1, 1, 0}
+        self.assertEqual([b["momentum"] for b in series["buckets"]], [1.0, 1.5, 1.0])
+        self.assertEqual(series["count"], 3)
+        self.assertEqual(series["mean"], 0.6667)
+
+    def test_empty_history(self):
+        """Test if a range without scored analyses has empty buckets and no mean"""
+        series = self._series([(day(30), "Bullish")])
+
+        self.assertEqual(len(series["buckets"]), 3)
+        self.assertTrue(all(b["mean"] is None and b["rolling_mean"] is None for b in series["buckets"]))
+        self.assertEqual(series["count"], 0)
+        self.assertIsNone(series["mean"])
+
+    def test_weeks_start_on_monday(self):
+        """Test if weekly buckets start on Monday at midnight"""
+        series = self._series([(day(1), "Bullish")], days=7, window=1, bucket_seconds=7 * 86400)
+
+        self.assertEqual(series["buckets"][-1]["start"], datetime(2024, 1, 8))
+
+
+class TestSentimentSeries(unittest.TestCase):
+    """Test for the cached per-ticker series in web-app/sentiment_series.py"""
+
+    def setUp(self):
+        self.series = SentimentSeries(MagicMock(), max_tickers=2)
+
+    @patch('sentiment_series.ArticleModel.get_sentiment_history')
+    @patch('sentiment_series.ArticleModel.get_latest_article')
+    def test_appends_only_new_articles(self, mock_latest, mock_history):
+        """Test if a newer article loads only the rows from the last time loaded on"""
+        first_id, second_id = ObjectId(), ObjectId()
+        mock_latest.return_value = {"_id": first_id}
+        mock_history.return_value = [(day(1), "Bearish"), (day(0), "Bearish")]
+
+        before = self.series.series("aapl", window=1, days=2, now=NOW)
+
+        mock_latest.return_value = {"_id": second_id}
+        mock_history.return_value = [(day(0), "Bearish"), (day(0, 10), "Bullish")]
+        after = self.series.series("AAPL", window=1, days=2, now=NOW)
+
+        self.assertEqual(before["mean"], -1.0)
+        self.assertEqual(after["mean"], round(-1 / 3, 4))
+        self.assertEqual(mock_history.call_args_list[0].kwargs["since"], None)
+        self.assertEqual(mock_history.call_args_list[1].kwargs["since"], day(0))
+
+    @patch('sentiment_series.ArticleModel.get_sentiment_history')
+    @patch('sentiment_series.ArticleModel.get_latest_article')
+    def test_reloads_articles_in_the_same_millisecond(self, mock_latest, mock_history):
+        """Test if an article stored in the same millisecond as the last one loaded is not missed"""
+        mock_latest.return_value = {"_id": ObjectId()}
+        mock_history.return_value = [(day(1), "Bearish"), (day(0), "Bearish"), (day(0), "Bearish")]
+        self.series.series("AAPL", window=1, days=2, now=NOW)
+
+        mock_latest.return_value = {"_id": ObjectId()}
+        mock_history.return_value = [(day(0), "Bearish"), (day(0), "Bullish"), (day(0), "Bearish")]
+        after = self.series.series("AAPL", window=1, days=2, now=NOW)
+
+        self.assertEqual([b["count"] for b in after["buckets"]], [1, 3])
+        self.assertEqual(after["mean"], -0.5)
+        self.assertEqual(mock_history.call_args_list[1].kwargs["since"], day(0))
+
+    @patch('sentiment_series.compute_series', wraps=compute_series)
+    @patch('sentiment_series.ArticleModel.get_sentiment_history')
+    @patch('sentiment_series.ArticleModel.get_latest_article')
+    def test_caches_until_newest_article_changes(self, mock_latest, mock_history, mock_compute):
+        """Test if the series is computed once per newest article and bucket"""
+        mock_latest.return_value = {"_id": ObjectId()}
+        mock_history.return_value = [(day(0), "Bullish")]
+
+        first = self.series.series("AAPL", now=NOW)
+        second = self.series.series("AAPL", now=NOW + timedelta(minutes=5))
+        self.series.series("AAPL", now=NOW + timedelta(days=1))
+
+        self.assertIs(first, second)
+        self.assertEqual(mock_history.call_count, 1)
+        self.assertEqual(mock_compute.call_count, 2)
+
+    @patch('sentiment_series.ArticleModel.get_sentiment_history')
+    @patch('sentiment_series.ArticleModel.get_latest_article')
+    def test_unknown_ticker_and_eviction(self, mock_latest, mock_history):
+        """Test if a ticker without articles has no series and old histories are evicted"""
+        mock_latest.return_value = None
+        self.assertIsNone(self.series.series("NONE", now=NOW))
+        mock_history.assert_not_called()
+
+        mock_latest.return_value = {"_id": ObjectId()}
+        mock_history.return_value = [(day(0), "Bullish")]
+        for ticker in ("AAPL", "MSFT", "GOOG"):
+            self.series.series(ticker, now=NOW)
+
+        self.assertEqual(list(self.series._histories), ["MSFT", "GOOG"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from static_assets import AssetManifest, ImmutableStaticFiles, IMMUTABLE, CDN_FALLBACK, build
+
+SOURCES = {
+    "css/app.css": "build/app.css",
+    "js/chart.js": "vendor/chart.umd.js",
+    "fontawesome/css/all.css": "vendor/fa/css/all.min.css",
+    "fontawesome/webfonts": "vendor/fa/webfonts",
+}
+
+
+class TestStaticAssets(unittest.TestCase):
+    """Test for the hashed static asset build in web-app/static_assets.py"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp.name, "frontend")
+        self.output = os.path.join(self.tmp.name, "static")
+        files = {
+            "build/app.css": ".p-4{padding:1rem}",
+            "vendor/chart.umd.js": "window.Chart=function(){};",
+            "vendor/fa/css/all.min.css": '@font-face{src:url(../webfonts/fa-solid-900.woff2) format("woff2"),url("../webfonts/fa-solid-900.ttf?v=6")}',
+            "vendor/fa/webfonts/fa-solid-900.woff2": "woff2",
+            "vendor/fa/webfonts/fa-solid-900.ttf": "ttf",
+        }
+        for path, content in files.items():
+            path = os.path.join(self.source, path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_hashes_files_and_writes_manifest(self):
+        """Test if every asset is written under a content-hashed name listed in the manifest"""
+        manifest = build(self.source, self.output, SOURCES)
+
+        with open(os.path.join(self.output, "manifest.json")) as f:
+            self.assertEqual(json.load(f), manifest)
+        self.assertEqual(len(manifest), 5)
+        self.assertRegex(manifest["css/app.css"], r"^css/app\.[0-9a-f]{12}\.css$")
+        for hashed in manifest.values():
+            self.assertTrue(os.path.isfile(os.path.join(self.output, hashed)))
+
+        # The same content gives the same names
+        self.assertEqual(build(self.source, self.output, SOURCES), manifest)
+
+    def test_build_rewrites_stylesheet_urls(self):
+        """Test if font references in a stylesheet point at the hashed fonts"""
+        manifest = build(self.source, self.output, SOURCES)
+
+        with open(os.path.join(self.output, manifest["fontawesome/css/all.css"])) as f:
+            css = f.read()
+        woff2 = os.path.basename(manifest["fontawesome/webfonts/fa-solid-900.woff2"])
+        ttf = os.path.basename(manifest["fontawesome/webfonts/fa-solid-900.ttf"])
+        self.assertIn(f"url(../webfonts/{woff2})", css)
+        self.assertIn(f"url(../webfonts/{ttf}?v=6)", css)
+
+    def test_build_missing_source(self):
+        """Test if a missing npm build is reported"""
+        with self.assertRaises(FileNotFoundError):
+            build(self.source, self.output, {**SOURCES, "js/extra.js": "vendor/extra.min.js"})
+
+    def test_manifest_urls_and_cdn_fallback(self):
+        """Test if asset_url resolves hashed paths, or pinned CDN copies without a build"""
+        manifest = build(self.source, self.output, SOURCES)
+
+        assets = AssetManifest.load(self.output)
+        self.assertTrue(assets.built)
+        self.assertEqual(assets.url("js/chart.js"), f"/static/{manifest['js/chart.js']}")
+
+        fallback = AssetManifest.load(os.path.join(self.tmp.name, "missing"))
+        self.assertFalse(fallback.built)
+        self.assertEqual(fallback.url("js/chart.js"), CDN_FALLBACK["js/chart.js"])
+        with self.assertRaises(KeyError):
+            fallback.url("css/app.css")
+
+    def test_cache_headers(self):
+        """Test if hashed files are immutable and the manifest is revalidated"""
+        manifest = build(self.source, self.output, SOURCES)
+        assets = AssetManifest.load(self.output)
+        app = FastAPI()
+        app.mount("/static", ImmutableStaticFiles(directory=self.output, manifest=assets), name="static")
+        client = TestClient(app)
+
+        response = client.get(assets.url("css/app.css"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, ".p-4{padding:1rem}")
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+
+        response = client.get(f"/static/{manifest['fontawesome/webfonts/fa-solid-900.woff2']}")
+        self.assertEqual(response.headers["cache-control"], IMMUTABLE)
+
+        response = client.get("/static/manifest.json")
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tickers import TickerIndex, TickerRefresher, load_snapshot, parse_tickers
+
+TICKERS = [
+    ("AAPL", "Apple Inc."),
+    ("MSFT", "Microsoft Corp"),
+    ("AMZN", "Amazon.com Inc"),
+    ("BRK-B", "Berkshire Hathaway Inc"),
+    ("F", "Ford Motor Co"),
+    ("GM", "General Motors Co"),
+    ("APLE", "Apple Hospitality REIT, Inc."),
+    ("FORD", "Forward Industries Inc"),
+]
+
+
+class TestTickerIndex(unittest.TestCase):
+    """Test for the ticker prefix index in web-app/tickers.py"""
+
+    def setUp(self):
+        self.index = TickerIndex(TICKERS)
+
+    def test_suggest_ranks_exact_symbol_then_prominence(self):
+        """Test if an exact symbol comes first and other matches keep the list order"""
+        self.assertEqual([s["ticker"] for s in self.index.suggest("ap")], ["AAPL", "APLE"])
+        self.assertEqual([s["ticker"] for s in self.index.suggest("f")], ["F", "FORD"])
+        self.assertEqual([s["ticker"] for s in self.index.suggest("ford")], ["FORD", "F"])
+        self.assertEqual(self.index.suggest("mo", limit=1), [{"ticker": "F", "name": "Ford Motor Co"}])
+        self.assertEqual(self.index.suggest("zzz"), [])
+        self.assertEqual(self.index.suggest("  "), [])
+
+    def test_resolve_symbols_and_names(self):
+        """Test if symbols resolve in any spelling and names resolve to the most prominent company"""
+        self.assertEqual(self.index.resolve("aapl"), "AAPL")
+        self.assertEqual(self.index.resolve("$brk.b"), "BRK-B")
+        self.assertEqual(self.index.resolve("apple"), "AAPL")
+        self.assertEqual(self.index.resolve("Apple Hospitality"), "APLE")
+        self.assertEqual(self.index.resolve("general motors"), "GM")
+        # Only whole leading words of a name count
+        self.assertIsNone(self.index.resolve("appl"))
+        self.assertIsNone(self.index.resolve("motors"))
+        self.assertIsNone(self.index.resolve("XYZ"))
+
+    def test_duplicate_symbols_keep_first(self):
+        """Test if a repeated symbol keeps its first, most prominent entry"""
+        index = TickerIndex([("AAPL", "Apple Inc."), ("AAPL", "Apple Duplicate")])
+        self.assertEqual(len(index), 1)
+        self.assertEqual(index.suggest("AAPL"), [{"ticker": "AAPL", "name": "Apple Inc."}])
+
+    def test_resolve_symbols_only(self):
+        """Test if names are skipped when only symbols may match"""
+        self.assertEqual(self.index.resolve("aapl", names=False), "AAPL")
+        self.assertIsNone(self.index.resolve("apple", names=False))
+
+    def test_parse_formats(self):
+        """Test if the snapshot and Tickertick search formats both parse in list order"""
+        tickertick = {"tickers": [{"ticker": "msft", "company_name": "Microsoft Corp"}, {"ticker": "aapl"}]}
+        self.assertEqual(parse_tickers(tickertick), [("MSFT", "Microsoft Corp"), ("AAPL", "")])
+        self.assertEqual(parse_tickers({"tickers": [["AAPL", "Apple Inc."]]}), [("AAPL", "Apple Inc.")])
+        with self.assertRaises(ValueError):
+            parse_tickers(["AAPL"])
+
+    def test_bundled_snapshot(self):
+        """Test if the bundled snapshot loads"""
+        index = load_snapshot()
+        self.assertGreater(len(index), 100)
+        self.assertEqual(index.resolve("apple"), "AAPL")
+
+
+class TestTickerRefresher(unittest.TestCase):
+    """Test for the background Tickertick lookups in web-app/tickers.py"""
+
+    @patch('tickers.requests.get')
+    def test_refresh_merges_new_symbols(self, mock_get):
+        """Test if a lookup adds the symbols the index lacks and swaps in a new index"""
+        mock_get.return_value = MagicMock(json=MagicMock(return_value={"tickers": [
+            {"ticker": "spy", "company_name": "SPDR S&P 500 ETF Trust"}, {"ticker": "aapl", "company_name": "Apple"}]}))
+        index = TickerIndex(TICKERS)
+        refresher = TickerRefresher(index, "http://tickers.test")
+
+        self.assertEqual(refresher.refresh("spy"), 1)
+
+        self.assertIsNot(refresher.index, index)
+        self.assertEqual(refresher.index.resolve("SPY"), "SPY")
+        self.assertEqual(refresher.index.suggest("AAPL")[0], {"ticker": "AAPL", "name": "Apple Inc."})
+        mock_get.assert_called_once_with("http://tickers.test", params={"p": "spy", "n": 5}, timeout=10.0)
+
+    @patch('tickers.requests.get')
+    def test_failed_refresh_keeps_index(self, mock_get):
+        """Test if a failed or empty lookup keeps the current index"""
+        index = TickerIndex(TICKERS)
+        refresher = TickerRefresher(index, "http://tickers.test")
+
+        mock_get.side_effect = requests.ConnectionError("down")
+        self.assertEqual(refresher.refresh("spy"), 0)
+        mock_get.side_effect = None
+        mock_get.return_value = MagicMock(json=MagicMock(return_value={"tickers": []}))
+        self.assertEqual(refresher.refresh("spy"), 0)
+
+        self.assertIs(refresher.index, index)
+
+    def test_request_queues_each_query_once(self):
+        """Test if misses are queued once per query and not at all without a lookup URL"""
+        refresher = TickerRefresher(TickerIndex(TICKERS), "http://tickers.test", max_pending=2)
+        for query in ("SPY", "spy", "QQQ", "DIA"):
+            refresher.request(query)
+        self.assertEqual(list(refresher._pending), ["spy", "qqq"])
+
+        off = TickerRefresher(TickerIndex(TICKERS), "")
+        off.request("SPY")
+        self.assertEqual(off._pending, {})
+
+    def test_seen_keys_are_bounded(self):
+        """Test if only the most recently missed keys are remembered as looked up"""
+        refresher = TickerRefresher(TickerIndex(TICKERS), "http://tickers.test", interval_seconds=0, max_seen=2)
+        for query in ("SPY", "QQQ", "DIA"):
+            refresher.request(query)
+
+        with patch.object(refresher, 'refresh') as mock_refresh, \
+                patch.object(refresher._stop, 'wait', side_effect=[False] * 3 + [True]):
+            refresher._run()
+
+        self.assertEqual(mock_refresh.call_count, 3)
+        self.assertEqual(list(refresher._seen), ["qqq", "dia"])
+        refresher.request("DIA")
+        self.assertEqual(refresher._pending, {})
+        refresher.request("SPY")
+        self.assertEqual(list(refresher._pending), ["spy"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+# web-app/tickers.py
+"""
+Local index of ticker symbols and company names.
+
+Suggestions and input validation used to need the LLM to call Tickertick's
+ticker search. TickerIndex answers both in memory from sorted arrays of
+normalized keys (every symbol, every company name and each word suffix of the
+name), so a prefix lookup is two binary searches and a short scan.
+
+The index starts from the snapshot bundled next to this file (tickers.json).
+Input it cannot resolve is passed to TickerRefresher, which looks it up in
+the background with Tickertick's ticker search and merges the matches in,
+at most one request per interval:
+
+    TICKER_LOOKUP_URL                Tickertick ticker search (default: TICKERTICK_API_URL/tickers, empty: off)
+    TICKER_LOOKUP_INTERVAL_SECONDS   time between lookups (default 6, Tickertick allows 10 a minute)
+
+`python tickers.py add QUERY...` looks queries up and adds the matches to tickers.json.
+"""
+
+import argparse
+import bisect
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional
+
+import requests
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tickers.json")
+TICKERTICK_API_URL = os.getenv("TICKERTICK_API_URL", "https://api.tickertick.com").rstrip("/")
+# What a ticker symbol can look like when the index cannot vouch for it
+SYMBOL = re.compile(r"^\^?[A-Z0-9][A-Z0-9.\-=]{0,11}$")
+# Not listed symbols, but understood by the analysis pipeline (MARKET: curated market news)
+PSEUDO_SYMBOLS = {"MARKET"}
+
+_WORDS = re.compile(r"[a-z0-9]+")
+# Sorts after every key that starts with a given prefix
+_END = "\U0010ffff"
+# Key kinds, to tell symbols and whole names from words inside a name
+_SYMBOL, _NAME, _NAME_WORD = 0, 1, 2
+# Prefixes this short match a large part of the index, so their suggestions are cached
+_CACHED_PREFIX_LENGTH = 2
+
+
+def normalize_symbol(text: str) -> str:
+    return text.strip().lstrip("$").upper()
+
+
+def _key(text: str) -> str:
+    """
+    Lower-cased words separated by single spaces, so "BRK.B", "brk-b" and
+    "Coca-Cola Co" compare by their letters and digits only.
+    """
+    return " ".join(_WORDS.findall(text.lower()))
+
+
+class TickerIndex:
+    """
+    Prefix index over `tickers`, a list of (symbol, company name) pairs ordered
+    from most to least prominent; earlier entries rank first in suggestions.
+    """
+
+    def __init__(self, tickers: list):
+        self.symbols = []
+        self.names = []
+        self._by_key = {}
+        entries = []
+        for symbol, name in tickers:
+            key = _key(symbol)
+            if not key or key in self._by_key:
+                continue
+            rank = len(self.symbols)
+            self.symbols.append(symbol)
+            self.names.append(name)
+            self._by_key[key] = rank
+            entries.append((key, rank, _SYMBOL))
+            words = _key(name).split()
+            for start in range(len(words)):
+                entries.append((" ".join(words[start:]), rank, _NAME if start == 0 else _NAME_WORD))
+        entries.sort()
+        self._keys = [key for key, _, _ in entries]
+        self._ranks = array("i", [rank for _, rank, _ in entries])
+        self._kinds = bytes(kind for _, _, kind in entries)
+        self._cache = {}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return _key(symbol) in self._by_key
+
+    def tickers(self) -> list:
+        return list(zip(self.symbols, self.names))
+
+    def _range(self, key: str):
+        return bisect.bisect_left(self._keys, key), bisect.bisect_left(self._keys, key + _END)
+
+    def _entry(self, rank: int) -> dict:
+        return {"ticker": self.symbols[rank], "name": self.names[rank]}
+
+    def suggest(self, query: str, limit: int = 8) -> list:
+        """
+        Up to `limit` companies whose symbol, name or a word of their name starts
+        with `query`. An exact symbol match comes first, the rest by prominence.
+        """
+        key = _key(query)
+        if not key or limit <= 0:
+            return []
+        if len(key) <= _CACHED_PREFIX_LENGTH and (key, limit) in self._cache:
+            return self._cache[(key, limit)]
+        lo, hi = self._range(key)
+        ranks = heapq.nsmallest(limit + 1, set(self._ranks[lo:hi]))
+        exact = self._by_key.get(key)
+        if exact is not None:
+            ranks = [exact] + [rank for rank in ranks if rank != exact]
+        suggestions = [self._entry(rank) for rank in ranks[:limit]]
+        if len(key) <= _CACHED_PREFIX_LENGTH:
+            self._cache[(key, limit)] = suggestions
+        return suggestions
+
+    def resolve(self, query: str, names: bool = True) -> Optional[str]:
+        """
+        The symbol `query` refers to: a listed symbol, in any case and with "."
+        or "-" share classes, or else (with `names`) the most prominent company
+        whose name starts with the query's words. None when neither matches.
+        """
+        key = _key(query)
+        if not key:
+            return None
+        if key in self._by_key:
+            return self.symbols[self._by_key[key]]
+        if not names:
+            return None
+        lo, hi = self._range(key)
+        best = None
+        for i in range(lo, hi):
+            full_words = len(self._keys[i]) == len(key) or self._keys[i][len(key)] == " "
+            if self._kinds[i] == _NAME and full_words and (best is None or self._ranks[i] < best):
+                best = self._ranks[i]
+        return self.symbols[best] if best is not None else None
+
+
+def parse_tickers(payload) -> list:
+    """
+    (symbol, name) pairs from the snapshot format ({"tickers": [[symbol, name], ...]})
+    or a Tickertick ticker search ({"tickers": [{"ticker": ..., "company_name": ...}, ...]}).
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("tickers"), list):
+        raise ValueError("Unrecognized ticker list format")
+    tickers = []
+    for entry in payload["tickers"]:
+        if isinstance(entry, dict):
+            symbol = entry.get("ticker") or entry.get("symbol")
+            name = entry.get("company_name") or entry.get("name") or ""
+        else:
+            symbol, name = entry
+        if symbol:
+            tickers.append((normalize_symbol(symbol), name))
+    return tickers
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH) -> TickerIndex:
+    try:
+        with open(path) as f:
+            payload = json.load(f)
+        return TickerIndex(parse_tickers(payload))
+    except (OSError, ValueError) as e:
+        logging.error(f"Failed to load the ticker snapshot {path}: {e}")
+        return TickerIndex([])
+
+
+def lookup_tickers(url: str, query: str, limit: int = 5, timeout: float = 10.0) -> list:
+    """
+    (symbol, name) pairs Tickertick's ticker search returns for `query`
+    """
+    resp = requests.get(url, params={"p": query, "n": limit}, timeout=timeout)
+    resp.raise_for_status()
+    return parse_tickers(resp.json())
+
+
+class TickerRefresher:
+    """
+    Holds the current TickerIndex and grows it in the background with
+    Tickertick's matches for the queries passed to `request`, one lookup every
+    `interval_seconds`. Readers use `index` without locking; new matches are
+    merged into a new index that is swapped in whole. The `max_seen` most
+    recently missed keys are remembered, so a repeated miss is not looked up again.
+    """
+
+    def __init__(self, index: TickerIndex, url: str, interval_seconds: float = 6.0, max_pending: int = 100,
+                 max_seen: int = 10000):
+        self.index = index
+        self.url = url
+        self.interval_seconds = interval_seconds
+        self.max_pending = max_pending
+        self.max_seen = max_seen
+        self._pending = {}
+        # Keys already looked up, least recently missed first
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ticker-lookup", daemon=True)
+
+    @classmethod
+    def from_env(cls) -> "TickerRefresher":
+        return cls(
+            load_snapshot(),
+            os.getenv("TICKER_LOOKUP_URL", f"{TICKERTICK_API_URL}/tickers"),
+            float(os.getenv("TICKER_LOOKUP_INTERVAL_SECONDS", "6")),
+        )
+
+    def start(self) -> None:
+        if self.url:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    def request(self, query: str) -> None:
+        """
+        Queue `query`, which the index could not resolve, for a lookup
+        """
+        key = _key(query)
+        if not self.url or not key:
+            return
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+            elif len(self._pending) < self.max_pending:
+                self._pending.setdefault(key, query)
+
+    def refresh(self, query: str) -> int:
+        """
+        Look `query` up and merge the symbols the index lacks; returns how many were added
+        """
+        try:
+            found = lookup_tickers(self.url, query)
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logging.error(f"Failed to look up {query!r} at {self.url}: {e}")
+            return 0
+        index = self.index
+        added = [(symbol, name) for symbol, name in found if symbol not in index]
+        if added:
+            self.index = TickerIndex(index.tickers() + added)
+            logging.info(f"Added {len(added)} tickers for {query!r}")
+        return len(added)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            with self._lock:
+                if not self._pending:
+                    continue
+                key = next(iter(self._pending))
+                query = self._pending.pop(key)
+                self._seen[key] = None
+                while len(self._seen) > self.max_seen:
+                    self._seen.popitem(last=False)
+            self.refresh(query)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Add Tickertick's matches for some queries to the bundled snapshot")
+    parser.add_argument("command", choices=["add"])
+    parser.add_argument("queries", nargs="+", help="symbols or company names to look up")
+    parser.add_argument("--url", default=os.getenv("TICKER_LOOKUP_URL", f"{TICKERTICK_API_URL}/tickers"))
+    parser.add_argument("--output", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+    tickers = load_snapshot(args.output).tickers()
+    known = {symbol for symbol, _ in tickers}
+    for query in args.queries:
+        for symbol, name in lookup_tickers(args.url, query):
+            if symbol not in known:
+                known.add(symbol)
+                tickers.append((symbol, name))
+    with open(args.output, "w") as f:
+        json.dump({"tickers": tickers}, f, indent=0)
+    print(f"Wrote {len(tickers)} tickers to {args.output}")
+
+
+if __name__ == "__main__":
+    main()